@@ -1,50 +1,558 @@
-"""Flask application serving the price comparison interface."""
+"""Flask application serving the price comparison interface.
+
+``create_app()`` builds the application. Development servers use it
+directly (``flask run`` finds the factory); production runs it under
+gunicorn with ``gunicorn.conf.py``, which imports the app once and starts
+the fetch resources in every worker (see :func:`init_resources`).
+"""
 
 from __future__ import annotations
 
-from typing import Optional
+import math
+import os
+from typing import Any, FrozenSet, Iterator, List, Mapping, Optional
+
+from flask import Blueprint, Flask, Response, current_app, jsonify, render_template, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.wsgi import ClosingIterator
+
+from price_fetchers import (
+    PriceResult,
+    cheapest_result,
+    compare_prices,
+    configure_history,
+    configure_http_cache,
+    configure_retailer,
+    iter_compare_batch,
+    iter_compare_prices,
+    start_cache_warmer,
+    unique_queries,
+)
+from price_fetchers import metrics, serialization
+from price_fetchers.executor import configure_executor
+from price_fetchers.history import get_history
+from price_fetchers.lifecycle import Lifecycle, shutdown_resources
+from price_fetchers.offload import configure_extraction_pool
+from price_fetchers.ratelimit import RateLimits
+from price_fetchers.utils import configure_host_pacing, configure_sessions
+
+bp = Blueprint("prices", __name__)
+
+RATE_LIMITED = metrics.counter(
+    "price_api_rate_limited_total",
+    "API requests refused with 429 because the client exceeded its rate limit.",
+    ("endpoint",),
+)
+
+
+def create_app(config: Optional[Mapping[str, Any]] = None, *, start_resources: bool = True) -> Flask:
+    """Create the application.
+
+    Settings come from ``config``, then ``FLASK_*`` environment variables
+    (e.g. ``FLASK_HISTORY_DATABASE=/data/history.sqlite3``), then the
+    defaults below. Pass ``start_resources=False`` when the process is
+    about to fork, and call :func:`init_resources` in each child instead.
+    """
+
+    app = Flask(__name__)
+    app.config.from_prefixed_env()
+    if config:
+        app.config.update(config)
+
+    # Overall time budget (seconds) for one comparison; clients may ask for less.
+    app.config.setdefault("COMPARE_DEADLINE", 20.0)
+    app.config.setdefault("MAX_COMPARE_DEADLINE", 60.0)
+    app.config.setdefault("MAX_BATCH_QUERIES", 100)
+    # Overall budget for a whole batch and the queries it compares at once (None: package default).
+    app.config.setdefault("BATCH_DEADLINE", 60.0)
+    app.config.setdefault("BATCH_CONCURRENCY", None)
+    # Upper bound for ``?limit=``, the number of candidate products per retailer.
+    app.config.setdefault("MAX_CANDIDATES", 10)
+    # Per-retailer tuning, e.g. {"Gratis": {"timeout": 8, "concurrency": 4, "cache_ttl": 600, "warm_rate": 1}}.
+    app.config.setdefault("RETAILER_SETTINGS", {})
+
+    # Per-process fetch capacity: concurrent retailer fetches and pooled
+    # connections per retailer host. None keeps the package defaults.
+    app.config.setdefault("FETCH_MAX_IN_FLIGHT", None)
+    app.config.setdefault("SESSION_POOL_SIZE", None)
+    # Worker processes extracting prices from fetched pages, so parsing does
+    # not hold the GIL the fetch threads need; 0 extracts on the fetch thread.
+    # Past EXTRACTION_MAX_PENDING queued pages (default twice the processes)
+    # extraction falls back to the fetch thread.
+    app.config.setdefault("EXTRACTION_PROCESSES", 0)
+    app.config.setdefault("EXTRACTION_MAX_PENDING", None)
+
+    # SQLite file for the price history behind /api/history; None turns it off.
+    app.config.setdefault("HISTORY_DATABASE", None)
+    # Largest number of points /api/history returns in one response.
+    app.config.setdefault("MAX_HISTORY_POINTS", 5000)
+
+    # Directory for fetched pages and their ETag/Last-Modified validators; None turns
+    # conditional requests off.
+    app.config.setdefault("HTTP_CACHE_DIR", os.path.join(app.instance_path, "http-cache"))
+    # Number of most popular queries kept warm in the cache; 0 turns the warmer off.
+    app.config.setdefault("WARM_TOP_QUERIES", 300)
+    # JSON responses at least this large (bytes) are gzip/brotli compressed.
+    app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+
+    # Proxies (load balancer, CDN) in front of the app whose X-Forwarded-For
+    # is trusted to name the client.
+    app.config.setdefault("TRUSTED_PROXY_HOPS", 0)
+    # Token buckets per client address for /api/*: requests per second and
+    # burst size. Limits apply per worker process; None turns them off. They
+    # are only on by default with TRUSTED_PROXY_HOPS set: behind a proxy the
+    # connecting address is the proxy's, and every user would share a bucket.
+    app.config.setdefault("RATE_LIMIT_PER_CLIENT", 1.0 if app.config["TRUSTED_PROXY_HOPS"] else None)
+    app.config.setdefault("RATE_LIMIT_BURST", 20)
+    # Client buckets kept at once; the least recently seen clients start over.
+    app.config.setdefault("RATE_LIMIT_MAX_CLIENTS", 10000)
+
+    # Requests per second and burst to each retailer host, shared by every
+    # thread of a worker; OUTBOUND_HOST_RATES overrides single hosts, e.g.
+    # {"www.gratis.com": 2}. None sends requests unpaced.
+    app.config.setdefault("OUTBOUND_RATE_PER_HOST", 4.0)
+    app.config.setdefault("OUTBOUND_BURST", 8)
+    app.config.setdefault("OUTBOUND_HOST_RATES", {})
+
+    # Seconds a shutting-down worker waits for in-flight requests before
+    # releasing the fetch resources underneath them.
+    app.config.setdefault("DRAIN_TIMEOUT", 10.0)
+
+    if app.config["TRUSTED_PROXY_HOPS"]:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(app.config["TRUSTED_PROXY_HOPS"]))
+    if app.config["RATE_LIMIT_PER_CLIENT"]:
+        if not app.config["TRUSTED_PROXY_HOPS"]:
+            app.logger.warning(
+                "RATE_LIMIT_PER_CLIENT bağlanan adrese göre uygulanıyor; vekil arkasında TRUSTED_PROXY_HOPS ayarlanmalı"
+            )
+        app.extensions["client_rate_limits"] = RateLimits(
+            float(app.config["RATE_LIMIT_PER_CLIENT"]),
+            capacity=float(app.config["RATE_LIMIT_BURST"]),
+            max_keys=int(app.config["RATE_LIMIT_MAX_CLIENTS"]),
+        )
+    lifecycle = app.extensions["price_fetchers"] = Lifecycle()
+    app.wsgi_app = _track_in_flight(app.wsgi_app, lifecycle)
+    app.register_blueprint(bp)
+    if start_resources:
+        init_resources(app)
+    return app
+
+
+def init_resources(app: Flask) -> None:
+    """Configure and start this process's fetch resources from ``app.config``.
+
+    Sessions, the executor, the extraction pool, the history writer and the
+    cache warmer are process-local; call this once per worker, after any fork.
+    """
+
+    for name, settings in app.config["RETAILER_SETTINGS"].items():
+        configure_retailer(name, **settings)
+
+    if app.config["SESSION_POOL_SIZE"]:
+        configure_sessions(pool_size=int(app.config["SESSION_POOL_SIZE"]))
+    if app.config["FETCH_MAX_IN_FLIGHT"]:
+        configure_executor(max_in_flight=int(app.config["FETCH_MAX_IN_FLIGHT"]))
+    configure_host_pacing(
+        app.config["OUTBOUND_RATE_PER_HOST"] and float(app.config["OUTBOUND_RATE_PER_HOST"]),
+        burst=float(app.config["OUTBOUND_BURST"]),
+        rates=app.config["OUTBOUND_HOST_RATES"],
+    )
+    if app.config["EXTRACTION_PROCESSES"]:
+        configure_extraction_pool(
+            int(app.config["EXTRACTION_PROCESSES"]),
+            max_pending=app.config["EXTRACTION_MAX_PENDING"] and int(app.config["EXTRACTION_MAX_PENDING"]),
+        )
+
+    if app.config["HISTORY_DATABASE"]:
+        configure_history(app.config["HISTORY_DATABASE"])
+
+    configure_http_cache(app.config["HTTP_CACHE_DIR"])
+
+    if app.config["WARM_TOP_QUERIES"]:
+        start_cache_warmer(top_k=int(app.config["WARM_TOP_QUERIES"]))
 
-from flask import Flask, jsonify, render_template, request
+    app.extensions["price_fetchers"].started = True
 
-from price_fetchers import PriceResult, compare_prices
 
-app = Flask(__name__)
+def begin_drain(app: Flask) -> None:
+    """Start answering ``/readyz`` with 503 while requests are still served."""
 
+    app.extensions["price_fetchers"].draining = True
 
-@app.route("/")
+
+def drain(app: Flask, timeout: Optional[float] = None) -> bool:
+    """Stop reporting ready, wait for in-flight requests, then release resources.
+
+    Waits at most ``timeout`` seconds (``DRAIN_TIMEOUT`` by default) and
+    returns False when requests were still running; running fetches are
+    then abandoned instead of awaited.
+    """
+
+    if timeout is None:
+        timeout = float(app.config["DRAIN_TIMEOUT"])
+    drained = app.extensions["price_fetchers"].drain(timeout)
+    if not drained:
+        app.logger.warning("Kapanırken %d istek hâlâ sürüyordu", app.extensions["price_fetchers"].in_flight)
+    shutdown_resources(wait=drained)
+    return drained
+
+
+def _track_in_flight(wsgi_app, lifecycle: Lifecycle):
+    """Count a request as in flight until its (possibly streamed) body is closed."""
+
+    def tracked(environ, start_response):
+        lifecycle.enter()
+        try:
+            body = wsgi_app(environ, start_response)
+        except BaseException:
+            lifecycle.exit()
+            raise
+        return ClosingIterator(body, lifecycle.exit)
+
+    return tracked
+
+
+@bp.before_request
+def limit_client_rate():
+    """Answer ``429 Too Many Requests`` once a client has used up its API tokens."""
+
+    limits: Optional[RateLimits] = current_app.extensions.get("client_rate_limits")
+    if limits is None or not request.path.startswith("/api/"):
+        return None
+    bucket = limits.get(request.remote_addr or "")
+    if bucket.try_acquire():
+        return None
+    RATE_LIMITED.inc(request.endpoint or "")
+    response = jsonify({"error": "Çok fazla istek gönderildi, lütfen biraz sonra tekrar deneyin"})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(1, math.ceil(bucket.wait_time())))
+    return response
+
+
+@bp.route("/")
 def index():
     """Render the main landing page."""
 
     return render_template("index.html")
 
 
-@app.route("/api/compare")
+@bp.route("/api/compare")
 def api_compare():
-    """Return price comparison results as JSON."""
+    """Return price comparison results as JSON.
+
+    Results carry every field except ``debug``; ``?fields=`` picks a
+    comma-separated subset and ``?debug=1`` adds the debug dict.
+    """
 
     query = request.args.get("query", "").strip()
     if not query:
         return jsonify({"error": "Ürün adı gerekli"}), 400
 
-    results = compare_prices(query)
+    deadline = _requested_deadline()
+    if deadline is None:
+        return jsonify({"error": "Geçersiz süre sınırı"}), 400
+
+    limit = _requested_limit()
+    if limit is None:
+        return jsonify({"error": "Geçersiz aday sayısı"}), 400
+
+    fields = _requested_fields()
+    if fields is None:
+        return jsonify({"error": "Geçersiz alan listesi"}), 400
+
+    results = compare_prices(query, deadline=deadline, limit=limit)
     cheapest: Optional[PriceResult] = next((result for result in results if result.is_successful), None)
 
-    return jsonify(
+    response = _json_response(
         {
             "query": query,
-            "results": [result.to_dict() for result in results],
-            "cheapest": cheapest.to_dict() if cheapest else None,
+            "results": [result.to_dict(fields) for result in results],
+            "cheapest": cheapest.to_dict(fields) if cheapest else None,
+            "timed_out": [result.retailer for result in results if result.debug.get("timed_out")],
         }
     )
+    # Identical comparisons (typically served from the cache) revalidate with a 304.
+    response.set_etag(serialization.strong_etag(response.get_data()))
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@bp.route("/api/compare/stream")
+def api_compare_stream():
+    """Stream each retailer's result as NDJSON the moment it completes.
+
+    Every line is a JSON object: one ``{"type": "result", ...}`` per
+    retailer followed by a final ``{"type": "summary", ...}`` naming the
+    cheapest result and the retailers cut off by the deadline.
+    """
+
+    query = request.args.get("query", "").strip()
+    if not query:
+        return jsonify({"error": "Ürün adı gerekli"}), 400
+
+    deadline = _requested_deadline()
+    if deadline is None:
+        return jsonify({"error": "Geçersiz süre sınırı"}), 400
+
+    limit = _requested_limit()
+    if limit is None:
+        return jsonify({"error": "Geçersiz aday sayısı"}), 400
+
+    fields = _requested_fields()
+    if fields is None:
+        return jsonify({"error": "Geçersiz alan listesi"}), 400
+
+    def generate() -> Iterator[bytes]:
+        results: List[PriceResult] = []
+        for result in iter_compare_prices(query, deadline=deadline, limit=limit):
+            results.append(result)
+            yield _ndjson({"type": "result", "result": result.to_dict(fields)})
+        cheapest = cheapest_result(results)
+        yield _ndjson(
+            {
+                "type": "summary",
+                "query": query,
+                "cheapest": cheapest.to_dict(fields) if cheapest else None,
+                "timed_out": [result.retailer for result in results if result.debug.get("timed_out")],
+            }
+        )
+
+    return Response(
+        generate(),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.route("/api/compare/batch", methods=["POST"])
+def api_compare_batch():
+    """Compare a list of queries, streaming one NDJSON line per query.
+
+    The body is ``{"queries": [...]}``. Duplicate queries (ignoring case and
+    spacing) are compared once. Lines arrive in completion order: each is
+    ``{"type": "query", "query", "results", "cheapest", "timed_out"}`` or,
+    when that comparison failed, ``{"type": "query", "query", "error"}``.
+    A failed query never aborts the batch; the closing ``summary`` line
+    counts the completed, failed and skipped (duplicate or blank) queries.
+    ``?deadline=`` (default ``BATCH_DEADLINE``) bounds the whole batch;
+    queries it cuts off list their unfinished retailers in ``timed_out``.
+    """
+
+    payload = request.get_json(silent=True)
+    queries = payload.get("queries") if isinstance(payload, dict) else None
+    if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+        return jsonify({"error": "queries alanı metin listesi olmalı"}), 400
+
+    unique = list(unique_queries(queries))
+    if not unique:
+        return jsonify({"error": "En az bir ürün adı gerekli"}), 400
+    if len(unique) > int(current_app.config["MAX_BATCH_QUERIES"]):
+        return jsonify({"error": f"En fazla {current_app.config['MAX_BATCH_QUERIES']} ürün karşılaştırılabilir"}), 400
+
+    deadline = _requested_deadline("BATCH_DEADLINE")
+    if deadline is None:
+        return jsonify({"error": "Geçersiz süre sınırı"}), 400
+
+    fields = _requested_fields()
+    if fields is None:
+        return jsonify({"error": "Geçersiz alan listesi"}), 400
+
+    # The generator runs after the request context is gone.
+    max_concurrency = current_app.config["BATCH_CONCURRENCY"]
+    logger = current_app.logger
+
+    def generate() -> Iterator[bytes]:
+        failed = 0
+        for query, outcome in iter_compare_batch(
+            unique,
+            max_concurrency=max_concurrency,
+            deadline=deadline,
+        ):
+            if isinstance(outcome, Exception):
+                failed += 1
+                logger.warning("Toplu karşılaştırma başarısız: %s", query, exc_info=outcome)
+                yield _ndjson({"type": "query", "query": query, "error": "Karşılaştırma başarısız oldu"})
+                continue
+            cheapest = cheapest_result(outcome)
+            yield _ndjson(
+                {
+                    "type": "query",
+                    "query": query,
+                    "results": [result.to_dict(fields) for result in outcome],
+                    "cheapest": cheapest.to_dict(fields) if cheapest else None,
+                    "timed_out": [result.retailer for result in outcome if result.debug.get("timed_out")],
+                }
+            )
+        yield _ndjson(
+            {
+                "type": "summary",
+                "queries": len(unique),
+                "skipped": len(queries) - len(unique),
+                "completed": len(unique) - failed,
+                "failed": failed,
+            }
+        )
+
+    return Response(
+        generate(),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.route("/api/history")
+def api_history():
+    """Return recorded prices for a query as JSON.
+
+    ``since`` and ``until`` bound the range in Unix seconds; ``retailer``
+    narrows it to one retailer. With ``bucket`` (seconds) prices are
+    downsampled to per-window min/max/average points per product.
+    """
+
+    query = request.args.get("query", "").strip()
+    if not query:
+        return jsonify({"error": "Ürün adı gerekli"}), 400
+
+    history = get_history()
+    if history is None:
+        return jsonify({"error": "Fiyat geçmişi etkin değil"}), 503
+
+    try:
+        since = _optional_float("since")
+        until = _optional_float("until")
+        bucket = _optional_float("bucket")
+    except ValueError:
+        return jsonify({"error": "Geçersiz zaman aralığı"}), 400
+    if bucket is not None and bucket <= 0:
+        return jsonify({"error": "Geçersiz zaman aralığı"}), 400
+
+    points = history.query(
+        query,
+        retailer=request.args.get("retailer") or None,
+        since=since,
+        until=until,
+        bucket=bucket,
+        max_points=int(current_app.config["MAX_HISTORY_POINTS"]),
+    )
+    return _json_response({"query": query, "bucket": bucket, "points": points})
+
+
+@bp.route("/metrics")
+def metrics_endpoint():
+    """Expose stage timings, fetch outcomes and component stats for Prometheus."""
+
+    return Response(metrics.render(), mimetype="text/plain", headers={"Cache-Control": "no-cache"})
+
+
+@bp.route("/readyz")
+def readyz():
+    """Report whether this worker should receive traffic.
+
+    Answers 503 until the worker's resources are started and again once it
+    begins draining for shutdown, so load balancers stop routing to it
+    before it goes away.
+    """
+
+    lifecycle: Lifecycle = current_app.extensions["price_fetchers"]
+    status = "ready" if lifecycle.ready else "draining" if lifecycle.draining else "starting"
+    response = jsonify({"status": status, **lifecycle.stats()})
+    response.status_code = 200 if lifecycle.ready else 503
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@bp.after_app_request
+def compress_response(response: Response) -> Response:
+    """Compress large JSON bodies and answer matching ``If-None-Match`` with a 304.
+
+    Each content coding is a different representation, so its strong ETag
+    gets the coding appended. Streamed NDJSON is left untouched so lines
+    still reach the client as they are produced.
+    """
+
+    if response.mimetype != "application/json" or response.is_streamed or response.direct_passthrough:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = serialization.negotiate_encoding(request.accept_encodings)
+    if (
+        encoding is not None
+        and response.status_code == 200
+        and "Content-Encoding" not in response.headers
+        and response.content_length is not None
+        and response.content_length >= int(current_app.config["COMPRESS_MIN_SIZE"])
+    ):
+        response.set_data(serialization.compress(response.get_data(), encoding))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+    if response.get_etag()[0]:
+        response.make_conditional(request)
+    return response
+
+
+def _json_response(payload: dict) -> Response:
+    return Response(serialization.dumps(payload), mimetype="application/json")
+
+
+def _ndjson(payload: dict) -> bytes:
+    return serialization.dumps(payload) + b"\n"
+
+
+def _requested_fields() -> Optional[FrozenSet[str]]:
+    """Return the result fields from ``?fields=`` and ``?debug=``, or None if invalid."""
+
+    try:
+        return serialization.parse_fields(request.args.get("fields"), debug=request.args.get("debug") == "1")
+    except ValueError:
+        return None
+
+
+def _requested_deadline(default_key: str = "COMPARE_DEADLINE") -> Optional[float]:
+    """Return the comparison budget from ``?deadline=`` or config, or None if invalid."""
+
+    default = float(current_app.config[default_key])
+    raw = request.args.get("deadline")
+    if raw is None:
+        return default
+    try:
+        deadline = float(raw)
+    except ValueError:
+        return None
+    if not 0 < deadline <= float(current_app.config["MAX_COMPARE_DEADLINE"]):
+        return None
+    return deadline
+
+
+def _optional_float(name: str) -> Optional[float]:
+    """Return ``?name=`` as a float, None when absent; raises ValueError when invalid."""
+
+    raw = request.args.get(name)
+    return float(raw) if raw not in (None, "") else None
+
+
+def _requested_limit() -> Optional[int]:
+    """Return the candidate count from ``?limit=`` (default 1), or None if invalid."""
+
+    raw = request.args.get("limit")
+    if raw is None:
+        return 1
+    try:
+        limit = int(raw)
+    except ValueError:
+        return None
+    if not 1 <= limit <= int(current_app.config["MAX_CANDIDATES"]):
+        return None
+    return limit
 
 
-@app.errorhandler(Exception)
+@bp.app_errorhandler(Exception)
 def handle_exception(error: Exception):  # pragma: no cover - user feedback path
     """Render friendly JSON for unexpected errors."""
 
-    app.logger.exception("Beklenmeyen hata", exc_info=error)
+    current_app.logger.exception("Beklenmeyen hata", exc_info=error)
     return jsonify({"error": "Beklenmeyen bir hata oluştu", "detail": str(error)}), 500
 
 
 if __name__ == "__main__":  # pragma: no cover - manual execution helper
-    app.run(debug=True, port=5000)
+    create_app().run(debug=True, port=5000)
@@ -0,0 +1,98 @@
+"""Micro-benchmark the embedded-payload extractors against the previous scanners.
+
+Run with ``python -m benchmarks.bench_embedded``.
+"""
+
+from __future__ import annotations
+
+import json
+import timeit
+from typing import Any, Callable, List
+
+from price_fetchers import gratis, rossmann
+
+from .pages import gratis_flight_page, rossmann_embedded_page
+
+
+def legacy_gratis(html: str) -> List[Any]:
+    """The per-character scan and unicode_escape round trip this module replaced."""
+
+    marker = 'products\\":['
+    start_idx = html.find(marker)
+    if start_idx == -1:
+        return []
+    start = end = start_idx + len('products\\":')
+    depth = 0
+    while end < len(html):
+        char = html[end]
+        if char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+            if depth == 0:
+                end += 1
+                break
+        elif char == "\\":
+            end += 1
+        end += 1
+    decoded = bytes(html[start:end], "utf-8").decode("unicode_escape")
+    try:
+        decoded = decoded.encode("latin-1").decode("utf-8")
+    except UnicodeEncodeError:
+        pass
+    return json.loads(decoded)
+
+
+def legacy_rossmann(html: str) -> List[Any]:
+    """The per-character bracket matcher this module replaced."""
+
+    array_start = html.find("[", html.find("initialProducts:"))
+    depth = 0
+    in_string = escape = False
+    for pos in range(array_start, len(html)):
+        char = html[pos]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+            if depth == 0:
+                return json.loads(html[array_start : pos + 1])
+    return []
+
+
+def _best_of(func: Callable[[str], Any], html: str, number: int) -> float:
+    return min(timeit.repeat(lambda: func(html), number=number, repeat=5)) / number
+
+
+def run(number: int = 20) -> List[str]:
+    """Time old and new extractors on realistic pages and return report lines."""
+
+    cases = [
+        ("gratis flight", gratis_flight_page(), legacy_gratis, gratis._extract_products_from_embedded_state),
+        ("rossmann initialProducts", rossmann_embedded_page(), legacy_rossmann, rossmann._extract_initial_products),
+    ]
+    lines = []
+    for label, html, legacy, current in cases:
+        expected = legacy(html)
+        assert expected and expected == current(html), f"{label}: extractors disagree"
+        old = _best_of(legacy, html, number)
+        new = _best_of(current, html, number)
+        lines.append(
+            f"embedded/{label:<26} {len(html) / 1024:7.0f} KB  "
+            f"legacy {old * 1000:8.3f} ms  current {new * 1000:8.3f} ms  speedup {old / new:6.1f}x"
+        )
+    return lines
+
+
+if __name__ == "__main__":  # pragma: no cover - manual execution helper
+    print("\n".join(run()))
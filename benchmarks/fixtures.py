@@ -0,0 +1,43 @@
+"""Retailer page fixtures for the offline benchmarks.
+
+Captured pages are read from ``benchmarks/recorded/<retailer>-<strategy>.html``
+when present (for example saved with ``curl -o`` from a live search). Any
+fixture without a recording falls back to a deterministic generated page
+of realistic size, so the suite always runs offline.
+"""
+
+from __future__ import annotations
+
+import pathlib
+from typing import Callable, Dict, Tuple
+
+from . import pages
+
+RECORDED_DIR = pathlib.Path(__file__).resolve().parent / "recorded"
+
+RETAILERS = ("rossmann", "gratis")
+STRATEGIES = ("json-ld", "embedded-json", "html-selectors")
+
+_GENERATED: Dict[Tuple[str, str], Callable[[], str]] = {
+    ("rossmann", "json-ld"): pages.json_ld_page,
+    ("rossmann", "embedded-json"): pages.rossmann_embedded_page,
+    ("rossmann", "html-selectors"): pages.selector_page,
+    ("gratis", "json-ld"): pages.json_ld_page,
+    ("gratis", "embedded-json"): pages.gratis_flight_page,
+    ("gratis", "html-selectors"): lambda: pages.selector_page(price_class="text-primary-900"),
+}
+
+
+def load_fixture(retailer: str, strategy: str) -> str:
+    """Return the recorded page for ``retailer``/``strategy`` or a generated one."""
+
+    recorded = RECORDED_DIR / f"{retailer}-{strategy}.html"
+    if recorded.exists():
+        return recorded.read_text(encoding="utf-8")
+    return _GENERATED[(retailer, strategy)]()
+
+
+def fixture_source(retailer: str, strategy: str) -> str:
+    """Return ``"recorded"`` or ``"generated"`` for reporting."""
+
+    return "recorded" if (RECORDED_DIR / f"{retailer}-{strategy}.html").exists() else "generated"
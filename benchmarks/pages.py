@@ -0,0 +1,133 @@
+"""Builders for realistic, multi-hundred-KB retailer search pages."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List
+
+
+def rossmann_products(count: int) -> List[Dict[str, Any]]:
+    """Return Elasticsearch-style hits shaped like Rossmann's ``initialProducts``."""
+
+    return [
+        {
+            "_index": "rossmann_tr_products",
+            "_id": str(10_000 + index),
+            "_source": {
+                "id": 10_000 + index,
+                "name": f"Güneş Kremi SPF50+ Hassas Ciltler İçin {index} ml",
+                "url_key": f"gunes-kremi-spf50-hassas-{index}",
+                "price": 249.9 + index,
+                "special_price": 199.9 + index,
+                "ross_60_price": 189.9 + index,
+                "description": "Yüksek koruma sağlayan, su geçirmez formül. " * 6,
+                "category_ids": list(range(20)),
+                "media_gallery": [
+                    {"image": f"/media/catalog/product/{index}/{image}.jpg", "label": "ürün görseli"}
+                    for image in range(4)
+                ],
+            },
+        }
+        for index in range(count)
+    ]
+
+
+def gratis_products(count: int) -> List[Dict[str, Any]]:
+    """Return product objects shaped like Gratis's flight ``products`` array."""
+
+    return [
+        {
+            "id": f"100{index:05d}",
+            "shareLink": f"/urun/nemlendirici-krem-{index}",
+            "prices": {
+                "normalPrice": 15990 + index,
+                "discountedPrice": 12990 + index,
+                "normalPriceLabel": f"{159 + index},90 TL",
+                "discountedPriceLabel": f"{129 + index},90 TL",
+                "currency": "TRY",
+            },
+            "attributes": {
+                "displayName": f"Nemlendirici Yüz Kremi \"Hassas\" Çeşit {index}",
+                "brand": "Örnek Marka",
+                "description": "Gün boyu nem, ağırlık yapmayan doku. " * 6,
+            },
+            "analytics": {"name": f"Nemlendirici {index}", "category": "Cilt Bakımı"},
+            "images": [f"https://cdn.gratis.com/{index}/{image}.webp" for image in range(4)],
+        }
+        for index in range(count)
+    ]
+
+
+def _filler(size_kb: int) -> str:
+    block = '<div class="promo-banner"><span class="label">Kampanya</span><p>Fırsat ürünleri</p></div>\n'
+    return block * max(1, (size_kb * 1024) // len(block))
+
+
+def rossmann_embedded_page(count: int = 48, filler_kb: int = 200) -> str:
+    """Return a Rossmann search page with products in an ``initialProducts:`` literal."""
+
+    payload = json.dumps(rossmann_products(count), ensure_ascii=False, separators=(",", ":"))
+    return (
+        "<!DOCTYPE html><html><head><title>Arama</title></head><body>"
+        + _filler(filler_kb // 2)
+        + f"<script>window.__NUXT__={{data:[{{initialProducts:{payload},total:{count}}}]}};</script>"
+        + _filler(filler_kb // 2)
+        + "</body></html>"
+    )
+
+
+def gratis_flight_page(count: int = 48, filler_kb: int = 200) -> str:
+    """Return a Gratis search page with products inside an escaped Next.js flight chunk."""
+
+    state = json.dumps({"products": gratis_products(count), "total": count}, ensure_ascii=False, separators=(",", ":"))
+    flight = json.dumps([1, f'0:["$","div",null,{state}]\n'], ensure_ascii=False, separators=(",", ":"))
+    return (
+        "<!DOCTYPE html><html><head><title>Arama</title></head><body>"
+        + _filler(filler_kb // 2)
+        + f"<script>self.__next_f.push({flight})</script>"
+        + _filler(filler_kb // 2)
+        + "</body></html>"
+    )
+
+
+def json_ld_page(count: int = 24, filler_kb: int = 200) -> str:
+    """Return a search page listing products as schema.org JSON-LD."""
+
+    items = [
+        {
+            "@context": "https://schema.org",
+            "@type": "Product",
+            "name": f"Şampuan Onarıcı Bakım {index} 400 ml",
+            "url": f"/sampuan-onarici-bakim-{index}",
+            "image": [f"https://cdn.example.com/{index}.jpg"],
+            "offers": {"@type": "Offer", "price": f"{89 + index},90", "priceCurrency": "TRY"},
+        }
+        for index in range(count)
+    ]
+    scripts = "".join(
+        f'<script type="application/ld+json">{json.dumps(item, ensure_ascii=False)}</script>' for item in items
+    )
+    return (
+        f"<!DOCTYPE html><html><head><title>Arama</title>{scripts}</head><body>"
+        + _filler(filler_kb)
+        + "</body></html>"
+    )
+
+
+def selector_page(count: int = 48, filler_kb: int = 200, *, price_class: str = "price") -> str:
+    """Return a search page whose prices are only available in the markup."""
+
+    cards = "".join(
+        '<div class="product-card">'
+        f'<a href="/urun/dis-macunu-{index}"><img src="/{index}.jpg" alt=""></a>'
+        f'<h3 class="product-name">Diş Macunu Beyazlatıcı {index} 75 ml</h3>'
+        f'<span class="{price_class}">{49 + index},90 TL</span>'
+        "</div>"
+        for index in range(count)
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Arama</title></head><body>"
+        + _filler(filler_kb)
+        + f'<section class="product-list">{cards}</section>'
+        + "</body></html>"
+    )
@@ -0,0 +1,234 @@
+"""Offline parsing and end-to-end benchmark suite.
+
+Usage::
+
+    python -m benchmarks.run                          # writes bench_output.txt
+    python -m benchmarks.run --output new.txt --repeat 50
+    python -m benchmarks.run --compare bench_output.txt new.txt --threshold 0.15
+
+Each line of the output file is ``<benchmark>\\t<median ms>\\t<p95 ms>``;
+comparing two files reports every benchmark whose median slowed down by
+more than the threshold and exits non-zero when there is one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import json
+import pathlib
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from price_fetchers import aggregator, gratis, rossmann, serialization
+from price_fetchers.cache import ResultCache
+from price_fetchers.httpcache import configure_http_cache
+from price_fetchers.utils import ParsedPage, find_price_candidates, parse_json_ld_products
+
+from .fixtures import RETAILERS, STRATEGIES, fixture_source, load_fixture
+
+DEFAULT_OUTPUT = pathlib.Path("bench_output.txt")
+MODULES = {"rossmann": rossmann, "gratis": gratis}
+EMBEDDED_EXTRACTORS = {
+    "rossmann": rossmann._extract_initial_products,
+    "gratis": gratis._extract_products_from_embedded_state,
+}
+
+Timing = Tuple[float, float]
+
+
+def measure(func: Callable[[], object], repeat: int) -> Timing:
+    """Return the median and p95 wall time of ``func`` in milliseconds."""
+
+    func()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    return statistics.median(samples), p95
+
+
+def strategy_benchmarks(repeat: int) -> Dict[str, Timing]:
+    """Time each extraction strategy and the full extraction per fixture."""
+
+    results: Dict[str, Timing] = {}
+    for retailer in RETAILERS:
+        module = MODULES[retailer]
+        for strategy in STRATEGIES:
+            html = load_fixture(retailer, strategy)
+            prefix = f"{retailer}/{strategy}"
+            results[f"{prefix}/json-ld-scan"] = measure(lambda: parse_json_ld_products(ParsedPage(html)), repeat)
+            results[f"{prefix}/embedded-scan"] = measure(lambda: EMBEDDED_EXTRACTORS[retailer](html), repeat)
+            if strategy == "html-selectors":
+                results[f"{prefix}/selector-fallback"] = measure(
+                    lambda: find_price_candidates(ParsedPage(html).soup, module.PRICE_SELECTORS), repeat
+                )
+            # The unwrapped extractor: the memo would turn every repeat into a hash lookup.
+            results[f"{prefix}/extract"] = measure(lambda: module._build_result.__wrapped__(html, "bench"), repeat)
+            results[f"{prefix}/extract-memoized"] = measure(lambda: module._build_result(html, "bench"), repeat)
+    return results
+
+
+def serialization_benchmarks(repeat: int) -> Dict[str, Timing]:
+    """Time encoding a ten-candidate comparison the old way and the API's way."""
+
+    results = [
+        module._build_result.__wrapped__(load_fixture(retailer, "embedded-json"), "bench", 10)
+        for retailer, module in MODULES.items()
+    ]
+    fields = serialization.parse_fields(None)
+    return {
+        "serialize/stdlib-full": measure(
+            lambda: json.dumps([result.to_dict() for result in results], ensure_ascii=False).encode("utf-8"), repeat
+        ),
+        "serialize/default-fields": measure(
+            lambda: serialization.dumps([result.to_dict(fields) for result in results]), repeat
+        ),
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    pages: Dict[str, str] = {}
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        path = self.path.split("?", 1)[0].rstrip("/")
+        body = self.pages.get(path)
+        if body is None:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - signature from base class
+        return
+
+
+@contextlib.contextmanager
+def stub_retailers(strategy: str) -> Iterator[None]:
+    """Serve the ``strategy`` fixtures locally and point both retailers at them."""
+
+    handler = type("Handler", (_StubHandler,), {})
+    handler.pages = {
+        "/catalogsearch/result": load_fixture("rossmann", strategy),
+        "/search": load_fixture("gratis", strategy),
+    }
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    saved = (rossmann.BASE_URL, gratis.BASE_URL, aggregator.RESULT_CACHE)
+    rossmann.BASE_URL = gratis.BASE_URL = base_url
+    # Every iteration must go to the (stub) network.
+    aggregator.RESULT_CACHE = ResultCache(success_ttl=0, failure_ttl=0, stale_ttl=0)
+    try:
+        yield
+    finally:
+        rossmann.BASE_URL, gratis.BASE_URL, aggregator.RESULT_CACHE = saved
+        server.shutdown()
+        server.server_close()
+
+
+def end_to_end_benchmarks(repeat: int) -> Dict[str, Timing]:
+    """Time ``compare_prices`` against the local stub server per strategy.
+
+    The plain rows download and extract every page; the ``revalidated``
+    rows use conditional requests and the extraction memo, as repeat
+    queries do in production.
+    """
+
+    def cold() -> None:
+        for module in MODULES.values():
+            module._build_result.cache_clear()
+        aggregator.compare_prices("krem")
+
+    results: Dict[str, Timing] = {}
+    for strategy in STRATEGIES:
+        with stub_retailers(strategy):
+            results[f"compare_prices/{strategy}"] = measure(cold, repeat)
+            with tempfile.TemporaryDirectory() as directory:
+                configure_http_cache(directory)
+                try:
+                    results[f"compare_prices/{strategy}/revalidated"] = measure(
+                        lambda: aggregator.compare_prices("krem"), repeat
+                    )
+                finally:
+                    configure_http_cache(None)
+    return results
+
+
+def write_results(results: Dict[str, Timing], output: pathlib.Path) -> None:
+    sources = ", ".join(f"{r}-{s}={fixture_source(r, s)}" for r in RETAILERS for s in STRATEGIES)
+    lines = [f"# fixtures: {sources}"]
+    lines.extend(f"{name}\t{median:.3f}\t{p95:.3f}" for name, (median, p95) in results.items())
+    output.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def read_results(path: pathlib.Path) -> Dict[str, Timing]:
+    results: Dict[str, Timing] = {}
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, median, p95 = line.split("\t")
+        results[name] = (float(median), float(p95))
+    return results
+
+
+def compare(baseline: Dict[str, Timing], current: Dict[str, Timing], threshold: float) -> List[str]:
+    """Return report lines for benchmarks whose median regressed beyond ``threshold``."""
+
+    regressions = []
+    for name, (median, _p95) in current.items():
+        if name not in baseline:
+            continue
+        before = baseline[name][0]
+        if before > 0 and (median - before) / before > threshold:
+            regressions.append(f"{name}: {before:.3f} ms -> {median:.3f} ms (+{(median - before) / before:.0%})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", type=pathlib.Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--skip-end-to-end", action="store_true")
+    parser.add_argument("--compare", nargs=2, type=pathlib.Path, metavar=("BASELINE", "CURRENT"))
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare(read_results(args.compare[0]), read_results(args.compare[1]), args.threshold)
+        print("\n".join(regressions) or "No regressions.")
+        return 1 if regressions else 0
+
+    results = strategy_benchmarks(args.repeat)
+    results.update(serialization_benchmarks(args.repeat))
+    if not args.skip_end_to_end:
+        results.update(end_to_end_benchmarks(args.repeat))
+    write_results(results, args.output)
+    for name, (median, p95) in results.items():
+        print(f"{name:<55} median {median:8.3f} ms  p95 {p95:8.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - manual execution helper
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Gunicorn settings for serving the price comparison app in production.
+
+Run with ``gunicorn --config gunicorn.conf.py``. Worker and thread counts
+come from the environment:
+
+- ``PORT`` (5000)
+- ``WEB_CONCURRENCY``: worker processes (one per CPU)
+- ``GUNICORN_THREADS``: request threads per worker (8)
+- ``GUNICORN_TIMEOUT``: seconds before a stuck worker is restarted (75)
+- ``GUNICORN_GRACEFUL_TIMEOUT``: seconds a stopping worker may drain (30)
+- ``GUNICORN_DRAIN_DELAY``: seconds a stopping worker keeps serving while
+  ``/readyz`` reports it draining (5); part of the graceful timeout
+
+Application settings are read from ``FLASK_*`` variables (see ``create_app``).
+
+The app is imported once in the master (``preload_app``) so workers share
+its code pages, but the master starts no threads, connection pools or
+database handles: each worker starts its own after the fork and drains
+them when it exits.
+"""
+
+from __future__ import annotations
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+wsgi_app = "app:create_app(start_resources=False)"
+preload_app = True
+
+# Reports draining on /readyz before closing its sockets (see gunicorn_worker.py).
+worker_class = "gunicorn_worker.DrainingWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+# Above MAX_COMPARE_DEADLINE, so only genuinely stuck workers are restarted.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "75"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_worker_init(worker) -> None:
+    """Start the worker's own sessions, executor, history writer and cache warmer."""
+
+    from app import init_resources
+
+    init_resources(worker.wsgi)
+
+
+def worker_exit(server, worker) -> None:
+    """Flush history and close connections once the worker has stopped serving.
+
+    gunicorn calls this after the worker loop ended and its accepted
+    requests finished (or ``graceful_timeout`` ran out), so the drain only
+    confirms nothing is left before resources are released.
+    """
+
+    app = getattr(worker, "wsgi", None)
+    if app is None:  # the worker never finished loading the app
+        return
+
+    from app import drain
+
+    drain(app)
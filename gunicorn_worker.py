@@ -0,0 +1,36 @@
+"""gunicorn worker that reports draining on ``/readyz`` before it stops serving."""
+
+from __future__ import annotations
+
+import os
+import threading
+
+from gunicorn.workers.gthread import ThreadWorker
+
+# Seconds a stopping worker keeps serving while ``/readyz`` reports it draining.
+DRAIN_DELAY = float(os.environ.get("GUNICORN_DRAIN_DELAY", "5"))
+
+
+class DrainingWorker(ThreadWorker):
+    """gthread worker that reports itself draining before it stops serving.
+
+    gunicorn's own SIGTERM handler ends the worker loop at once: the
+    listening sockets close and only requests already accepted are
+    finished, so ``/readyz`` never gets to say "draining". This worker
+    marks the app draining first and keeps serving for ``DRAIN_DELAY``
+    seconds, long enough for a load balancer polling ``/readyz`` to take
+    it out of rotation.
+    """
+
+    def handle_exit(self, sig, frame) -> None:
+        app = getattr(self, "wsgi", None)
+        if app is None or DRAIN_DELAY <= 0:
+            super().handle_exit(sig, frame)
+            return
+
+        from app import begin_drain
+
+        begin_drain(app)
+        timer = threading.Timer(DRAIN_DELAY, super().handle_exit, (sig, frame))
+        timer.daemon = True
+        timer.start()
@@ -1,6 +1,31 @@
 """Price fetcher package exposing comparison utilities."""
 
-from .aggregator import compare_prices
+from .aggregator import (
+    cheapest_result,
+    compare_prices,
+    iter_compare_batch,
+    iter_compare_prices,
+    start_cache_warmer,
+    stop_cache_warmer,
+    unique_queries,
+)
 from .base import PriceResult
+from .history import configure_history
+from .httpcache import configure_http_cache
+from .registry import RetailerSpec, configure_retailer, register_retailer
 
-__all__ = ["compare_prices", "PriceResult"]
+__all__ = [
+    "cheapest_result",
+    "compare_prices",
+    "iter_compare_batch",
+    "iter_compare_prices",
+    "start_cache_warmer",
+    "stop_cache_warmer",
+    "unique_queries",
+    "PriceResult",
+    "configure_history",
+    "configure_http_cache",
+    "RetailerSpec",
+    "configure_retailer",
+    "register_retailer",
+]
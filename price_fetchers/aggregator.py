@@ -2,35 +2,506 @@
 
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, TimeoutError as FuturesTimeoutError, as_completed, wait
+from dataclasses import replace
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 
-from .base import PriceResult
-from . import gratis, rossmann
+from .base import PriceResult, normalise_query
+from .breaker import CLOSED, HALF_OPEN, OPEN, BreakerBoard
+from .cache import ResultCache
+from .deadline import Deadline, current_deadline, deadline_scope
+from .executor import busy_result, get_executor
+from .history import get_history
+from .httpcache import get_http_cache
+from .metrics import collect_timings, counter, gauges, histogram
+from .offload import get_extraction_pool
+from .ratelimit import HostBusy
+from .singleflight import SingleFlight, SingleFlightTimeout
+from .registry import Fetcher, LazyFetchers, SettingView, get_spec
+from .warmer import CacheWarmer, PopularityTracker
 
-FETCHERS = {
-    "Rossmann": rossmann.search_product,
-    "Gratis": gratis.search_product,
-}
+# Enabled retailers from the registry; each module is imported on first use.
+FETCHERS: Mapping[str, Fetcher] = LazyFetchers()
 
+RESULT_CACHE = ResultCache(success_ttls=SettingView("cache_ttl"))
+BREAKERS = BreakerBoard()
+# Result error types that count as a retailer failure for its circuit breaker.
+BREAKER_ERROR_TYPES = frozenset({"fetch", "exception"})
+# Result error types caused by our own budget or load, which say nothing about the retailer.
+NEUTRAL_ERROR_TYPES = frozenset({"timeout", "busy"})
+IN_FLIGHT: SingleFlight[PriceResult] = SingleFlight()
+POPULARITY = PopularityTracker()
+COALESCED_WAIT_TIMEOUT = 60.0
+# Budget of a shared live fetch for retailers without their own timeout.
+COALESCED_FETCH_TIMEOUT = 60.0
+BATCH_CONCURRENCY = 8
 
-def compare_prices(query: str) -> List[PriceResult]:
-    """Fetch price information from all retailers sorted by price."""
+_warmer: Optional[CacheWarmer] = None
+_warmer_lock = threading.Lock()
 
-    results: List[PriceResult] = []
-    with ThreadPoolExecutor(max_workers=len(FETCHERS)) as executor:
-        future_map = {executor.submit(fetcher, query): name for name, fetcher in FETCHERS.items()}
-        for future in as_completed(future_map):
-            name = future_map[future]
+LOOKUPS = counter("price_lookups_total", "Retailer lookups by cache status.", ("retailer", "cache"))
+FETCHES = counter(
+    "price_fetches_total",
+    "Live retailer fetches by extraction strategy, or by error type when they failed.",
+    ("retailer", "outcome"),
+)
+FETCH_SECONDS = histogram("price_fetch_seconds", "Duration of live retailer fetches.", ("retailer",))
+TIMEOUTS = counter("price_comparison_timeouts_total", "Retailers cut off by a comparison deadline.", ("retailer",))
+
+
+def compare_prices(query: str, *, deadline: Optional[float] = None, limit: int = 1) -> List[PriceResult]:
+    """Fetch price information from all retailers sorted by price.
+
+    With ``limit`` above one each retailer result also carries up to
+    ``limit - 1`` alternative products taken from the same search page.
+    With a ``deadline`` (seconds) every retailer still running when it
+    expires is reported as a timed-out result while the others are
+    returned as usual.
+    """
+
+    futures, budget = _submit_all(query, deadline, limit)
+    timeout = budget.remaining() if budget is not None else None
+    done, pending = wait(futures, timeout=timeout) if futures else (set(), set())
+    return _collect_results(futures, done, pending)
+
+
+def iter_compare_prices(
+    query: str,
+    *,
+    deadline: Optional[float] = None,
+    limit: int = 1,
+) -> Iterator[PriceResult]:
+    """Yield each retailer's result as soon as it completes.
+
+    Retailers still running when the ``deadline`` expires are yielded last
+    as timed-out results. Results arrive unordered; see :func:`cheapest_result`.
+    """
+
+    futures, budget = _submit_all(query, deadline, limit)
+    timeout = budget.remaining() if budget is not None else None
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            pending.discard(future)
+            yield _completed_result(future, futures[future])
+    except FuturesTimeoutError:
+        for future in pending:
+            yield _completed_result(future, futures[future]) if future.done() else timed_out_result(futures[future])
+
+
+def iter_compare_batch(
+    queries: Iterable[str],
+    *,
+    max_concurrency: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> Iterator[Tuple[str, Union[List[PriceResult], Exception]]]:
+    """Compare many queries, yielding ``(query, results)`` in completion order.
+
+    Queries equal after normalisation are compared once, under the first
+    spelling seen. At most ``max_concurrency`` (default
+    ``BATCH_CONCURRENCY``) queries have lookups on the shared fetch
+    executor at a time, and ``deadline`` bounds the whole batch: retailers
+    still running when it expires are reported as timed out, and queries
+    not started by then have every retailer timed out. A comparison that
+    cannot be scheduled yields the exception in place of its results; the
+    rest of the batch is unaffected.
+    """
+
+    unique = list(unique_queries(queries))
+    if not unique:
+        return
+
+    budget = Deadline(deadline) if deadline is not None else None
+    waiting = iter(unique)
+    comparisons: Dict[str, Dict[Future, str]] = {}
+    running: Dict[Future, str] = {}
+
+    def start_next() -> Iterator[Tuple[str, Exception]]:
+        for query in waiting:
             try:
-                result = future.result()
+                futures, _ = _submit_all(query, budget.remaining() if budget is not None else None)
             except Exception as exc:  # pragma: no cover - runtime guard
-                result = PriceResult(retailer=name, error=str(exc))
-            results.append(result)
+                yield query, exc
+                continue
+            if not futures:  # no retailers enabled
+                yield query, []
+                continue
+            comparisons[query] = futures
+            running.update((future, query) for future in futures)
+            return
+
+    for _ in range(max(1, max_concurrency or BATCH_CONCURRENCY)):
+        yield from start_next()
+
+    while running:
+        timeout = budget.remaining() if budget is not None else None
+        done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            query = running.pop(future)
+            futures = comparisons[query]
+            if not any(pending in running for pending in futures):
+                del comparisons[query]
+                yield query, _collect_results(futures, futures, ())
+                yield from start_next()
+
+    # The batch deadline expired: report what is left as timed out.
+    for query, futures in comparisons.items():
+        finished = [future for future in futures if future.done()]
+        yield query, _collect_results(futures, finished, [future for future in futures if not future.done()])
+    for query in waiting:
+        yield query, [timed_out_result(name) for name in FETCHERS]
+
+
+def unique_queries(queries: Iterable[str]) -> Iterator[str]:
+    """Yield stripped, non-empty queries, skipping normalised duplicates."""
+
+    seen = set()
+    for query in queries:
+        query = query.strip()
+        key = normalise_query(query)
+        if key and key not in seen:
+            seen.add(key)
+            yield query
+
+
+def cheapest_result(results: Iterable[PriceResult]) -> Optional[PriceResult]:
+    """Return the lowest priced successful result, if any."""
+
+    ordered = _order_results(results)
+    return ordered[0] if ordered and ordered[0].is_successful else None
+
+
+def refresh_cached(query: str, retailer: str, limit: int = 1) -> Optional[PriceResult]:
+    """Fetch a retailer result now and store it, keeping the last good price on failure."""
+
+    fetcher = FETCHERS.get(retailer)
+    if fetcher is None:
+        return None
+    return RESULT_CACHE.refresh(
+        query,
+        retailer,
+        lambda: _fetch_coalesced(retailer, fetcher, query, limit),
+        limit=limit,
+    )
+
+
+def start_cache_warmer(**settings: Any) -> CacheWarmer:
+    """Start refreshing the most popular queries before their cache entries expire.
+
+    ``settings`` are passed to :class:`CacheWarmer` (``top_k``,
+    ``lead_time``, ``interval``, ``default_rate``); per-retailer rates come
+    from the registry's ``warm_rate``. Refreshes run on the shared fetch
+    executor, so they obey the same per-retailer concurrency limits.
+    """
+
+    global _warmer
+
+    settings.setdefault("rates", SettingView("warm_rate"))
+    warmer = CacheWarmer(
+        POPULARITY,
+        retailers=lambda: list(FETCHERS),
+        expires_in=lambda query, retailer, limit: RESULT_CACHE.expires_in(query, retailer, limit=limit),
+        dispatch=lambda query, retailer, limit: get_executor().submit(retailer, refresh_cached, query, retailer, limit),
+        **settings,
+    )
+    with _warmer_lock:
+        previous, _warmer = _warmer, warmer
+    if previous is not None:
+        previous.stop()
+    warmer.start()
+    return warmer
+
+
+def stop_cache_warmer() -> None:
+    """Stop the background cache warmer, if running."""
+
+    global _warmer
+
+    with _warmer_lock:
+        previous, _warmer = _warmer, None
+    if previous is not None:
+        previous.stop()
+
+
+def _submit_all(
+    query: str,
+    deadline: Optional[float],
+    limit: int = 1,
+) -> Tuple[Dict[Future, str], Optional[Deadline]]:
+    """Schedule a lookup per retailer on the shared executor under ``deadline``."""
+
+    POPULARITY.hit(query, limit)
+    executor = get_executor()
+    futures = {}
+    with deadline_scope(deadline) as budget:
+        for name, fetcher in FETCHERS.items():
+            futures[executor.submit(name, _lookup, name, fetcher, query, limit)] = name
+    return futures, budget
+
+
+def _fetch_timeout(name: str) -> float:
+    """Return the budget a caller wants for a live fetch.
 
+    That is the retailer's own timeout, cut to the time the caller has
+    left when it runs under a deadline.
+    """
+
+    spec = get_spec(name)
+    timeout = COALESCED_FETCH_TIMEOUT if spec is None or spec.timeout is None else spec.timeout
+    budget = current_deadline()
+    return timeout if budget is None else min(timeout, budget.remaining())
+
+
+def _collect_results(
+    futures: Mapping["Future[PriceResult]", str],
+    done: Iterable["Future[PriceResult]"],
+    pending: Iterable["Future[PriceResult]"],
+) -> List[PriceResult]:
+    results = [_completed_result(future, futures[future]) for future in done]
+    # Fetches still running go on while another caller has time for them, and fill the cache.
+    results.extend(timed_out_result(futures[future]) for future in pending)
+    return _order_results(results)
+
+
+def _completed_result(future: "Future[PriceResult]", name: str) -> PriceResult:
+    try:
+        return future.result()
+    except Exception as exc:  # pragma: no cover - runtime guard
+        return PriceResult(retailer=name, error=str(exc))
+
+
+def timed_out_result(retailer: str) -> PriceResult:
+    """Return the placeholder for a retailer that missed the comparison deadline."""
+
+    TIMEOUTS.inc(retailer)
+    return PriceResult(
+        retailer=retailer,
+        error=f"{retailer} süre sınırı içinde yanıt vermedi",
+        debug={"error_type": "timeout", "timed_out": True},
+    )
+
+
+def _order_results(results: Iterable[PriceResult]) -> List[PriceResult]:
+    """Sort successful results by price, keeping failures at the end."""
+
+    results = list(results)
     successful = sorted(
         (result for result in results if result.is_successful),
         key=lambda result: result.price or float("inf"),
     )
     failed = [result for result in results if not result.is_successful]
     return [*successful, *failed]
+
+
+def _lookup(name: str, fetcher: Fetcher, query: str, limit: int = 1) -> PriceResult:
+    """Serve a retailer result from the cache, fetching it on a miss."""
+
+    result = RESULT_CACHE.get_or_fetch(
+        query,
+        name,
+        lambda: _recent_history(name, query, limit) or _fetch_coalesced(name, fetcher, query, limit),
+        limit=limit,
+    )
+    # The cache hands out copies, so the current breaker state can be recorded.
+    result.debug["breaker"] = BREAKERS.get(name).state
+    LOOKUPS.inc(name, str(result.debug.get("cache", "miss")))
+    return result
+
+
+def _recent_history(name: str, query: str, limit: int) -> Optional[PriceResult]:
+    """Return a price recorded within the retailer's cache TTL, e.g. before a restart."""
+
+    history = get_history()
+    if history is None:
+        return None
+    return history.latest(query, name, limit=limit, max_age=RESULT_CACHE.ttl_for(name))
+
+
+def _fetch_coalesced(name: str, fetcher: Fetcher, query: str, limit: int) -> PriceResult:
+    """Share one live fetch between concurrent lookups of the same query.
+
+    The fetch runs under a budget shared by its callers: the one that
+    started it sets it, and each caller joining later extends it to what
+    that caller has left, so it lasts as long as the most patient caller
+    still waits and no longer. Each caller stops waiting at its own deadline.
+    """
+
+    wanted = _fetch_timeout(name)
+    shared = Deadline(wanted)
+
+    def fetch() -> PriceResult:
+        with deadline_scope(shared):
+            return _guarded_fetch(name, fetcher, query, limit)
+
+    key = RESULT_CACHE.make_key(query, name, limit)
+    budget = current_deadline()
+    timeout = min(COALESCED_WAIT_TIMEOUT, budget.remaining()) if budget is not None else COALESCED_WAIT_TIMEOUT
+    try:
+        return IN_FLIGHT.do(key, fetch, timeout=timeout, shared=shared, join=lambda leader: leader.extend(wanted))
+    except SingleFlightTimeout:
+        return PriceResult(
+            retailer=name,
+            error=f"{name} yanıtı zaman aşımına uğradı",
+            debug={"error_type": "timeout"},
+        )
+
+
+def _guarded_fetch(name: str, fetcher: Fetcher, query: str, limit: int) -> PriceResult:
+    """Run the fetch through the retailer's circuit breaker.
+
+    While the breaker is open the last known result is returned, however
+    old, from the cache or the price history, or a "temporarily
+    unavailable" result when there is none. Fetch
+    failures and unexpected errors count against the breaker; timeouts
+    of the fetch's own budget and our own outbound pacing do not.
+    """
+
+    breaker = BREAKERS.get(name)
+    permit = breaker.allow()
+    if permit is None:
+        fallback = RESULT_CACHE.get(query, name, limit=limit, allow_expired=True)
+        history = get_history()
+        if fallback is None and history is not None:
+            fallback = history.latest(query, name, limit=limit)
+            if fallback is not None:
+                # Tagged like an expired cache entry so it is never cached as fresh.
+                fallback.debug["cache"] = "expired"
+        if fallback is None:
+            fallback = PriceResult(
+                retailer=name,
+                error=f"{name} geçici olarak kullanılamıyor",
+                debug={"error_type": "unavailable"},
+            )
+        fallback.debug["breaker"] = OPEN
+        FETCHES.inc(name, "unavailable")
+        return fallback
+
+    result = _run_fetcher(name, fetcher, query, limit)
+    history = get_history()
+    if history is not None:
+        history.record(query, result, limit=limit)
+    error_type = result.debug.get("error_type") if not result.is_successful else None
+    if error_type in BREAKER_ERROR_TYPES:
+        breaker.record_failure(permit)
+    elif error_type in NEUTRAL_ERROR_TYPES:
+        breaker.release(permit)
+    else:
+        breaker.record_success(permit)
+    return result
+
+
+def _run_fetcher(name: str, fetcher: Fetcher, query: str, limit: int = 1) -> PriceResult:
+    """Call a retailer fetcher, converting unexpected errors into results.
+
+    The seconds spent in each fetch and extraction stage are attached as
+    ``debug["timings"]``, together with the ``total``.
+    """
+
+    with collect_timings(name) as timings:
+        started = time.perf_counter()
+        try:
+            # Only pass ``limit`` when asked for candidates so plain fetchers keep working.
+            result = fetcher(query) if limit == 1 else fetcher(query, limit=limit)
+        except HostBusy:
+            # Our own outbound pacing ran out of time, not the retailer.
+            result = busy_result(name)
+        except Exception as exc:  # pragma: no cover - runtime guard
+            result = PriceResult(retailer=name, error=str(exc), debug={"error_type": "exception"})
+        elapsed = time.perf_counter() - started
+
+    budget = current_deadline()
+    if not result.is_successful and budget is not None and budget.expired:
+        # Failures that ran out of budget say nothing about the retailer.
+        result = replace(result, debug={**result.debug, "error_type": "timeout"})
+
+    timings["total"] = elapsed
+    result.debug["timings"] = {stage: round(seconds, 6) for stage, seconds in timings.items()}
+    FETCH_SECONDS.observe(elapsed, name)
+    if result.is_successful:
+        FETCHES.inc(name, str(result.debug.get("strategy", "unknown")))
+    else:
+        FETCHES.inc(name, str(result.debug.get("error_type", "unknown")))
+    return result
+
+
+def _numeric_stats(stats: Mapping[str, object]) -> Iterator[Tuple[str, float]]:
+    """Yield the numeric entries of a component's stats for the gauges below."""
+
+    for stat, value in stats.items():
+        if isinstance(value, (int, float)):
+            yield stat, float(value)
+
+
+gauges(
+    "price_cache",
+    "Result cache counters and size.",
+    lambda: [("price_cache", {"stat": stat}, value) for stat, value in _numeric_stats(RESULT_CACHE.stats())],
+)
+gauges(
+    "price_singleflight",
+    "Request coalescing counters and in-flight fetches.",
+    lambda: [("price_singleflight", {"stat": stat}, value) for stat, value in _numeric_stats(IN_FLIGHT.stats())],
+)
+gauges(
+    "price_history",
+    "Price history rows queued, written, dropped and pending.",
+    lambda: [
+        ("price_history", {"stat": stat}, value)
+        for stat, value in _numeric_stats(get_history().stats() if get_history() is not None else {})
+    ],
+)
+gauges(
+    "price_http_cache",
+    "Pages stored, revalidated with a 304 and evicted by the HTTP cache.",
+    lambda: [
+        ("price_http_cache", {"stat": stat}, value)
+        for stat, value in _numeric_stats(get_http_cache().stats() if get_http_cache() is not None else {})
+    ],
+)
+gauges(
+    "price_warmer",
+    "Cache warmer backlog, lag in seconds and refresh counters.",
+    lambda: [
+        ("price_warmer", {"stat": stat}, value)
+        for stat, value in _numeric_stats(_warmer.stats() if _warmer is not None else {})
+    ],
+)
+gauges(
+    "price_executor",
+    "Fetch executor running, queued, shed and completed tasks per retailer.",
+    lambda: [
+        ("price_executor", {"retailer": retailer, "stat": stat}, value)
+        for retailer, stats in get_executor().stats().items()
+        for stat, value in _numeric_stats(stats)
+    ],
+)
+gauges(
+    "price_extraction_pool",
+    "Extraction worker processes and pages pending in them.",
+    lambda: [
+        ("price_extraction_pool", {"stat": stat}, value)
+        for stat, value in _numeric_stats(get_extraction_pool().stats() if get_extraction_pool() is not None else {})
+    ],
+)
+gauges(
+    "price_breaker_state",
+    "Circuit breaker state per retailer (1 for the current state).",
+    lambda: [
+        ("price_breaker_state", {"retailer": retailer, "state": state}, float(snapshot["state"] == state))
+        for retailer, snapshot in BREAKERS.snapshot().items()
+        for state in (CLOSED, HALF_OPEN, OPEN)
+    ],
+)
+gauges(
+    "price_breaker",
+    "Circuit breaker failures, trips, rejections and seconds until the next probe.",
+    lambda: [
+        ("price_breaker", {"retailer": retailer, "stat": stat}, value)
+        for retailer, snapshot in BREAKERS.snapshot().items()
+        for stat, value in _numeric_stats(snapshot)
+    ],
+)
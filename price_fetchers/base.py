@@ -2,13 +2,24 @@
 
 from __future__ import annotations
 
+import dataclasses
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Iterable, List, Optional
 
 
-@dataclass
+def normalise_query(query: str) -> str:
+    """Return a canonical form of a search query for keying caches."""
+
+    return " ".join(query.casefold().split())
+
+
+@dataclass(slots=True)
 class PriceResult:
-    """Structured price information returned from a retailer."""
+    """Structured price information returned from a retailer.
+
+    Slotted: thousands of results sit in the caches, and a slotted instance
+    carries no per-object ``__dict__``.
+    """
 
     retailer: str
     product_name: Optional[str] = None
@@ -20,25 +31,35 @@ class PriceResult:
     original_price_text: Optional[str] = None
     error: Optional[str] = None
     debug: dict = field(default_factory=dict)
+    alternatives: List["PriceResult"] = field(default_factory=list)
 
-    def to_dict(self) -> dict:
-        """Return a JSON-serialisable dictionary of the price result."""
-
-        return {
-            "retailer": self.retailer,
-            "product_name": self.product_name,
-            "price": self.price,
-            "currency": self.currency,
-            "product_url": self.product_url,
-            "raw_price_text": self.raw_price_text,
-            "original_price": self.original_price,
-            "original_price_text": self.original_price_text,
-            "error": self.error,
-            "debug": self.debug,
-        }
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> dict:
+        """Return a JSON-serialisable dictionary of the price result.
+
+        ``fields`` limits the output to the named fields, applied to the
+        alternatives as well; ``retailer`` is always included.
+        """
+
+        if fields is None:
+            fields = RESULT_FIELDS
+        elif not isinstance(fields, (frozenset, set)):
+            fields = frozenset(fields)
+        payload = {"retailer": self.retailer}
+        for name in RESULT_FIELDS[1:]:
+            if name not in fields:
+                continue
+            if name == "alternatives":
+                payload[name] = [alternative.to_dict(fields) for alternative in self.alternatives]
+            else:
+                payload[name] = getattr(self, name)
+        return payload
 
     @property
     def is_successful(self) -> bool:
         """True when a price was retrieved without errors."""
 
         return self.error is None and self.price is not None
+
+
+#: Field names of :class:`PriceResult` in serialisation order.
+RESULT_FIELDS = tuple(field.name for field in dataclasses.fields(PriceResult))
@@ -0,0 +1,146 @@
+"""Per-retailer circuit breakers with exponential backoff."""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+FAILURE_THRESHOLD = 5
+BASE_OPEN_SECONDS = 5.0
+MAX_OPEN_SECONDS = 300.0
+
+
+class CircuitBreaker:
+    """Stop calling a retailer after repeated failures and probe its recovery.
+
+    While *closed* every call is allowed and consecutive failures are
+    counted. ``failure_threshold`` of them *open* the breaker: calls are
+    refused until the open period ends. The breaker then goes *half-open*
+    and lets a single probe through. A successful probe closes it again; a
+    failed one re-opens it for twice as long (capped at ``max_open``).
+
+    :meth:`allow` hands out the current generation as a permit, and every
+    change of state starts a new one. An outcome only counts when reported
+    with a permit of the current generation, so calls still in flight from
+    before the breaker opened never move it later, nor stand in for the
+    half-open probe.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        base_open: float = BASE_OPEN_SECONDS,
+        max_open: float = MAX_OPEN_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.base_open = base_open
+        self.max_open = max_open
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._trips = 0
+        self._retry_at = 0.0
+        self._generation = 1
+        self._probe_in_flight = False
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> Optional[int]:
+        """Return a permit when a call may go to the retailer now, else None.
+
+        The permit is passed back with the call's outcome.
+        """
+
+        with self._lock:
+            if self._state == CLOSED:
+                return self._generation
+            if self._state == OPEN and self._clock() >= self._retry_at:
+                self._enter(HALF_OPEN)
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return self._generation
+            self._rejected += 1
+            return None
+
+    def record_success(self, permit: int) -> None:
+        with self._lock:
+            if permit != self._generation:  # let through before the last change of state
+                return
+            if self._state != CLOSED:
+                self._enter(CLOSED)
+            self._failures = 0
+            self._trips = 0
+
+    def record_failure(self, permit: int) -> None:
+        with self._lock:
+            if permit != self._generation:  # let through before the last change of state
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+
+    def release(self, permit: int) -> None:
+        """End a probe whose outcome says nothing about the retailer's health."""
+
+        with self._lock:
+            if self._state == HALF_OPEN and permit == self._generation:
+                self._enter(OPEN)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Return the state, counters and seconds until the next probe."""
+
+        with self._lock:
+            retry_in = max(0.0, self._retry_at - self._clock()) if self._state == OPEN else 0.0
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "trips": self._trips,
+                "rejected": self._rejected,
+                "retry_in": round(retry_in, 3),
+            }
+
+    def _open(self) -> None:
+        self._trips += 1
+        backoff = min(self.max_open, self.base_open * 2 ** (self._trips - 1))
+        # A little jitter keeps several workers from probing in lockstep.
+        self._retry_at = self._clock() + backoff * random.uniform(0.9, 1.1)
+        self._enter(OPEN)
+
+    def _enter(self, state: str) -> None:
+        self._state = state
+        self._generation += 1
+        self._probe_in_flight = False
+
+
+class BreakerBoard:
+    """Lazily created circuit breaker per retailer."""
+
+    def __init__(self, **settings: float) -> None:
+        self._settings = settings
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, retailer: str) -> CircuitBreaker:
+        breaker = self._breakers.get(retailer)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(retailer, CircuitBreaker(**self._settings))
+        return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.snapshot() for name, breaker in breakers.items()}
@@ -0,0 +1,243 @@
+"""Bounded in-process cache of per-retailer price results."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from .base import PriceResult, normalise_query
+
+logger = logging.getLogger(__name__)
+
+SUCCESS_TTL = 300.0
+FAILURE_TTL = 30.0
+STALE_TTL = 600.0
+MAX_ENTRIES = 2048
+# Outcomes that describe our own load or budget rather than the retailer.
+UNCACHEABLE_ERROR_TYPES = frozenset({"timeout", "busy", "unavailable"})
+
+CacheKey = Tuple[str, str, int]
+
+
+@dataclass
+class _Entry:
+    result: PriceResult
+    expires_at: float
+    stale_until: float
+    refreshing: bool = False
+
+
+class ResultCache:
+    """TTL + LRU cache keyed by normalised query, retailer and candidate limit.
+
+    Successful results live for ``success_ttl`` seconds and failures for
+    ``failure_ttl``. Once a successful entry expires it is still served for
+    another ``stale_ttl`` seconds while a single background refresh replaces
+    it (stale-while-revalidate). The least recently used entry is evicted
+    when ``max_entries`` is exceeded. ``success_ttls`` overrides the success
+    TTL per retailer name. A result carrying ``debug["age"]`` (seconds since
+    it was observed, e.g. one read back from the price history) only stays
+    fresh for what is left of its TTL.
+    """
+
+    def __init__(
+        self,
+        *,
+        success_ttl: float = SUCCESS_TTL,
+        failure_ttl: float = FAILURE_TTL,
+        stale_ttl: float = STALE_TTL,
+        max_entries: int = MAX_ENTRIES,
+        success_ttls: Optional[Mapping[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.success_ttl = success_ttl
+        self.failure_ttl = failure_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.success_ttls: Mapping[str, float] = success_ttls if success_ttls is not None else {}
+        self._clock = clock
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+
+    @staticmethod
+    def make_key(query: str, retailer: str, limit: int = 1) -> CacheKey:
+        return normalise_query(query), retailer, limit
+
+    def get_or_fetch(
+        self,
+        query: str,
+        retailer: str,
+        loader: Callable[[], PriceResult],
+        *,
+        limit: int = 1,
+    ) -> PriceResult:
+        """Return a cached result or call ``loader`` and cache its outcome."""
+
+        key = self.make_key(query, retailer, limit)
+        refresh = False
+        with self._lock:
+            entry = self._entries.get(key)
+            now = self._clock()
+            if entry is not None and now < entry.expires_at:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return _tag(entry.result, "hit")
+            if entry is not None and now < entry.stale_until:
+                self._entries.move_to_end(key)
+                self._counters["stale_hits"] += 1
+                if not entry.refreshing:
+                    entry.refreshing = True
+                    refresh = True
+                stale = entry.result
+            else:
+                self._counters["misses"] += 1
+                stale = None
+
+        if stale is not None:
+            if refresh:
+                threading.Thread(
+                    target=self._refresh,
+                    args=(key, loader),
+                    name=f"cache-refresh-{retailer}",
+                    daemon=True,
+                ).start()
+            return _tag(stale, "stale")
+
+        result = loader()
+        self.put(query, retailer, result, limit=limit)
+        # Loaders may themselves answer from the cache (e.g. an open breaker).
+        return _tag(result, result.debug.get("cache", "miss"))
+
+    def get(
+        self,
+        query: str,
+        retailer: str,
+        *,
+        limit: int = 1,
+        allow_stale: bool = False,
+        allow_expired: bool = False,
+    ) -> Optional[PriceResult]:
+        """Return the cached result without loading, or ``None``.
+
+        ``allow_stale`` also accepts entries inside the stale window;
+        ``allow_expired`` accepts any successful entry still held, however old.
+        """
+
+        key = self.make_key(query, retailer, limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            now = self._clock()
+            if now < entry.expires_at:
+                return _tag(entry.result, "hit")
+            if allow_stale and now < entry.stale_until:
+                return _tag(entry.result, "stale")
+            if allow_expired and entry.result.is_successful:
+                return _tag(entry.result, "expired")
+        return None
+
+    def put(self, query: str, retailer: str, result: PriceResult, *, limit: int = 1) -> None:
+        """Store ``result`` with the TTL that matches its outcome."""
+
+        if result.debug.get("error_type") in UNCACHEABLE_ERROR_TYPES or result.debug.get("cache") == "expired":
+            return
+
+        key = self.make_key(query, retailer, limit)
+        now = self._clock()
+        if result.is_successful:
+            expires_at = now + max(0.0, self.ttl_for(retailer) - float(result.debug.get("age", 0.0)))
+            stale_until = expires_at + self.stale_ttl
+        else:
+            expires_at = stale_until = now + self.failure_ttl
+
+        with self._lock:
+            self._entries[key] = _Entry(result=result, expires_at=expires_at, stale_until=stale_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def expires_in(self, query: str, retailer: str, *, limit: int = 1) -> Optional[float]:
+        """Return seconds until a successful entry expires (negative once stale), or ``None``."""
+
+        key = self.make_key(query, retailer, limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry.result.is_successful:
+                return None
+            return entry.expires_at - self._clock()
+
+    def refresh(
+        self,
+        query: str,
+        retailer: str,
+        loader: Callable[[], PriceResult],
+        *,
+        limit: int = 1,
+    ) -> Optional[PriceResult]:
+        """Reload an entry now, keeping the last good price if the reload fails."""
+
+        return self._refresh(self.make_key(query, retailer, limit), loader)
+
+    def ttl_for(self, retailer: str) -> float:
+        """Return how long a successful result for ``retailer`` stays fresh."""
+
+        return self.success_ttls.get(retailer, self.success_ttl)
+
+    def clear(self) -> None:
+        """Drop every entry; counters are kept."""
+
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of the cache counters and current size."""
+
+        with self._lock:
+            return {**self._counters, "size": len(self._entries)}
+
+    def _refresh(self, key: CacheKey, loader: Callable[[], PriceResult]) -> Optional[PriceResult]:
+        query, retailer, limit = key
+        try:
+            result = loader()
+        except Exception:  # pragma: no cover - loaders normally return error results
+            logger.exception("Background refresh failed for %s / %s", retailer, query)
+            with self._lock:
+                self._counters["refresh_errors"] += 1
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+            return None
+
+        with self._lock:
+            self._counters["refreshes"] += 1
+            entry = self._entries.get(key)
+        if not result.is_successful and entry is not None and entry.result.is_successful:
+            # Keep serving the last good price rather than replacing it with an error.
+            with self._lock:
+                self._counters["refresh_errors"] += 1
+                entry.refreshing = False
+            return result
+        self.put(query, retailer, result, limit=limit)
+        return result
+
+
+def _tag(result: PriceResult, status: str) -> PriceResult:
+    """Return a copy of ``result`` recording how the cache served it."""
+
+    return replace(result, debug={**result.debug, "cache": status})
@@ -0,0 +1,60 @@
+"""End-to-end time budgets propagated through the fetch stack."""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Union
+
+
+class Deadline:
+    """A point in monotonic time by which a comparison must finish."""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, seconds: float) -> None:
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Return the seconds left, never less than zero."""
+
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def extend(self, seconds: float) -> None:
+        """Move the expiry to ``seconds`` from now, unless it is already later."""
+
+        self.expires_at = max(self.expires_at, time.monotonic() + seconds)
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("price_fetchers_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the deadline active in this context, if any."""
+
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(seconds: Union[float, Deadline, None]) -> Iterator[Optional[Deadline]]:
+    """Make a deadline of ``seconds``, or the given deadline, current for the block.
+
+    Work submitted to the shared fetch executor inside the block inherits
+    the deadline. ``None`` leaves the current deadline untouched.
+    """
+
+    if seconds is None:
+        yield current_deadline()
+        return
+
+    deadline = seconds if isinstance(seconds, Deadline) else Deadline(seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
@@ -0,0 +1,232 @@
+"""Fast extraction of JSON arrays embedded in retailer page markup.
+
+Retailers ship their search results inside the HTML, either as a plain
+JavaScript literal (Rossmann's ``initialProducts: [...]``) or inside the
+JSON-encoded string of a Next.js flight chunk (Gratis's
+``products\\":[...]``). Both are decoded with the C-accelerated ``json``
+scanner starting at the array itself, so the page is never walked one
+character at a time in Python and the payload is never sliced out first.
+
+:class:`ArrayWatch` follows a page while it downloads and tells when the
+array is complete, so the rest of the page need not be fetched.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from json.decoder import scanstring
+from typing import Any, List, Optional, Tuple
+
+from .metrics import span
+
+logger = logging.getLogger(__name__)
+
+_DECODER = json.JSONDecoder()
+
+# What ArrayWatch needs to see of a page: brackets, and strings skipped
+# whole so the brackets inside them do not count. ``_*_REST`` matches the
+# rest of a string up to its closing quote; a lone quote is a string that
+# runs past the text scanned so far. In the escaped form a quote is ``\"``
+# and an escape inside a string is an escaped backslash followed by one
+# escaped or plain character.
+_PLAIN_REST = r'[^"\\]*(?:\\.[^"\\]*)*"'
+_ESCAPED_REST = r'[^\\]*(?:(?:\\\\(?:\\.|[^\\])|\\[^"\\])[^\\]*)*\\"'
+_PLAIN_TOKENS = re.compile(rf'"{_PLAIN_REST}|([\[\]{{}}]|")', re.DOTALL)
+_ESCAPED_TOKENS = re.compile(rf'\\"{_ESCAPED_REST}|([\[\]{{}}]|\\")', re.DOTALL)
+_PLAIN_STRING_END = re.compile(_PLAIN_REST, re.DOTALL)
+_ESCAPED_STRING_END = re.compile(_ESCAPED_REST, re.DOTALL)
+_LONGEST_ESCAPE = len("\\\\\\u0000")
+_CUT_UNICODE_ESCAPE = re.compile(r"\\u[0-9a-fA-F]{0,3}\Z")
+
+
+def extract_json_array(text: str, marker: str, *, escaped: bool = False) -> List[Any]:
+    """Return the JSON array following ``marker`` in ``text``, or ``[]``.
+
+    With ``escaped=False`` the array is decoded in place from the first
+    ``[`` after the marker. With ``escaped=True`` the array is part of a
+    JSON string literal (``\\"`` for quotes): the rest of that literal is
+    unescaped in a single pass and the array decoded from its start. A page
+    cut short by :class:`ArrayWatch` may end inside that literal, which is
+    then closed after its last complete escape.
+    """
+
+    with span("embedded"):
+        return _extract_json_array(text, marker, escaped)
+
+
+@dataclass(frozen=True)
+class EmbeddedArray:
+    """Where a retailer embeds its products: the array after ``marker``."""
+
+    marker: str
+    escaped: bool = False
+
+    def extract(self, text: str) -> List[Any]:
+        return extract_json_array(text, self.marker, escaped=self.escaped)
+
+    def watch(self) -> "ArrayWatch":
+        """Return a fresh watch for one download of a page."""
+
+        return ArrayWatch(self.marker, escaped=self.escaped)
+
+
+class ArrayWatch:
+    """Watch a page arrive in parts until the array after ``marker`` is complete.
+
+    ``feed`` is given every decoded part received so far, the newest last.
+    The marker is searched for in the new part only (plus the few
+    characters before it). After it, each part is scanned once for
+    brackets, skipping over strings and carrying the nesting depth and
+    whether a string is open into the next part, so the watch fires on the
+    part holding the array's closing ``]`` without decoding anything. In
+    escaped mode the escaped form is scanned as is, so the download can
+    stop before the enclosing string literal ends. An array holding no
+    objects, arrays or strings (such as ``[]``) has nothing to extract: the
+    watch then never fires, and the page is read to the end for the other
+    extraction strategies.
+    """
+
+    def __init__(self, marker: str, *, escaped: bool = False) -> None:
+        self.marker = marker
+        self.escaped = escaped
+        self._tail = ""
+        self._found = False
+        self._carry = ""
+        self._quote = '\\"' if escaped else '"'
+        self._string_end = _ESCAPED_STRING_END if escaped else _PLAIN_STRING_END
+        self._tokens = _ESCAPED_TOKENS if escaped else _PLAIN_TOKENS
+        self._in_string = False
+        self._depth = 0
+        self._items = False
+        self._closed = False
+        self._done = False
+
+    @property
+    def done(self) -> bool:
+        """Whether the watch has fired."""
+
+        return self._done
+
+    def feed(self, parts: List[str]) -> bool:
+        """Return True once ``"".join(parts)`` holds the whole array."""
+
+        if self._closed:
+            return self._done
+        part = parts[-1]
+        if not self._found:
+            window = self._tail + part
+            found = window.find(self.marker)
+            if found == -1:
+                self._tail = window[-(len(self.marker) - 1) :] if len(self.marker) > 1 else ""
+                return False
+            self._found = True
+            part = window[found + len(self.marker) - 1 :]
+        self._closed = self._scan(self._carry + part)
+        self._done = self._closed and self._items
+        return self._done
+
+    def _scan(self, text: str) -> bool:
+        # A backslash near the end may start an escape completed by the
+        # next part: that run of backslashes onwards is scanned again with
+        # the next part, and only tentatively now (a closing bracket in it
+        # is final whatever the escape turns out to be).
+        cut = text.rfind("\\", max(0, len(text) - _LONGEST_ESCAPE))
+        if cut == -1:
+            self._carry = ""
+        else:
+            while cut and text[cut - 1] == "\\":
+                cut -= 1
+            text, self._carry = text[:cut], text[cut:]
+
+        state = (self._in_string, self._depth, self._items)
+        closed, *state = self._walk(text, *state)
+        self._in_string, self._depth, self._items = state
+        if not closed and self._carry:
+            closed, _, _, self._items = self._walk(self._carry, *state)
+        return closed
+
+    def _walk(self, text: str, in_string: bool, depth: int, items: bool) -> Tuple[bool, bool, int, bool]:
+        """Scan ``text`` from the given state; return whether the array closed and the new state."""
+
+        pos = 0
+        if in_string:
+            rest = self._string_end.match(text)
+            if rest is None:
+                return False, True, depth, items
+            pos = rest.end()
+        quote = self._quote
+        for bracket in self._tokens.findall(text, pos):
+            if bracket == quote:
+                return False, True, depth, items or depth > 0
+            if bracket == "[" or (bracket == "{" and depth):
+                items = items or depth > 0
+                depth += 1
+            elif (bracket == "]" or bracket == "}") and depth:
+                depth -= 1
+                if not depth:
+                    return True, False, depth, items
+            elif not bracket and depth:  # a whole string
+                items = True
+        return False, False, depth, items
+
+
+def _extract_json_array(text: str, marker: str, escaped: bool) -> List[Any]:
+    marker_index = text.find(marker)
+    if marker_index == -1:
+        return []
+
+    try:
+        data = _decode_array(text, marker_index, marker, escaped)
+    except ValueError:
+        logger.debug("Embedded JSON array after %r could not be decoded", marker, exc_info=True)
+        return []
+
+    return data if isinstance(data, list) else []
+
+
+def _decode_array(text: str, marker_index: int, marker: str, escaped: bool) -> Optional[Any]:
+    """Decode the value starting at the first ``[`` after the marker at ``marker_index``.
+
+    Returns ``None`` when there is no ``[``; raises ``ValueError`` when
+    the value is malformed or incomplete.
+    """
+
+    start = text.find("[", marker_index + len(marker) - 1)
+    if start == -1:
+        return None
+
+    if escaped:
+        # scanstring decodes from ``start`` up to the closing quote of the
+        # enclosing literal, which always lies after the end of the array.
+        try:
+            unescaped, _ = scanstring(text, start, False)
+        except ValueError:
+            # A download stopped by ArrayWatch ends inside the literal:
+            # close it after the last complete escape and decode that.
+            unescaped, _ = scanstring(_close_literal(text[start:]), 0, False)
+        data, _ = _DECODER.raw_decode(unescaped)
+    else:
+        data, _ = _DECODER.raw_decode(text, start)
+    return data
+
+
+def _close_literal(fragment: str) -> str:
+    """Terminate an unfinished string literal body, dropping a cut-off escape."""
+
+    end = len(fragment)
+    cut = _CUT_UNICODE_ESCAPE.search(fragment, max(0, end - 6))
+    if cut and _backslashes_before(fragment, cut.start()) % 2 == 0:
+        end = cut.start()
+    elif _backslashes_before(fragment, end) % 2:
+        end -= 1
+    return fragment[:end] + '"'
+
+
+def _backslashes_before(text: str, end: int) -> int:
+    start = end
+    while start and text[start - 1] == "\\":
+        start -= 1
+    return end - start
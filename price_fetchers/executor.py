@@ -0,0 +1,201 @@
+"""Process-wide executor bounding outbound retailer concurrency."""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Mapping, Optional, Tuple
+
+from .base import PriceResult
+from .registry import SettingView
+
+logger = logging.getLogger(__name__)
+
+MAX_IN_FLIGHT = 32
+RETAILER_CONCURRENCY = 8
+MAX_QUEUE_DEPTH = 32
+
+_Task = Tuple[Future, Callable[..., PriceResult], Tuple[Any, ...]]
+
+
+@dataclass
+class _RetailerState:
+    limit: int
+    running: int = 0
+    queue: Deque[_Task] = field(default_factory=deque)
+    shed: int = 0
+    completed: int = 0
+
+
+class FetchExecutor:
+    """Shared thread pool with a global and a per-retailer in-flight limit.
+
+    At most ``max_in_flight`` fetches run at once across all retailers and at
+    most ``retailer_concurrency`` for any single retailer. Work beyond a
+    retailer's limit waits in that retailer's own queue, so a slow retailer
+    never occupies threads the others need. When a queue already holds
+    ``max_queue_depth`` tasks, new work is shed immediately with a "busy"
+    result instead of waiting.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        retailer_concurrency: int = RETAILER_CONCURRENCY,
+        max_queue_depth: int = MAX_QUEUE_DEPTH,
+        retailer_limits: Optional[Mapping[str, int]] = None,
+    ) -> None:
+        if max_in_flight < 1 or retailer_concurrency < 1:
+            raise ValueError("concurrency limits must be at least 1")
+        self.max_in_flight = max_in_flight
+        self.retailer_concurrency = retailer_concurrency
+        self.max_queue_depth = max_queue_depth
+        self._retailer_limits: Mapping[str, int] = retailer_limits if retailer_limits is not None else {}
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="price-fetch")
+        self._states: Dict[str, _RetailerState] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, retailer: str, fn: Callable[..., PriceResult], *args: Any) -> "Future[PriceResult]":
+        """Schedule ``fn(*args)`` for ``retailer`` and return its future.
+
+        The call runs in a copy of the caller's context, so context variables
+        such as the comparison deadline follow the work onto the pool.
+        """
+
+        future: "Future[PriceResult]" = Future()
+        task: _Task = (future, contextvars.copy_context().run, (fn, *args))
+        with self._lock:
+            state = self._state(retailer)
+            if state.running < state.limit:
+                state.running += 1
+                self._dispatch(retailer, task)
+            elif len(state.queue) >= self.max_queue_depth:
+                state.shed += 1
+                future.set_result(busy_result(retailer))
+            else:
+                state.queue.append(task)
+        return future
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return running, queued, shed and completed counts per retailer."""
+
+        with self._lock:
+            return {
+                name: {
+                    "running": state.running,
+                    "queued": len(state.queue),
+                    "limit": state.limit,
+                    "shed": state.shed,
+                    "completed": state.completed,
+                }
+                for name, state in self._states.items()
+            }
+
+    def queue_depth(self, retailer: Optional[str] = None) -> int:
+        """Return tasks waiting for a retailer slot, for one or all retailers."""
+
+        with self._lock:
+            if retailer is not None:
+                state = self._states.get(retailer)
+                return len(state.queue) if state else 0
+            return sum(len(state.queue) for state in self._states.values())
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        """Stop accepting work, failing queued tasks, and optionally wait for running ones."""
+
+        with self._lock:
+            pending = [task for state in self._states.values() for task in state.queue]
+            for state in self._states.values():
+                state.queue.clear()
+        for future, _fn, _args in pending:
+            future.cancel()
+        self._pool.shutdown(wait=wait)
+
+    def _state(self, retailer: str) -> _RetailerState:
+        # Re-read the limit on every submit so retailer tuning applies live.
+        limit = self._retailer_limits.get(retailer, self.retailer_concurrency)
+        state = self._states.get(retailer)
+        if state is None:
+            state = self._states[retailer] = _RetailerState(limit=limit)
+        else:
+            state.limit = limit
+        return state
+
+    def _dispatch(self, retailer: str, task: _Task) -> None:
+        try:
+            self._pool.submit(self._run, retailer, task)
+        except RuntimeError as exc:  # pool already shut down
+            self._states[retailer].running -= 1
+            task[0].set_exception(exc)
+
+    def _run(self, retailer: str, task: _Task) -> None:
+        future, fn, args = task
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as exc:
+                    future.set_exception(exc)
+        finally:
+            with self._lock:
+                state = self._states[retailer]
+                state.completed += 1
+                if state.queue:
+                    self._dispatch(retailer, state.queue.popleft())
+                else:
+                    state.running -= 1
+
+
+def busy_result(retailer: str) -> PriceResult:
+    """Return the fast failure used when a retailer's queue is saturated."""
+
+    return PriceResult(
+        retailer=retailer,
+        error=f"{retailer} şu anda yoğun, lütfen biraz sonra tekrar deneyin",
+        debug={"error_type": "busy"},
+    )
+
+
+_executor: Optional[FetchExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> FetchExecutor:
+    """Return the process-wide executor, creating it on first use."""
+
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = FetchExecutor(retailer_limits=SettingView("concurrency"))
+    return _executor
+
+
+def configure_executor(**kwargs: Any) -> FetchExecutor:
+    """Replace the process-wide executor with one built from ``kwargs``."""
+
+    global _executor
+
+    kwargs.setdefault("retailer_limits", SettingView("concurrency"))
+    with _executor_lock:
+        previous, _executor = _executor, FetchExecutor(**kwargs)
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return _executor
+
+
+def shutdown_executor(*, wait: bool = True) -> None:
+    """Shut down the process-wide executor; the next use creates a fresh one."""
+
+    global _executor
+
+    with _executor_lock:
+        previous, _executor = _executor, None
+    if previous is not None:
+        previous.shutdown(wait=wait)
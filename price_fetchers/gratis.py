@@ -2,20 +2,37 @@
 
 from __future__ import annotations
 
-import json
 import logging
-from typing import Any, Dict, List
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
+from bs4 import Tag
 
 from .base import PriceResult
-from .utils import FetchError, fetch_html, find_price_candidates, parse_json_ld_products, parse_price
+from .embedded import EmbeddedArray
+from .utils import (
+    FetchError,
+    ParsedPage,
+    fetch_html,
+    iter_price_elements,
+    iter_unique_results,
+    memoize_extraction,
+    parse_json_ld_products,
+    parse_price,
+)
 
 logger = logging.getLogger(__name__)
 
+RETAILER = "Gratis"
 BASE_URL = "https://www.gratis.com"
 SEARCH_PATH = "/search"
+EMBEDDED_PRODUCTS_MARKER = 'products\\":['
+EMBEDDED_PRODUCTS = EmbeddedArray(EMBEDDED_PRODUCTS_MARKER, escaped=True)
+GENERIC_NAMES = ("Anasayfa", "Ürün", "Product")
+NAME_SELECTORS = (".product-name", ".product-title", "[class*='name']", "[class*='title']")
+# Ancestors of a price element searched for a product name (its card, not the page).
+NAME_SEARCH_DEPTH = 2
 PRICE_SELECTORS = [
     "span.text-primary-900",  # Based on debug output
     "[class*='text-primary-900']",
@@ -39,178 +56,179 @@ PRICE_SELECTORS = [
 ]
 
 
-def search_product(query: str) -> PriceResult:
-    """Return pricing information for the first product match on Gratis."""
+def search_product(query: str, *, limit: int = 1) -> PriceResult:
+    """Return pricing information for the first product match on Gratis.
+
+    With ``limit`` above one, up to ``limit - 1`` further matches from the
+    same page are attached as ``alternatives``.
+    """
 
-    retailer = "Gratis"
     try:
         html, final_url = fetch_html(
             urljoin(BASE_URL, SEARCH_PATH),
             params={"q": query},
             allow_insecure_ssl=True,
+            stream_until=EMBEDDED_PRODUCTS,
         )
     except FetchError as exc:
-        return PriceResult(retailer=retailer, error=f"Gratis isteği başarısız: {exc}")
+        return PriceResult(
+            retailer=RETAILER,
+            error=f"Gratis isteği başarısız: {exc}",
+            debug={"error_type": "fetch"},
+        )
+
+    return _build_result(html, final_url, limit)
+
+
+@memoize_extraction
+def _build_result(html: str, final_url: str, limit: int = 1) -> PriceResult:
+    """Extract up to ``limit`` priced products from a Gratis search page.
+
+    The first product becomes the result; any further ones are attached as
+    its ``alternatives``.
+    """
+
+    page = ParsedPage(html)
+    results = list(islice(iter_unique_results(_iter_results(page, final_url)), limit))
+    if not results:
+        return PriceResult(
+            retailer=RETAILER,
+            error="Gratis sitesinde sonuç bulunamadı",
+            debug={"source_url": final_url, "strategy": "html-selectors", "error_type": "not_found"},
+        )
+    best, *alternatives = results
+    best.alternatives = alternatives
+    return best
+
 
+def _iter_results(page: ParsedPage, final_url: str) -> Iterator[PriceResult]:
+    """Lazily yield priced products from the first strategy that finds any."""
+
+    for strategy in (_iter_json_ld_results, _iter_embedded_results, _iter_selector_results):
+        found = False
+        for result in strategy(page, final_url):
+            found = True
+            yield result
+        if found:
+            return
+
+
+def _iter_json_ld_results(page: ParsedPage, final_url: str) -> Iterator[PriceResult]:
     debug = {"source_url": final_url, "strategy": "json-ld"}
-    for product in parse_json_ld_products(html):
+    for product in parse_json_ld_products(page):
         price = product.price or parse_price(product.raw_price_text or "")
         if price is None:
             continue
         product_url = product.url
         if product_url:
             product_url = urljoin(BASE_URL, product_url)
-        return PriceResult(
-            retailer=retailer,
+        yield PriceResult(
+            retailer=RETAILER,
             product_name=product.name,
             price=price,
             currency=product.currency or "TRY",
             product_url=product_url,
             raw_price_text=product.raw_price_text,
-            debug=debug,
+            debug=dict(debug),
+        )
+
+
+def _iter_embedded_results(page: ParsedPage, final_url: str) -> Iterator[PriceResult]:
+    debug = {"source_url": final_url, "strategy": "embedded-json"}
+    for product in _extract_products_from_embedded_state(page.html):
+        price_info = product.get("prices", {})
+        raw_price_text = (
+            price_info.get("discountedPriceLabel")
+            or price_info.get("promotionPriceLabel")
+            or price_info.get("normalPriceLabel")
         )
 
-    embedded_products = _extract_products_from_embedded_state(html)
-    if embedded_products:
-        debug = {"source_url": final_url, "strategy": "embedded-json"}
-        for product in embedded_products:
-            price_info = product.get("prices", {})
+        discounted_price = _normalise_price(price_info.get("discountedPrice"))
+        promotional_price = _normalise_price(price_info.get("promotionPrice"))
+        normal_price = _normalise_price(price_info.get("normalPrice"))
+
+        price = _first_non_none(discounted_price, promotional_price, normal_price)
+        if price is None and raw_price_text:
+            price = parse_price(raw_price_text)
+        if price is None:
+            continue
+
+        attributes = product.get("attributes", {})
+        product_name = attributes.get("displayName") or product.get("analytics", {}).get("name")
+        if not product_name:
+            continue
+
+        product_url = product.get("shareLink") or product.get("url")
+        if product_url:
+            product_url = urljoin(BASE_URL, product_url)
+
+        currency = price_info.get("currency") or "TRY"
+
+        original_price = normal_price
+        original_price_text = price_info.get("normalPriceLabel") or _format_price(original_price)
+
+        if original_price is not None and price is not None and abs(original_price - price) < 0.01:
+            original_price = None
+            original_price_text = None
+
+        if raw_price_text is None:
             raw_price_text = (
                 price_info.get("discountedPriceLabel")
                 or price_info.get("promotionPriceLabel")
-                or price_info.get("normalPriceLabel")
+                or _format_price(price)
             )
 
-            discounted_price = _normalise_price(price_info.get("discountedPrice"))
-            promotional_price = _normalise_price(price_info.get("promotionPrice"))
-            normal_price = _normalise_price(price_info.get("normalPrice"))
-
-            price = _first_non_none(discounted_price, promotional_price, normal_price)
-            if price is None and raw_price_text:
-                price = parse_price(raw_price_text)
-            if price is None:
-                continue
-
-            attributes = product.get("attributes", {})
-            product_name = attributes.get("displayName") or product.get("analytics", {}).get("name")
-            if not product_name:
-                continue
-
-            product_url = product.get("shareLink") or product.get("url")
-            if product_url:
-                product_url = urljoin(BASE_URL, product_url)
-
-            currency = price_info.get("currency") or "TRY"
-
-            original_price = normal_price
-            original_price_text = price_info.get("normalPriceLabel") or _format_price(original_price)
-
-            if original_price is not None and price is not None and abs(original_price - price) < 0.01:
-                original_price = None
-                original_price_text = None
-
-            if raw_price_text is None:
-                raw_price_text = (
-                    price_info.get("discountedPriceLabel")
-                    or price_info.get("promotionPriceLabel")
-                    or _format_price(price)
-                )
-
-            return PriceResult(
-                retailer=retailer,
-                product_name=product_name,
-                price=price,
-                currency=currency,
-                product_url=product_url,
-                raw_price_text=raw_price_text,
-                original_price=original_price,
-                original_price_text=original_price_text,
-                debug={**debug, "product_id": product.get("id")},
-            )
+        yield PriceResult(
+            retailer=RETAILER,
+            product_name=product_name,
+            price=price,
+            currency=currency,
+            product_url=product_url,
+            raw_price_text=raw_price_text,
+            original_price=original_price,
+            original_price_text=original_price_text,
+            debug={**debug, "product_id": product.get("id")},
+        )
+
 
-    debug["strategy"] = "html-selectors"
-    soup = BeautifulSoup(html, "html.parser")
-    for name, price_text, url in find_price_candidates(soup, PRICE_SELECTORS):
+def _iter_selector_results(page: ParsedPage, final_url: str) -> Iterator[PriceResult]:
+    debug = {"source_url": final_url, "strategy": "html-selectors"}
+    for name, price_text, url, element in iter_price_elements(page.soup, PRICE_SELECTORS):
         price = parse_price(price_text)
         if price is None:
             continue
-        
+
         # Try to find a better product name if current one is generic
-        if name in ["Anasayfa", "Ürün", "Product"] or len(name) < 3:
-            # Look for product names in nearby elements
-            price_element = soup.find(string=lambda text: text and price_text in text)
-            if price_element:
-                parent = price_element.parent
-                # Look for product name in parent or nearby elements
-                for selector in [".product-name", ".product-title", "[class*='name']", "[class*='title']"]:
-                    name_element = parent.select_one(selector) if parent else None
-                    if name_element and name_element.get_text(strip=True):
-                        name = name_element.get_text(strip=True)
-                        break
-        
+        if name in GENERIC_NAMES or len(name) < 3:
+            name = _nearby_name(element) or name
+
         product_url = urljoin(BASE_URL, url) if url else None
-        return PriceResult(
-            retailer=retailer,
-            product_name=name if name and name not in ["Anasayfa", "Ürün", "Product"] else f"Gratis Ürünü",
+        yield PriceResult(
+            retailer=RETAILER,
+            product_name=name if name and name not in GENERIC_NAMES else f"Gratis Ürünü",
             price=price,
             currency="TRY",
             product_url=product_url,
             raw_price_text=price_text,
-            debug=debug,
+            debug=dict(debug),
         )
 
-    return PriceResult(
-        retailer=retailer,
-        error="Gratis sitesinde sonuç bulunamadı",
-        debug=debug,
-    )
+
+def _nearby_name(element: Tag) -> Optional[str]:
+    """Look for a product name inside the price element or the few elements around it."""
+
+    for container in (element, *islice(element.parents, NAME_SEARCH_DEPTH)):
+        for selector in NAME_SELECTORS:
+            name_element = container.select_one(selector)
+            if name_element and name_element.get_text(strip=True):
+                return name_element.get_text(strip=True)
+    return None
 
 
 def _extract_products_from_embedded_state(html: str) -> List[Dict[str, Any]]:
     """Parse the embedded Next.js flight payload for product information."""
 
-    marker = 'products\\":['
-    start_idx = html.find(marker)
-    if start_idx == -1:
-        return []
-
-    start = start_idx + len('products\\":')
-    end = start
-    depth = 0
-    length = len(html)
-    while end < length:
-        char = html[end]
-        if char == "[":
-            depth += 1
-        elif char == "]":
-            depth -= 1
-            if depth == 0:
-                end += 1
-                break
-        elif char == "\\":
-            end += 1  # skip escaped character
-        end += 1
-
-    if depth != 0:
-        logger.debug("Failed to locate complete embedded products array in Gratis response")
-        return []
-
-    escaped_payload = html[start:end]
-    try:
-        decoded = bytes(escaped_payload, "utf-8").decode("unicode_escape")
-        try:
-            decoded = decoded.encode("latin-1").decode("utf-8")
-        except UnicodeEncodeError:
-            pass
-        data = json.loads(decoded)
-        if isinstance(data, list):
-            return data
-    except json.JSONDecodeError:
-        logger.debug("Gratis embedded payload JSON decoding failed", exc_info=True)
-    except UnicodeDecodeError:
-        logger.debug("Gratis embedded payload unicode decoding failed", exc_info=True)
-
-    return []
+    return EMBEDDED_PRODUCTS.extract(html)
 
 
 def _normalise_price(value: Any) -> Optional[float]:
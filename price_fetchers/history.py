@@ -0,0 +1,413 @@
+"""Append-only price history kept in SQLite.
+
+Every successful live fetch is queued by :meth:`HistoryStore.record` and
+written by a background thread in batched transactions, so requests never
+wait on the disk. The database runs in WAL mode: readers answering
+``/api/history`` or warm-starting a lookup never block the writer, and the
+writer never blocks them. Rows are indexed by normalised query, retailer,
+product URL and time, and downsampling is done in SQL. An in-memory index
+of recently observed queries lets a warm-start lookup that cannot hit
+return without touching the database.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .base import PriceResult, normalise_query
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+MAX_PENDING = 10_000
+MAX_POINTS = 10_000
+# How far back the in-memory index of observed queries reaches; keep it above the cache TTLs.
+RECENT_WINDOW = 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_history (
+    id INTEGER PRIMARY KEY,
+    observed_at REAL NOT NULL,
+    query TEXT NOT NULL,
+    retailer TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    fetch_limit INTEGER NOT NULL,
+    product_name TEXT,
+    product_url TEXT,
+    price REAL NOT NULL,
+    original_price REAL,
+    currency TEXT,
+    strategy TEXT
+);
+-- Covers range and downsampling queries without touching the table.
+CREATE INDEX IF NOT EXISTS idx_history_query_time
+    ON price_history (query, observed_at, retailer, product_url, price);
+CREATE INDEX IF NOT EXISTS idx_history_query_retailer_time
+    ON price_history (query, retailer, observed_at);
+CREATE INDEX IF NOT EXISTS idx_history_product_time
+    ON price_history (product_url, observed_at);
+"""
+
+_INSERT = """
+INSERT INTO price_history (
+    observed_at, query, retailer, rank, fetch_limit, product_name,
+    product_url, price, original_price, currency, strategy
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_Row = Tuple[float, str, str, int, int, Optional[str], Optional[str], float, Optional[float], Optional[str], Optional[str]]
+
+_STOP = object()
+
+
+class HistoryStore:
+    """SQLite-backed price history with a batched background writer.
+
+    ``record`` only enqueues rows; up to ``batch_size`` of them are written
+    per transaction, at least every ``flush_interval`` seconds. When more
+    than ``max_pending`` rows are waiting, new ones are dropped (and
+    counted) rather than slowing the caller down.
+
+    Queries observed in the last ``recent_window`` seconds are also kept
+    in memory (loaded from the database when the writer starts), so
+    :meth:`latest` with a ``max_age`` inside that window answers a miss
+    without a database read.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_pending: int = MAX_PENDING,
+        recent_window: float = RECENT_WINDOW,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.recent_window = recent_window
+        self._clock = clock
+        # Unbounded so flush and close never block; ``record`` enforces ``max_pending``.
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        # (query, retailer) -> {fetch_limit: newest observed_at} for the recent window.
+        self._recent: Dict[Tuple[str, str], Dict[int, float]] = {}
+        self._recent_loaded = threading.Event()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"queued": 0, "written": 0, "dropped": 0, "write_errors": 0}
+        self._closed = False
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._writer = self._connect()
+        self._writer.executescript(_SCHEMA)
+        self._thread = threading.Thread(target=self._run, name="price-history-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, query: str, result: PriceResult, *, limit: int = 1) -> None:
+        """Queue a successful result and its alternatives; never blocks."""
+
+        if self._closed or not result.is_successful:
+            return
+        observed_at = self._clock()
+        key = normalise_query(query)
+        queued = False
+        for rank, item in enumerate([result, *result.alternatives]):
+            if not item.is_successful:
+                continue
+            row = (
+                observed_at,
+                key,
+                result.retailer,
+                rank,
+                limit,
+                item.product_name,
+                item.product_url,
+                item.price,
+                item.original_price,
+                item.currency,
+                item.debug.get("strategy"),
+            )
+            with self._lock:
+                if self._queue.qsize() >= self.max_pending:
+                    self._counters["dropped"] += 1
+                    continue
+                self._counters["queued"] += 1
+            self._queue.put_nowait(row)
+            queued = True
+        if queued:
+            with self._lock:
+                seen = self._recent.setdefault((key, result.retailer), {})
+                seen[limit] = max(observed_at, seen.get(limit, observed_at))
+
+    def latest(
+        self,
+        query: str,
+        retailer: str,
+        *,
+        limit: int = 1,
+        max_age: Optional[float] = None,
+    ) -> Optional[PriceResult]:
+        """Return the most recent recorded result, or ``None``.
+
+        Only fetches that asked for at least ``limit`` candidates qualify,
+        and with ``max_age`` only those observed in the last ``max_age``
+        seconds. The result is tagged ``debug["cache"] = "history"`` and
+        carries its ``debug["age"]`` in seconds.
+        """
+
+        now = self._clock()
+        since = now - max_age if max_age is not None else float("-inf")
+        if max_age is not None and not self._may_have(normalise_query(query), retailer, limit, since, max_age):
+            return None
+        connection = self._reader()
+        row = connection.execute(
+            "SELECT observed_at FROM price_history"
+            " WHERE query = ? AND retailer = ? AND observed_at >= ? AND fetch_limit >= ?"
+            " ORDER BY observed_at DESC LIMIT 1",
+            (normalise_query(query), retailer, since, limit),
+        ).fetchone()
+        if row is None:
+            return None
+
+        rows = connection.execute(
+            "SELECT product_name, product_url, price, original_price, currency, strategy"
+            " FROM price_history WHERE query = ? AND retailer = ? AND observed_at = ?"
+            " ORDER BY rank LIMIT ?",
+            (normalise_query(query), retailer, row[0], limit),
+        ).fetchall()
+        if not rows:
+            return None
+
+        debug = {"cache": "history", "observed_at": row[0], "age": max(0.0, now - row[0])}
+        best, *alternatives = [
+            PriceResult(
+                retailer=retailer,
+                product_name=name,
+                price=price,
+                currency=currency,
+                product_url=url,
+                original_price=original_price,
+                debug={**debug, "strategy": strategy},
+            )
+            for name, url, price, original_price, currency, strategy in rows
+        ]
+        best.alternatives = alternatives
+        return best
+
+    def query(
+        self,
+        query: str,
+        *,
+        retailer: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        bucket: Optional[float] = None,
+        max_points: int = MAX_POINTS,
+    ) -> List[Dict[str, Any]]:
+        """Return price points for ``query`` between ``since`` and ``until``.
+
+        Times are Unix seconds. Without ``bucket`` every recorded price is
+        returned; with it, prices are grouped per retailer and product into
+        ``bucket``-second windows reporting min, max, average and count.
+        Points are ordered by time and capped at ``max_points``.
+        """
+
+        conditions = ["query = ?"]
+        params: List[Any] = [normalise_query(query)]
+        if retailer is not None:
+            conditions.append("retailer = ?")
+            params.append(retailer)
+        if since is not None:
+            conditions.append("observed_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("observed_at < ?")
+            params.append(until)
+        where = " AND ".join(conditions)
+
+        if bucket is None:
+            sql = (
+                "SELECT observed_at, retailer, product_name, product_url, price, original_price, currency"
+                f" FROM price_history WHERE {where} ORDER BY observed_at, retailer, rank LIMIT ?"
+            )
+            columns = ("time", "retailer", "product_name", "product_url", "price", "original_price", "currency")
+        else:
+            sql = (
+                "SELECT CAST(observed_at / ? AS INTEGER) * ? AS window, retailer, product_url,"
+                " MIN(price), MAX(price), AVG(price), COUNT(*)"
+                f" FROM price_history WHERE {where}"
+                " GROUP BY window, retailer, product_url ORDER BY window, retailer LIMIT ?"
+            )
+            params = [bucket, bucket, *params]
+            columns = ("time", "retailer", "product_url", "min_price", "max_price", "avg_price", "samples")
+
+        rows = self._reader().execute(sql, (*params, max_points)).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every row queued so far has been written (for tests and shutdown)."""
+
+        done = threading.Event()
+        self._queue.put_nowait(done)
+        done.wait(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Return write counters and the number of rows waiting to be written."""
+
+        with self._lock:
+            return {**self._counters, "pending": self._queue.qsize()}
+
+    def close(self) -> None:
+        """Write what is queued, stop the writer and close every connection."""
+
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put_nowait(_STOP)
+        self._thread.join()
+        with self._lock:
+            readers = list(self._readers)
+            self._readers.clear()
+        for connection in readers:
+            connection.close()
+        self._writer.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+            with self._lock:
+                self._readers.append(connection)
+        return connection
+
+    def _may_have(self, query: str, retailer: str, limit: int, since: float, max_age: float) -> bool:
+        """Return False only when the in-memory index rules out a matching row."""
+
+        if max_age > self.recent_window or not self._recent_loaded.is_set():
+            return True
+        with self._lock:
+            seen = self._recent.get((query, retailer), {})
+            return any(fetch_limit >= limit and observed_at >= since for fetch_limit, observed_at in seen.items())
+
+    def _load_recent(self) -> None:
+        try:
+            rows = self._writer.execute(
+                "SELECT query, retailer, fetch_limit, MAX(observed_at) FROM price_history"
+                " WHERE observed_at >= ? GROUP BY query, retailer, fetch_limit",
+                (self._clock() - self.recent_window,),
+            ).fetchall()
+        except sqlite3.Error:
+            # Without the index every lookup keeps asking the database.
+            logger.exception("Loading recently observed queries failed")
+            return
+        with self._lock:
+            for query, retailer, fetch_limit, observed_at in rows:
+                seen = self._recent.setdefault((query, retailer), {})
+                seen[fetch_limit] = max(observed_at, seen.get(fetch_limit, observed_at))
+        self._recent_loaded.set()
+
+    def _prune_recent(self) -> None:
+        cutoff = self._clock() - self.recent_window
+        with self._lock:
+            for key in list(self._recent):
+                seen = {limit: at for limit, at in self._recent[key].items() if at >= cutoff}
+                if seen:
+                    self._recent[key] = seen
+                else:
+                    del self._recent[key]
+
+    def _run(self) -> None:
+        self._load_recent()
+        while True:
+            batch: List[_Row] = []
+            waiters: List[threading.Event] = []
+            stop = False
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._prune_recent()
+                continue
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _write(self, batch: List[_Row]) -> None:
+        try:
+            with self._writer:
+                self._writer.execute("BEGIN")
+                self._writer.executemany(_INSERT, batch)
+        except sqlite3.Error:
+            logger.exception("Writing %d price history rows failed", len(batch))
+            with self._lock:
+                self._counters["write_errors"] += 1
+            return
+        with self._lock:
+            self._counters["written"] += len(batch)
+
+
+_store: Optional[HistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history() -> Optional[HistoryStore]:
+    """Return the configured history store, or ``None`` when history is off."""
+
+    return _store
+
+
+def configure_history(path: Optional[str], **kwargs: Any) -> Optional[HistoryStore]:
+    """Open the history database at ``path`` (``None`` turns history off)."""
+
+    global _store
+
+    with _store_lock:
+        previous, _store = _store, HistoryStore(path, **kwargs) if path else None
+    if previous is not None:
+        previous.close()
+    return _store
+
+
+def close_history() -> None:
+    """Flush and close the history store, if one is open."""
+
+    configure_history(None)
+
+
+atexit.register(close_history)
@@ -0,0 +1,179 @@
+"""Validators and compressed bodies of fetched pages, kept on disk.
+
+``fetch_html`` sends the stored ``ETag`` / ``Last-Modified`` validators
+of a URL as ``If-None-Match`` / ``If-Modified-Since``. A ``304 Not
+Modified`` answer is then served from the gzip-compressed body stored
+here instead of being downloaded again.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 1000
+
+
+@dataclass(frozen=True)
+class Validators:
+    """What the server told us about the stored copy of a page."""
+
+    etag: Optional[str]
+    last_modified: Optional[str]
+    final_url: str
+
+    def request_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """Disk cache of page bodies with their validators, keyed by request URL.
+
+    Each page is a ``<digest>.gz`` body next to a ``<digest>.json`` record
+    of its validators. Validators of the ``max_entries`` most recently used
+    pages are indexed in memory; older pages are deleted from disk.
+    """
+
+    def __init__(self, directory: str, *, max_entries: int = MAX_ENTRIES) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.directory = directory
+        self.max_entries = max_entries
+        self._index: "OrderedDict[str, Validators]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"stored": 0, "revalidated": 0, "evictions": 0}
+        self._load_index()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Mapping[str, str]] = None) -> str:
+        return f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+    def validators(self, key: str) -> Optional[Validators]:
+        digest = _digest(key)
+        with self._lock:
+            validators = self._index.get(digest)
+            if validators is not None:
+                self._index.move_to_end(digest)
+            return validators
+
+    def load(self, key: str) -> Optional[str]:
+        """Return the stored body for ``key``, or ``None`` if it is gone."""
+
+        try:
+            with gzip.open(self._path(key, ".gz"), "rt", encoding="utf-8") as handle:
+                body = handle.read()
+        except (OSError, EOFError):
+            self._forget(_digest(key))
+            return None
+        with self._lock:
+            self._counters["revalidated"] += 1
+        return body
+
+    def store(self, key: str, body: str, validators: Validators) -> None:
+        """Compress and store ``body`` with its validators, replacing older copies atomically."""
+
+        digest = _digest(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            _write_atomic(self._path(key, ".gz"), gzip.compress(body.encode("utf-8"), compresslevel=5))
+            _write_atomic(self._path(key, ".json"), json.dumps({"key": key, **asdict(validators)}).encode("utf-8"))
+        except OSError:
+            logger.warning("Could not store %s in the HTTP cache", key, exc_info=True)
+            return
+
+        with self._lock:
+            self._index[digest] = validators
+            self._index.move_to_end(digest)
+            self._counters["stored"] += 1
+            evicted = []
+            while len(self._index) > self.max_entries:
+                evicted.append(self._index.popitem(last=False)[0])
+                self._counters["evictions"] += 1
+        for old in evicted:
+            self._remove_files(old)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, "entries": len(self._index)}
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, _digest(key) + suffix)
+
+    def _forget(self, digest: str) -> None:
+        with self._lock:
+            self._index.pop(digest, None)
+        self._remove_files(digest)
+
+    def _remove_files(self, digest: str) -> None:
+        for suffix in (".gz", ".json"):
+            try:
+                os.remove(os.path.join(self.directory, digest + suffix))
+            except OSError:
+                pass
+
+    def _load_index(self) -> None:
+        """Index validators left on disk by earlier processes, oldest first."""
+
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".json")]
+        except OSError:
+            return
+        records = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "rb") as handle:
+                    record = json.load(handle)
+                records.append((os.path.getmtime(path), name[: -len(".json")], record))
+            except (OSError, ValueError):
+                continue
+        for _mtime, digest, record in sorted(records, key=lambda item: item[0]):
+            self._index[digest] = Validators(record.get("etag"), record.get("last_modified"), record.get("final_url", ""))
+        while len(self._index) > self.max_entries:
+            self._remove_files(self._index.popitem(last=False)[0])
+
+
+def _digest(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "wb") as handle:
+        handle.write(data)
+    os.replace(temporary, path)
+
+
+_cache: Optional[HttpCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> Optional[HttpCache]:
+    """Return the configured HTTP cache, or ``None`` when conditional requests are off."""
+
+    return _cache
+
+
+def configure_http_cache(directory: Optional[str], **kwargs) -> Optional[HttpCache]:
+    """Keep page bodies under ``directory`` (``None`` turns conditional requests off)."""
+
+    global _cache
+
+    with _cache_lock:
+        _cache = HttpCache(directory, **kwargs) if directory else None
+    return _cache
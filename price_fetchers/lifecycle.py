@@ -0,0 +1,77 @@
+"""Per-process startup state and graceful shutdown of shared resources.
+
+Pooled sessions, the fetch executor, the extraction pool, the cache
+warmer and the history writer own threads, processes, sockets or database
+handles, none of which survive a ``fork``. A pre-forking server therefore
+imports the app once in its master process and starts these resources in
+each worker. On shutdown a
+worker stops taking new work, lets in-flight requests finish and then
+releases everything in dependency order.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Dict, Optional
+
+from .aggregator import stop_cache_warmer
+from .executor import shutdown_executor
+from .history import close_history
+from .offload import shutdown_extraction_pool
+from .utils import close_sessions
+
+
+class Lifecycle:
+    """Readiness of one worker process and the requests it is serving."""
+
+    def __init__(self) -> None:
+        self.started = False
+        self.draining = False
+        self._in_flight = 0
+        self._idle = threading.Condition()
+
+    @property
+    def ready(self) -> bool:
+        return self.started and not self.draining
+
+    @property
+    def in_flight(self) -> int:
+        with self._idle:
+            return self._in_flight
+
+    def enter(self) -> None:
+        with self._idle:
+            self._in_flight += 1
+
+    def exit(self) -> None:
+        with self._idle:
+            self._in_flight -= 1
+            if self._in_flight <= 0:
+                self._idle.notify_all()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Stop reporting ready and wait for in-flight work; False if ``timeout`` ran out."""
+
+        self.draining = True
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight <= 0, timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self.in_flight, "started": int(self.started), "draining": int(self.draining)}
+
+
+def shutdown_resources(*, wait: bool = True) -> None:
+    """Stop background work and release pooled resources.
+
+    The warmer goes first so it schedules no new refreshes, then the
+    executor (waiting for running fetches when ``wait`` is true) and the
+    extraction processes those fetches use, then the history writer
+    flushes what they recorded, and finally the pooled connections are
+    closed.
+    """
+
+    stop_cache_warmer()
+    shutdown_executor(wait=wait)
+    shutdown_extraction_pool(wait=wait)
+    close_history()
+    close_sessions()
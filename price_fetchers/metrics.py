@@ -0,0 +1,270 @@
+"""Per-stage timing spans and Prometheus-style metrics.
+
+Every stage of a lookup (connecting, downloading and decoding the page,
+then the JSON-LD, embedded-payload and CSS-selector extraction strategies)
+is timed with :func:`span`. Inside :func:`collect_timings` the durations
+are summed per stage so they can be attached to ``PriceResult.debug``;
+every span is also observed in the ``price_stage_seconds`` histogram. The
+whole registry is rendered in the Prometheus text format by :func:`render`.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, dict(zip(self.labels, key)), value) for key, value in sorted(values.items())]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label combination."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        *,
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum].
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(label_values, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, *label_values: str) -> int:
+        with self._lock:
+            entry = self._values.get(label_values)
+            return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+
+        samples: List[Sample] = []
+        for key, (counts, total) in sorted(values.items()):
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_bound(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauges:
+    """Gauge values read from live component stats at render time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._collect = collect
+
+    def samples(self) -> List[Sample]:
+        return list(self._collect())
+
+    def reset(self) -> None:
+        pass
+
+
+_metrics: Dict[str, object] = {}
+_metrics_lock = threading.Lock()
+
+
+def _register(metric: T) -> T:
+    with _metrics_lock:
+        return _metrics.setdefault(metric.name, metric)  # type: ignore[attr-defined]
+
+
+def counter(name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+    """Return the counter called ``name``, creating it on first use."""
+
+    return _register(Counter(name, documentation, labels))
+
+
+def histogram(name: str, documentation: str, labels: Iterable[str] = (), **kwargs) -> Histogram:
+    """Return the histogram called ``name``, creating it on first use."""
+
+    return _register(Histogram(name, documentation, labels, **kwargs))
+
+
+def gauges(name: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> Gauges:
+    """Register ``collect`` to supply the ``name`` gauge samples when rendering."""
+
+    return _register(Gauges(name, documentation, collect))
+
+
+def render() -> str:
+    """Return every registered metric in the Prometheus text exposition format."""
+
+    with _metrics_lock:
+        metrics = list(_metrics.values())
+
+    lines: List[str] = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Zero every counter and histogram (gauges follow their sources)."""
+
+    with _metrics_lock:
+        metrics = list(_metrics.values())
+    for metric in metrics:
+        metric.reset()
+
+
+STAGE_SECONDS = histogram(
+    "price_stage_seconds",
+    "Time spent in each fetch and extraction stage.",
+    ("retailer", "stage"),
+)
+
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("price_fetchers_timings", default=None)
+_retailer: ContextVar[str] = ContextVar("price_fetchers_metrics_retailer", default="")
+
+
+@contextmanager
+def collect_timings(retailer: str = "") -> Iterator[Dict[str, float]]:
+    """Collect the seconds spent per stage by the spans run inside the block.
+
+    The yielded dict is shared with work run on the fetch executor, which
+    copies the context.
+    """
+
+    timings: Dict[str, float] = {}
+    timings_token = _timings.set(timings)
+    retailer_token = _retailer.set(retailer)
+    try:
+        yield timings
+    finally:
+        _retailer.reset(retailer_token)
+        _timings.reset(timings_token)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the block as ``stage``, even when it raises."""
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(stage, time.perf_counter() - started)
+
+
+def timed_iter(stage: str, iterable: Iterable[T]) -> Iterator[T]:
+    """Yield from ``iterable``, timing only the work done inside it as ``stage``.
+
+    Time the consumer spends between items is not counted, so lazily
+    consumed strategies report their own cost.
+    """
+
+    iterator = iter(iterable)
+    elapsed = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - started
+            yield item
+    finally:
+        _record(stage, elapsed)
+
+
+def record_timings(timings: Mapping[str, float]) -> None:
+    """Record stage timings measured elsewhere, e.g. in an extraction process."""
+
+    for stage, seconds in timings.items():
+        _record(stage, seconds)
+
+
+def _record(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, _retailer.get(), stage)
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
@@ -0,0 +1,217 @@
+"""Process pool running CPU-bound page extraction off the fetch threads.
+
+Fetching is I/O-bound, but building the parse tree, scanning JSON-LD and
+decoding embedded payloads hold the GIL, so fetch threads stall behind
+one another's parsing. With a pool configured, a fetched body is sent to a
+warm worker process and only the extracted :class:`PriceResult` comes
+back.
+
+At most ``max_pending`` extractions are queued or running in the pool.
+Beyond that the pool is saturated: the extraction runs inline on the
+calling thread, as it does with no pool at all, and the
+``price_extraction_offload_total{outcome="saturated"}`` counter records
+the backpressure.
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from .base import PriceResult
+from .metrics import collect_timings, counter, record_timings, span
+from .registry import retailer_specs
+
+logger = logging.getLogger(__name__)
+
+OFFLOADS = counter(
+    "price_extraction_offload_total",
+    "Page extractions sent to the process pool, or run inline because it was saturated or broken.",
+    ("outcome",),
+)
+
+# Fork is unsafe in a process already running fetch and request threads.
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+Extraction = Tuple[PriceResult, Dict[str, float]]
+
+
+class ExtractionPool:
+    """Warm worker processes with a bounded number of pending extractions.
+
+    ``modules`` are imported in every worker when it starts, so the first
+    extraction does not pay for importing BeautifulSoup and the retailers.
+    """
+
+    def __init__(self, processes: int, *, max_pending: Optional[int] = None, modules: Sequence[str] = ()) -> None:
+        if processes < 1:
+            raise ValueError("processes must be at least 1")
+        self.processes = processes
+        self.max_pending = max_pending if max_pending is not None else 2 * processes
+        if self.max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+        self._pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context(START_METHOD),
+            initializer=_import_modules,
+            initargs=(tuple(modules),),
+        )
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start every worker process now instead of on the first extractions."""
+
+        for _ in range(self.processes):
+            self._pool.submit(_ready)
+
+    @property
+    def saturated(self) -> bool:
+        with self._lock:
+            return self._pending >= self.max_pending
+
+    def try_submit(
+        self, build: Callable[..., PriceResult], html: str, final_url: Optional[str], limit: int
+    ) -> "Optional[Future[Extraction]]":
+        """Queue ``build(html, final_url, limit)`` in a worker, or return None when saturated.
+
+        ``build`` must be a module-level function or a decorated one
+        exposing the original as ``__wrapped__``; workers look it up by name.
+        """
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return None
+            self._pending += 1
+        try:
+            future = self._pool.submit(_extract, build.__module__, build.__qualname__, html, final_url, limit)
+        except (RuntimeError, BrokenProcessPool):
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"processes": self.processes, "pending": self._pending, "max_pending": self.max_pending}
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _release(self, _future: Any = None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+
+def _import_modules(modules: Tuple[str, ...]) -> None:
+    for module in modules:
+        importlib.import_module(module)
+
+
+def _ready() -> None:
+    return None
+
+
+def _extract(module: str, qualname: str, html: str, final_url: Optional[str], limit: int) -> Extraction:
+    """Run an extractor inside a worker and return its result with stage timings."""
+
+    build: Any = importlib.import_module(module)
+    for name in qualname.split("."):
+        build = getattr(build, name)
+    # The parent keeps the memo; the worker only ever sees misses.
+    build = getattr(build, "__wrapped__", build)
+    with collect_timings() as timings:
+        result = build(html, final_url, limit)
+    return result, timings
+
+
+def run_extraction(build: Callable[..., PriceResult], html: str, final_url: Optional[str], limit: int = 1) -> PriceResult:
+    """Extract in the configured process pool, or inline without one or when it is saturated.
+
+    Stage timings measured in the worker are recorded as if the extraction
+    had run here; the ``offload`` stage covers queueing and transfer too.
+    """
+
+    pool = _pool
+    if pool is None:
+        return build(html, final_url, limit)
+
+    try:
+        future = pool.try_submit(build, html, final_url, limit)
+    except (RuntimeError, BrokenProcessPool):
+        OFFLOADS.inc("failed")
+        return build(html, final_url, limit)
+    if future is None:
+        OFFLOADS.inc("saturated")
+        return build(html, final_url, limit)
+
+    try:
+        with span("offload"):
+            result, timings = future.result()
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); the page itself is fine.
+        logger.warning("Extraction pool is broken, extracting inline", exc_info=True)
+        OFFLOADS.inc("failed")
+        _replace_broken(pool)
+        return build(html, final_url, limit)
+    OFFLOADS.inc("offloaded")
+    record_timings(timings)
+    return result
+
+
+_pool: Optional[ExtractionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> Optional[ExtractionPool]:
+    """Return the configured extraction pool, or ``None`` when extraction runs inline."""
+
+    return _pool
+
+
+def configure_extraction_pool(processes: int, **kwargs: Any) -> Optional[ExtractionPool]:
+    """Extract pages in ``processes`` worker processes (``0`` extracts inline)."""
+
+    global _pool
+
+    pool = None
+    if processes:
+        kwargs.setdefault("modules", _retailer_modules())
+        pool = ExtractionPool(processes, **kwargs)
+        pool.start()
+    with _pool_lock:
+        previous, _pool = _pool, pool
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return pool
+
+
+def shutdown_extraction_pool(*, wait: bool = True) -> None:
+    """Stop the worker processes; later extractions run inline."""
+
+    global _pool
+
+    with _pool_lock:
+        previous, _pool = _pool, None
+    if previous is not None:
+        previous.shutdown(wait=wait)
+
+
+def _replace_broken(pool: ExtractionPool) -> None:
+    global _pool
+
+    with _pool_lock:
+        if _pool is not pool:  # another thread already replaced it
+            return
+        _pool = ExtractionPool(pool.processes, max_pending=pool.max_pending, modules=_retailer_modules())
+        _pool.start()
+    pool.shutdown(wait=False)
+
+
+def _retailer_modules() -> Tuple[str, ...]:
+    return ("bs4", *(spec.module for spec in retailer_specs()))
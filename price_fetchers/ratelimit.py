@@ -0,0 +1,122 @@
+"""Token buckets for pacing work per key."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Mapping, Optional
+
+
+class HostBusy(RuntimeError):
+    """Raised when a host's pacer has no request slot before the deadline.
+
+    Deliberately not a ``FetchError``: our own throttling says nothing
+    about the retailer, so fetchers let it through and the aggregator
+    reports the retailer as busy.
+    """
+
+
+class TokenBucket:
+    """Allow ``rate`` operations per second with bursts of up to ``capacity``."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take ``tokens`` if available right now; never blocks."""
+
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def reserve(self, tokens: float = 1.0, *, max_wait: Optional[float] = None) -> Optional[float]:
+        """Take ``tokens`` now, possibly going into debt, and return the seconds to wait.
+
+        Callers sleep for the returned time before acting, so concurrent
+        callers are spaced ``1 / rate`` apart in arrival order. When the
+        wait would exceed ``max_wait`` nothing is taken and ``None`` is
+        returned.
+        """
+
+        with self._lock:
+            self._refill()
+            wait = max(0.0, (tokens - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= tokens
+            return wait
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Return the seconds until ``tokens`` will be available."""
+
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateLimits:
+    """Lazily created token bucket per key.
+
+    ``rates`` maps keys to their own rate and is read when a key's bucket is
+    first created; other keys use ``default_rate``. With ``max_keys`` only
+    the most recently used keys keep a bucket, so an unbounded key space
+    such as client addresses cannot grow without limit.
+    """
+
+    def __init__(
+        self,
+        default_rate: float,
+        *,
+        rates: Optional[Mapping[str, float]] = None,
+        capacity: Optional[float] = None,
+        max_keys: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.default_rate = default_rate
+        self.rates: Mapping[str, float] = rates if rates is not None else {}
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is not None and self.max_keys is None:
+            return bucket
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate = self.rates.get(key, self.default_rate)
+                bucket = self._buckets[key] = TokenBucket(rate, self.capacity, clock=self._clock)
+                # An evicted key starts over with a full bucket, as an idle one would.
+                while self.max_keys is not None and len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            elif self.max_keys is not None:
+                self._buckets.move_to_end(key)
+        return bucket
+
+    def try_acquire(self, key: str, tokens: float = 1.0) -> bool:
+        return self.get(key).try_acquire(tokens)
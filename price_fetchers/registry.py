@@ -0,0 +1,135 @@
+"""Registry of retailer fetchers, imported lazily on first use."""
+
+from __future__ import annotations
+
+import importlib
+import threading
+from dataclasses import dataclass, fields, replace
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+from .base import PriceResult
+
+Fetcher = Callable[..., PriceResult]
+
+
+@dataclass(frozen=True)
+class RetailerSpec:
+    """Declaration and tuning of one retailer.
+
+    ``module`` is the dotted import path of the retailer module and
+    ``attribute`` the search function inside it. ``timeout`` bounds each
+    live fetch from this retailer, ``concurrency`` its in-flight
+    fetches on the shared executor, ``cache_ttl`` how long its successful
+    results stay fresh and ``warm_rate`` how many background cache
+    refreshes per second it may receive. ``None`` keeps the global default.
+    """
+
+    name: str
+    module: str
+    attribute: str = "search_product"
+    timeout: Optional[float] = None
+    concurrency: Optional[int] = None
+    cache_ttl: Optional[float] = None
+    warm_rate: Optional[float] = None
+    enabled: bool = True
+
+
+_specs: Dict[str, RetailerSpec] = {}
+_loaded: Dict[str, Fetcher] = {}
+_lock = threading.Lock()
+
+
+def register_retailer(name: str, module: str, **settings: Any) -> RetailerSpec:
+    """Declare a retailer; its module is only imported when first used."""
+
+    spec = RetailerSpec(name=name, module=module, **settings)
+    with _lock:
+        _specs[name] = spec
+        _loaded.pop(name, None)
+    return spec
+
+
+def configure_retailer(name: str, **settings: Any) -> RetailerSpec:
+    """Update the tuning of an already registered retailer."""
+
+    with _lock:
+        spec = _specs.get(name)
+        if spec is None:
+            raise KeyError(f"Unknown retailer: {name}")
+        spec = _specs[name] = replace(spec, **settings)
+        if "module" in settings or "attribute" in settings:
+            _loaded.pop(name, None)
+    return spec
+
+
+def get_spec(name: str) -> Optional[RetailerSpec]:
+    """Return the spec registered under ``name``, if any."""
+
+    return _specs.get(name)
+
+
+def retailer_specs(*, include_disabled: bool = False) -> List[RetailerSpec]:
+    """Return registered specs in registration order."""
+
+    with _lock:
+        specs = list(_specs.values())
+    return [spec for spec in specs if include_disabled or spec.enabled]
+
+
+def load_fetcher(name: str) -> Fetcher:
+    """Import the retailer module on first use and return its search function."""
+
+    fetcher = _loaded.get(name)
+    if fetcher is not None:
+        return fetcher
+
+    spec = _specs.get(name)
+    if spec is None:
+        raise KeyError(f"Unknown retailer: {name}")
+    fetcher = getattr(importlib.import_module(spec.module), spec.attribute)
+    with _lock:
+        _loaded[name] = fetcher
+    return fetcher
+
+
+class LazyFetchers(Mapping[str, Fetcher]):
+    """Live ``name -> fetcher`` mapping over the enabled registered retailers."""
+
+    def __getitem__(self, name: str) -> Fetcher:
+        spec = _specs.get(name)
+        if spec is None or not spec.enabled:
+            raise KeyError(name)
+        return load_fetcher(name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([spec.name for spec in retailer_specs()])
+
+    def __len__(self) -> int:
+        return len(retailer_specs())
+
+
+class SettingView(Mapping[str, Any]):
+    """Live ``name -> value`` mapping of one spec field, skipping unset values."""
+
+    def __init__(self, setting: str) -> None:
+        if setting not in {field.name for field in fields(RetailerSpec)}:
+            raise ValueError(f"Unknown retailer setting: {setting}")
+        self.setting = setting
+
+    def __getitem__(self, name: str) -> Any:
+        spec = _specs.get(name)
+        value = getattr(spec, self.setting) if spec is not None else None
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([spec.name for spec in retailer_specs(include_disabled=True) if getattr(spec, self.setting) is not None])
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+# Rossmann may try several search endpoints in one fetch, Gratis one page.
+register_retailer("Rossmann", "price_fetchers.rossmann", timeout=20.0)
+register_retailer("Gratis", "price_fetchers.gratis", timeout=15.0)
@@ -2,26 +2,48 @@
 
 from __future__ import annotations
 
-import json
+import contextvars
 import logging
-from typing import Any, Dict, List, Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
-
 from .base import PriceResult
-from .utils import FetchError, fetch_html, find_price_candidates, parse_json_ld_products, parse_price
+from .deadline import current_deadline
+from .embedded import EmbeddedArray
+from .utils import (
+    CONNECT_TIMEOUT,
+    REQUEST_TIMEOUT,
+    FetchError,
+    ParsedPage,
+    fetch_html,
+    iter_price_candidates,
+    iter_unique_results,
+    memoize_extraction,
+    parse_json_ld_products,
+    parse_price,
+)
 
 logger = logging.getLogger(__name__)
 
+RETAILER = "Rossmann"
 BASE_URL = "https://www.rossmann.com.tr"
 SEARCH_PATH = "/catalogsearch/result"
+EMBEDDED_PRODUCTS_MARKER = "initialProducts:"
+EMBEDDED_PRODUCTS = EmbeddedArray(EMBEDDED_PRODUCTS_MARKER)
 _REQUEST_HEADERS = {
     "User-Agent": "python-requests/2.31.0",
     "Accept": "*/*",
     "Accept-Encoding": "gzip, deflate",
     "Connection": "keep-alive",
 }
+# Query every search endpoint at once instead of one after another.
+RACE_SEARCH_ENDPOINTS = False
+# Threads for raced requests, kept apart from the fetch executor whose
+# workers wait on them; a race finding too few free searches in order.
+RACE_POOL_SIZE = 6
 PRICE_SELECTORS = [
     "[class*='price']",
     "[data-test='price']",
@@ -45,223 +67,310 @@ PRICE_SELECTORS = [
     "[class*='product-item-price']",
 ]
 
+_preferred_endpoint: Optional[str] = None
+_endpoint_failures: Dict[str, int] = {}
+_endpoint_lock = threading.Lock()
+_race_pool: Optional[Tuple[ThreadPoolExecutor, threading.Semaphore]] = None
+_race_pool_lock = threading.Lock()
+
+
+def search_product(query: str, *, limit: int = 1) -> PriceResult:
+    """Return pricing information for the first product match on Rossmann.
 
-def search_product(query: str) -> PriceResult:
-    """Return pricing information for the first product match on Rossmann."""
+    With ``limit`` above one, up to ``limit - 1`` further matches from the
+    same page are attached as ``alternatives``.
+    """
 
-    retailer = "Rossmann"
     try:
-        search_urls = [
-            f"{BASE_URL}/catalogsearch/result/",
-            urljoin(BASE_URL, SEARCH_PATH),
-            f"{BASE_URL}/search/",
-        ]
+        fetched = _race_search(query) if RACE_SEARCH_ENDPOINTS else _search_in_order(query)
+    except FuturesTimeoutError:
+        # Out of time, not an answer from Rossmann: kept off its circuit breaker.
+        return PriceResult(
+            retailer=RETAILER,
+            error="Rossmann yanıtı zaman aşımına uğradı",
+            debug={"error_type": "timeout"},
+        )
+    if fetched is None:
+        return PriceResult(
+            retailer=RETAILER,
+            error="Rossmann sitesine erişilemiyor",
+            debug={"error_type": "fetch"},
+        )
+
+    html, final_url = fetched
+    return _build_result(html, final_url, limit)
 
-        html: Optional[str] = None
-        final_url: Optional[str] = None
-        for url in search_urls:
-            try:
-                html, final_url = fetch_html(
-                    url,
-                    params={"q": query},
-                    headers=_REQUEST_HEADERS,
-                    include_default_headers=False,
-                )
-            except FetchError:
-                continue
-            if html:
-                break
 
-        if not html:
-            return PriceResult(retailer=retailer, error="Rossmann sitesine erişilemiyor")
+def _search_urls() -> List[str]:
+    """Return the search endpoints to try, the last one that worked first."""
+
+    candidates = [
+        f"{BASE_URL}/catalogsearch/result/",
+        urljoin(BASE_URL, SEARCH_PATH),
+        f"{BASE_URL}/search/",
+    ]
+    with _endpoint_lock:
+        preferred = _preferred_endpoint
+        failures = dict(_endpoint_failures)
+    # Stable sort: the remembered endpoint leads, then the least-failing ones.
+    return sorted(candidates, key=lambda url: (url != preferred, failures.get(url, 0)))
+
+
+def _fetch_search_page(url: str, query: str) -> Tuple[str, str]:
+    return fetch_html(
+        url,
+        params={"q": query},
+        headers=_REQUEST_HEADERS,
+        include_default_headers=False,
+        stream_until=EMBEDDED_PRODUCTS,
+    )
+
+
+def _search_in_order(query: str) -> Optional[Tuple[str, str]]:
+    """Try each endpoint sequentially, stopping at the first usable page."""
+
+    for url in _search_urls():
+        try:
+            html, final_url = _fetch_search_page(url, query)
+        except FetchError:
+            _record_endpoint(url, ok=False)
+            continue
+        if html:
+            _record_endpoint(url, ok=True)
+            return html, final_url
+    return None
 
-    except FetchError as exc:
-        return PriceResult(retailer=retailer, error=f"Rossmann isteği başarısız: {exc}")
 
+def _race_search(query: str) -> Optional[Tuple[str, str]]:
+    """Query every endpoint in parallel on the race pool and keep the first usable page.
+
+    Without a free race thread per endpoint the endpoints are tried in
+    order on the calling thread instead. Losing requests are abandoned and
+    finish on their own. Without a usable page before the deadline (or a
+    full request timeout) ``FuturesTimeoutError`` is raised.
+    """
+
+    urls = _search_urls()
+    pool, slots = _get_race_pool()
+    taken = 0
+    while taken < len(urls) and slots.acquire(blocking=False):
+        taken += 1
+    if taken < len(urls):
+        for _ in range(taken):
+            slots.release()
+        return _search_in_order(query)
+
+    futures: Dict["Future[Tuple[str, str]]", str] = {}
+    for url in urls:
+        future = pool.submit(contextvars.copy_context().run, _fetch_search_page, url, query)
+        future.add_done_callback(lambda _future: slots.release())
+        futures[future] = url
+    for future in as_completed(futures, timeout=_race_timeout()):
+        url = futures[future]
+        try:
+            html, final_url = future.result()
+        except FetchError:
+            _record_endpoint(url, ok=False)
+            continue
+        if html:
+            _record_endpoint(url, ok=True)
+            return html, final_url
+    return None
+
+
+def _get_race_pool() -> Tuple[ThreadPoolExecutor, threading.Semaphore]:
+    """Return the race thread pool and the semaphore counting its free threads."""
+
+    global _race_pool
+
+    with _race_pool_lock:
+        if _race_pool is None:
+            pool = ThreadPoolExecutor(max_workers=RACE_POOL_SIZE, thread_name_prefix="rossmann-race")
+            _race_pool = pool, threading.Semaphore(RACE_POOL_SIZE)
+        return _race_pool
+
+
+def _race_timeout() -> float:
+    deadline = current_deadline()
+    if deadline is not None:
+        return max(0.0, deadline.remaining())
+    return CONNECT_TIMEOUT + REQUEST_TIMEOUT
+
+
+def _record_endpoint(url: str, *, ok: bool) -> None:
+    """Remember which search endpoint answered so it is tried first next time."""
+
+    global _preferred_endpoint
+
+    with _endpoint_lock:
+        if ok:
+            _preferred_endpoint = url
+            _endpoint_failures.pop(url, None)
+        else:
+            _endpoint_failures[url] = _endpoint_failures.get(url, 0) + 1
+            if _preferred_endpoint == url:
+                _preferred_endpoint = None
+
+
+@memoize_extraction
+def _build_result(html: str, final_url: Optional[str], limit: int = 1) -> PriceResult:
+    """Extract up to ``limit`` priced products from a Rossmann search page.
+
+    The first product becomes the result; any further ones are attached as
+    its ``alternatives``.
+    """
+
+    page = ParsedPage(html)
+    results = list(islice(iter_unique_results(_iter_results(page, final_url)), limit))
+    if not results:
+        return PriceResult(
+            retailer=RETAILER,
+            error="Rossmann sitesinde sonuç bulunamadı",
+            debug={"source_url": final_url, "strategy": "html-selectors", "error_type": "not_found"},
+        )
+    best, *alternatives = results
+    best.alternatives = alternatives
+    return best
+
+
+def _iter_results(page: ParsedPage, final_url: Optional[str]) -> Iterator[PriceResult]:
+    """Lazily yield priced products from the first strategy that finds any."""
+
+    for strategy in (_iter_json_ld_results, _iter_embedded_results, _iter_selector_results):
+        found = False
+        for result in strategy(page, final_url):
+            found = True
+            yield result
+        if found:
+            return
+
+
+def _iter_json_ld_results(page: ParsedPage, final_url: Optional[str]) -> Iterator[PriceResult]:
     debug = {"source_url": final_url, "strategy": "json-ld"}
-    for product in parse_json_ld_products(html):
+    for product in parse_json_ld_products(page):
         price = product.price or parse_price(product.raw_price_text or "")
         if price is None:
             continue
         product_url = product.url
         if product_url:
             product_url = urljoin(BASE_URL, product_url)
-        return PriceResult(
-            retailer=retailer,
+        yield PriceResult(
+            retailer=RETAILER,
             product_name=product.name,
             price=price,
             currency=product.currency or "TRY",
             product_url=product_url,
             raw_price_text=product.raw_price_text,
-            debug=debug,
+            debug=dict(debug),
         )
 
-    # Attempt to parse embedded product data served with the page markup
-    embedded_products = _extract_initial_products(html)
-    if embedded_products:
-        debug = {"source_url": final_url, "strategy": "embedded-json"}
-        for product in embedded_products:
-            source = product.get("_source") if isinstance(product, dict) else None
-            if not source:
-                continue
 
-            special_price_raw = _safe_float(source.get("special_price"))
-            base_price_raw = _safe_float(source.get("price"))
-            loyalty_price_raw = _first_non_empty(
-                _safe_float(source.get("ross_60_price")),
-                _safe_float(source.get("ross_60_price_web")),
+def _iter_embedded_results(page: ParsedPage, final_url: Optional[str]) -> Iterator[PriceResult]:
+    debug = {"source_url": final_url, "strategy": "embedded-json"}
+    for product in _extract_initial_products(page.html):
+        source = product.get("_source") if isinstance(product, dict) else None
+        if not source:
+            continue
+
+        special_price_raw = _safe_float(source.get("special_price"))
+        base_price_raw = _safe_float(source.get("price"))
+        loyalty_price_raw = _first_non_empty(
+            _safe_float(source.get("ross_60_price")),
+            _safe_float(source.get("ross_60_price_web")),
+        )
+        alt_prices = [
+            _safe_float(source.get("crm_price")),
+            _safe_float(source.get("cmp_100_price")),
+            _safe_float(source.get("cmp_50_price")),
+            _safe_float(source.get("cmp_20_price")),
+        ]
+
+        price = None
+        original_price = None
+
+        if loyalty_price_raw and special_price_raw and loyalty_price_raw < special_price_raw - 0.01:
+            price = loyalty_price_raw
+            original_price = special_price_raw or base_price_raw
+        elif special_price_raw and base_price_raw and special_price_raw < base_price_raw - 0.01:
+            price = special_price_raw
+            original_price = base_price_raw
+        else:
+            price = _first_non_empty(
+                special_price_raw,
+                base_price_raw,
+                loyalty_price_raw,
+                *alt_prices,
             )
-            alt_prices = [
-                _safe_float(source.get("crm_price")),
-                _safe_float(source.get("cmp_100_price")),
-                _safe_float(source.get("cmp_50_price")),
-                _safe_float(source.get("cmp_20_price")),
+
+            if price is None:
+                continue
+
+            comparison_candidates = [
+                base_price_raw,
+                special_price_raw if special_price_raw not in (None, price) else None,
             ]
+            for candidate in comparison_candidates:
+                if candidate is not None and candidate > price + 0.01:
+                    original_price = candidate
+                    break
 
-            price = None
+        if price is None or price <= 0:
+            continue
+
+        if original_price is not None and (
+            original_price <= 0 or original_price <= price + 0.01
+        ):
             original_price = None
 
-            if loyalty_price_raw and special_price_raw and loyalty_price_raw < special_price_raw - 0.01:
-                price = loyalty_price_raw
-                original_price = special_price_raw or base_price_raw
-            elif special_price_raw and base_price_raw and special_price_raw < base_price_raw - 0.01:
-                price = special_price_raw
-                original_price = base_price_raw
-            else:
-                price = _first_non_empty(
-                    special_price_raw,
-                    base_price_raw,
-                    loyalty_price_raw,
-                    *alt_prices,
-                )
-
-                if price is None:
-                    continue
-
-                comparison_candidates = [
-                    base_price_raw,
-                    special_price_raw if special_price_raw not in (None, price) else None,
-                ]
-                for candidate in comparison_candidates:
-                    if candidate is not None and candidate > price + 0.01:
-                        original_price = candidate
-                        break
-
-            if price is None or price <= 0:
-                continue
+        product_name = _first_non_empty(
+            source.get("name"),
+            source.get("name1"),
+            source.get("name2"),
+        )
+        if not product_name:
+            continue
 
-            if original_price is not None and (
-                original_price <= 0 or original_price <= price + 0.01
-            ):
-                original_price = None
+        url_key = _first_non_empty(source.get("url_key"), source.get("url_path"))
+        product_url = urljoin(f"{BASE_URL}/", url_key) if url_key else None
 
-            product_name = _first_non_empty(
-                source.get("name"),
-                source.get("name1"),
-                source.get("name2"),
-            )
-            if not product_name:
-                continue
+        raw_price_text = _format_price(price)
+        original_price_text = _format_price(original_price) if original_price is not None else None
 
-            url_key = _first_non_empty(source.get("url_key"), source.get("url_path"))
-            product_url = urljoin(f"{BASE_URL}/", url_key) if url_key else None
-
-            raw_price_text = _format_price(price)
-            original_price_text = _format_price(original_price) if original_price is not None else None
-
-            return PriceResult(
-                retailer=retailer,
-                product_name=product_name,
-                price=price,
-                currency="TRY",
-                product_url=product_url,
-                raw_price_text=raw_price_text,
-                original_price=original_price,
-                original_price_text=original_price_text,
-                debug={**debug, "product_id": source.get("id")},
-            )
+        yield PriceResult(
+            retailer=RETAILER,
+            product_name=product_name,
+            price=price,
+            currency="TRY",
+            product_url=product_url,
+            raw_price_text=raw_price_text,
+            original_price=original_price,
+            original_price_text=original_price_text,
+            debug={**debug, "product_id": source.get("id")},
+        )
 
-    debug["strategy"] = "html-selectors"
-    soup = BeautifulSoup(html, "html.parser")
-    for name, price_text, url in find_price_candidates(soup, PRICE_SELECTORS):
+
+def _iter_selector_results(page: ParsedPage, final_url: Optional[str]) -> Iterator[PriceResult]:
+    debug = {"source_url": final_url, "strategy": "html-selectors"}
+    for name, price_text, url in iter_price_candidates(page.soup, PRICE_SELECTORS):
         price = parse_price(price_text)
         if price is None:
             continue
         product_url = urljoin(BASE_URL, url)
-        return PriceResult(
-            retailer=retailer,
+        yield PriceResult(
+            retailer=RETAILER,
             product_name=name,
             price=price,
             currency="TRY",
             product_url=product_url,
             raw_price_text=price_text,
-            debug=debug,
+            debug=dict(debug),
         )
 
-    return PriceResult(
-        retailer=retailer,
-        error="Rossmann sitesinde sonuç bulunamadı",
-        debug=debug,
-    )
-
 
 def _extract_initial_products(html: str) -> List[Dict[str, Any]]:
     """Extract the initial product list embedded in the Rossmann markup."""
 
-    marker = "initialProducts:"
-    marker_index = html.find(marker)
-    if marker_index == -1:
-        return []
-
-    array_start = html.find("[", marker_index)
-    if array_start == -1:
-        return []
-
-    payload = _slice_json_array(html, array_start)
-    if not payload:
-        return []
-
-    try:
-        data = json.loads(payload)
-    except json.JSONDecodeError:
-        logger.debug("Rossmann embedded products JSON decoding failed", exc_info=True)
-        return []
-
-    return data if isinstance(data, list) else []
-
-
-def _slice_json_array(text: str, start_index: int) -> str:
-    """Return the JSON array substring beginning at start_index or '' if parsing fails."""
-
-    if start_index < 0 or start_index >= len(text) or text[start_index] != "[":
-        return ""
-
-    depth = 0
-    in_string = False
-    escape = False
-    for pos in range(start_index, len(text)):
-        char = text[pos]
-        if in_string:
-            if escape:
-                escape = False
-            elif char == "\\":
-                escape = True
-            elif char == '"':
-                in_string = False
-            continue
-
-        if char == '"':
-            in_string = True
-            continue
-        if char == "[":
-            depth += 1
-        elif char == "]":
-            depth -= 1
-            if depth == 0:
-                return text[start_index : pos + 1]
-
-    logger.debug("Rossmann embedded products JSON array parsing failed to find closing bracket")
-    return ""
+    return EMBEDDED_PRODUCTS.extract(html)
 
 
 def _first_non_empty(*values: Any) -> Optional[Any]:
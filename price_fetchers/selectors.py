@@ -0,0 +1,199 @@
+"""Single-pass CSS selector matching for the HTML fallback strategy.
+
+The fallback used to run ``soup.select`` once per entry of a retailer's
+``PRICE_SELECTORS`` list and then search backwards through the whole
+document (``find_previous``) for every match, which grows faster than
+the page. :class:`CompiledSelectors` instead walks the tree once and
+tests each tag against the selectors in priority order; the first one
+that matches decides the tag's priority. The nearest preceding link and
+name/title element are tracked during the same walk, so resolving them
+costs nothing extra.
+
+Selectors built from tag names, classes and ``[attr]``, ``[attr=v]``,
+``[attr*=v]``, ``[attr^=v]`` or ``[attr$=v]`` conditions, optionally
+joined by descendant combinators (all of the retailers' selectors), are
+compiled to plain attribute checks. Anything else falls back to
+soupsieve's per-element ``match``.
+
+Matches come out in the order the per-selector loop produced them:
+grouped by the first selector they match, in document order within a
+group. Matches of the first selector are yielded while the walk is still
+running, so a consumer that stops early never walks the rest of the page.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import soupsieve
+from bs4 import BeautifulSoup, Tag
+
+NAME_CLASS_REGEX = re.compile("name|title", re.I)
+
+
+class SelectorMatch(NamedTuple):
+    """A matched element with the link and name element around it."""
+
+    element: Tag
+    link: Optional[Tag]
+    title: Optional[Tag]
+
+
+class CompiledSelectors:
+    """A priority-ordered list of CSS selectors matched in one tree walk."""
+
+    def __init__(self, selectors: Iterable[str]) -> None:
+        # Repeated selectors can never win a later priority; keep the first.
+        self.selectors: Tuple[str, ...] = tuple(dict.fromkeys(selectors))
+        compiled = [_compile(selector) for selector in self.selectors]
+        self._matchers: List[Matcher] = [matcher for matcher, _ in compiled]
+        # Tags without attributes can be skipped when no selector could match one.
+        self._needs_attrs = all(needs_attrs for _, needs_attrs in compiled)
+
+    def iter_matches(self, soup: BeautifulSoup) -> Iterator[SelectorMatch]:
+        """Lazily yield every element matching any selector, in priority order."""
+
+        if not self._matchers:
+            return
+        later: List[List[SelectorMatch]] = [[] for _ in self._matchers[1:]]
+        last_link: Optional[Tag] = None
+        last_title: Optional[Tag] = None
+        needs_attrs = self._needs_attrs
+
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+            if element.attrs or not needs_attrs:
+                priority = self.priority(element)
+                if priority is not None:
+                    match = SelectorMatch(element, element.find_parent("a") or last_link, last_title)
+                    if priority == 0:
+                        yield match
+                    else:
+                        later[priority - 1].append(match)
+            # Only elements that start before a match may describe it.
+            if element.name == "a":
+                last_link = element
+            if _has_name_class(element):
+                last_title = element
+
+        for bucket in later:
+            yield from bucket
+
+    def priority(self, element: Tag) -> Optional[int]:
+        """Return the index of the first selector matching ``element``, if any."""
+
+        for index, matcher in enumerate(self._matchers):
+            if matcher(element):
+                return index
+        return None
+
+
+Matcher = Callable[[Tag], bool]
+
+_SIMPLE_COMPOUND = re.compile(
+    r"""(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<rest>(?:\.[\w-]+|\[\s*[\w-]+\s*(?:[*^$]?=\s*(?:'[^']*'|"[^"]*"|[\w-]+)\s*)?\])*)$"""
+)
+_PART = re.compile(
+    r"""\.(?P<cls>[\w-]+)|\[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[*^$]?=)\s*(?:'(?P<q1>[^']*)'|"(?P<q2>[^"]*)"|(?P<bare>[\w-]+))\s*)?\]"""
+)
+
+
+def _compile(selector: str) -> Tuple[Matcher, bool]:
+    """Compile a selector to attribute checks, or fall back to soupsieve.
+
+    Also returns whether only elements with attributes can match.
+    """
+
+    compounds = selector.split()
+    checks = [_compile_compound(compound) for compound in compounds]
+    if not compounds or any(check is None for check in checks):
+        return soupsieve.compile(selector).match, False
+
+    *ancestors, subject = checks
+
+    def match(element: Tag) -> bool:
+        if not subject(element):
+            return False
+        # Descendant combinators, matched right to left against the ancestors.
+        remaining = len(ancestors) - 1
+        parent = element.parent
+        while remaining >= 0 and parent is not None:
+            if ancestors[remaining](parent):
+                remaining -= 1
+            parent = parent.parent
+        return remaining < 0
+
+    return match, _SIMPLE_COMPOUND.match(compounds[-1]).group("rest") != ""
+
+
+def _compile_compound(compound: str) -> Optional[Matcher]:
+    found = _SIMPLE_COMPOUND.match(compound)
+    if found is None or not compound:
+        return None
+    tag = found.group("tag")
+    name = None if tag in (None, "*") else tag.lower()
+    conditions: List[Tuple[str, Optional[str], Optional[str]]] = []
+    for part in _PART.finditer(found.group("rest")):
+        if part.group("cls"):
+            conditions.append(("class", "~=", part.group("cls")))
+        else:
+            value = next((part.group(key) for key in ("q1", "q2", "bare") if part.group(key) is not None), None)
+            conditions.append((part.group("attr").lower(), part.group("op"), value))
+
+    def match(element: Tag) -> bool:
+        if name is not None and element.name != name:
+            return False
+        attrs = element.attrs
+        for attr, op, expected in conditions:
+            actual = attrs.get(attr)
+            if actual is None:
+                return False
+            if op is None:
+                continue
+            if attr == "class" and op == "~=":
+                classes = actual.split() if isinstance(actual, str) else actual
+                if expected not in classes:
+                    return False
+                continue
+            text = " ".join(actual) if isinstance(actual, list) else str(actual)
+            if op == "*=":
+                if not expected or expected not in text:
+                    return False
+            elif op == "^=":
+                if not expected or not text.startswith(expected):
+                    return False
+            elif op == "$=":
+                if not expected or not text.endswith(expected):
+                    return False
+            elif text != expected:
+                return False
+        return True
+
+    return match
+
+
+def _has_name_class(element: Tag) -> bool:
+    classes = element.get("class")
+    if not classes:
+        return False
+    if isinstance(classes, str):
+        classes = [classes]
+    return any(NAME_CLASS_REGEX.search(value) for value in classes)
+
+
+_compiled: Dict[Tuple[str, ...], CompiledSelectors] = {}
+_compiled_lock = threading.Lock()
+
+
+def compile_selectors(selectors: Iterable[str]) -> CompiledSelectors:
+    """Return the compiled matcher for ``selectors``, compiling each list once."""
+
+    key = tuple(selectors)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        with _compiled_lock:
+            compiled = _compiled.setdefault(key, CompiledSelectors(key))
+    return compiled
@@ -0,0 +1,85 @@
+"""Encoding of API payloads: field selection, fast JSON and compression.
+
+``dumps`` uses orjson when it is installed and the standard library
+otherwise; both produce the same compact UTF-8 JSON. ``compress`` supports
+``gzip`` always and ``br`` when the brotli package is installed.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+from typing import Any, FrozenSet, Optional, Tuple
+
+from .base import RESULT_FIELDS
+
+try:  # pragma: no cover - depends on the installed extras
+    import orjson
+except ImportError:  # pragma: no cover - depends on the installed extras
+    orjson = None
+
+try:  # pragma: no cover - depends on the installed extras
+    import brotli
+except ImportError:  # pragma: no cover - depends on the installed extras
+    brotli = None
+
+#: Result fields sent when a client does not ask for specific ones.
+DEFAULT_FIELDS: FrozenSet[str] = frozenset(RESULT_FIELDS) - {"debug"}
+
+#: Content codings ``compress`` can produce, most preferred first.
+ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def parse_fields(raw: Optional[str], *, debug: bool = False) -> FrozenSet[str]:
+    """Return the result fields named in a comma-separated ``?fields=`` value.
+
+    Without ``raw`` the default fields are used; ``debug`` adds the debug
+    dict to either. Raises ``ValueError`` for unknown field names.
+    """
+
+    if raw is None or not raw.strip():
+        fields = DEFAULT_FIELDS
+    else:
+        fields = frozenset(name.strip() for name in raw.split(",") if name.strip())
+        unknown = fields - frozenset(RESULT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown result fields: {', '.join(sorted(unknown))}")
+    return fields | {"debug"} if debug else fields
+
+
+def dumps(payload: Any) -> bytes:
+    """Serialise ``payload`` to compact UTF-8 JSON."""
+
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def strong_etag(body: bytes) -> str:
+    """Return a strong entity tag (without quotes) for ``body``."""
+
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def negotiate_encoding(accepted: Any) -> Optional[str]:
+    """Pick the preferred coding from a Werkzeug ``Accept-Encoding`` header, if any."""
+
+    for encoding in ENCODINGS:
+        if accepted.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress ``body`` with ``encoding`` (one of :data:`ENCODINGS`)."""
+
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        # A fixed mtime keeps identical bodies byte-identical.
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content coding: {encoding}")
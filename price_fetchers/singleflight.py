@@ -0,0 +1,94 @@
+"""Coalesce identical concurrent calls into a single in-flight execution."""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Raised when a waiter gives up before the in-flight call finishes."""
+
+
+class _Call(Generic[T]):
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+        self.shared: Any = None
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """Run at most one call per key at a time and share its outcome.
+
+    The first caller for a key (the leader) runs ``fn``; callers arriving
+    while it is in flight block until it finishes and receive the same
+    result, or the same exception. Waiters can bound how long they block.
+    The leader may attach a ``shared`` value to the call; each caller
+    joining it then has ``join(shared)`` run before it starts waiting.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call[T]] = {}
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"leaders": 0, "coalesced": 0, "timeouts": 0}
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], T],
+        *,
+        timeout: Optional[float] = None,
+        shared: Any = None,
+        join: Optional[Callable[[Any], None]] = None,
+    ) -> T:
+        """Return ``fn()``, sharing the call with concurrent callers of ``key``."""
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                call.shared = shared
+                leader = True
+                self._counters["leaders"] += 1
+            else:
+                leader = False
+                call.waiters += 1
+                self._counters["coalesced"] += 1
+                if join is not None:
+                    join(call.shared)
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as exc:
+                call.error = exc
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+            return call.result  # type: ignore[return-value]
+
+        if not call.done.wait(timeout):
+            with self._lock:
+                self._counters["timeouts"] += 1
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight call {key!r}")
+        if call.error is not None:
+            raise call.error
+        return call.result  # type: ignore[return-value]
+
+    def in_flight(self) -> int:
+        """Return the number of keys currently being executed."""
+
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return coalescing counters and the current in-flight count."""
+
+        with self._lock:
+            return {**self._counters, "in_flight": len(self._calls)}
@@ -2,18 +2,45 @@
 
 from __future__ import annotations
 
+import atexit
+import codecs
+import copy
+import functools
+import hashlib
 import json
 import logging
 import re
+import threading
+import time
 import warnings
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
+from requests.adapters import HTTPAdapter
 from requests.exceptions import SSLError
 from urllib3.exceptions import InsecureRequestWarning
 
+from .base import PriceResult
+from .deadline import current_deadline
+from .embedded import ArrayWatch, EmbeddedArray
+from .httpcache import Validators, get_http_cache
+from .metrics import counter, span, timed_iter
+from .offload import run_extraction
+from .ratelimit import HostBusy, RateLimits
+from .selectors import compile_selectors
+
+try:  # pragma: no cover - depends on the installed extras
+    import lxml  # noqa: F401
+except ImportError:  # pragma: no cover - depends on the installed extras
+    HTML_PARSER = "html.parser"
+else:  # pragma: no cover - depends on the installed extras
+    HTML_PARSER = "lxml"
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_HEADERS = {
@@ -28,8 +55,36 @@ DEFAULT_HEADERS = {
     "Upgrade-Insecure-Requests": "1",
 }
 REQUEST_TIMEOUT = 30
+CONNECT_TIMEOUT = 5
+SESSION_POOL_SIZE = 10
+# Bytes read at a time when a download may stop early (see ``stream_until``).
+STREAM_CHUNK_SIZE = 16 * 1024
+# Extracted results kept per retailer, keyed by a hash of the page body.
+EXTRACTION_MEMO_SIZE = 256
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+# Per-host token buckets shared by every thread; None sends requests unpaced.
+_pacing: Optional[RateLimits] = None
+
+PACED_REQUESTS = counter(
+    "price_outbound_paced_total",
+    "Outbound requests delayed, or refused for lack of time, by the per-host pacer.",
+    ("host", "outcome"),
+)
+STREAMED_DOWNLOADS = counter(
+    "price_streamed_downloads_total",
+    "Streamed page downloads stopped early once the embedded products were complete, read to the end, or refetched in full.",
+    ("host", "outcome"),
+)
+EXTRACTION_MEMO = counter("price_extraction_memo_total", "Page extractions served from the body-hash memo.", ("outcome",))
 
 PRICE_REGEX = re.compile(r"(\d+[.,]\d+|\d+)\s*(?:TL|₺|TRY|Lira)?", re.IGNORECASE)
+JSON_LD_SCRIPT_REGEX = re.compile(
+    r"<script\b[^>]*\btype\s*=\s*[\"']?application/ld\+json[\"']?[^>]*>(.*?)</script\s*>",
+    re.IGNORECASE | re.DOTALL,
+)
 
 
 class FetchError(RuntimeError):
@@ -45,6 +100,108 @@ class JsonLdProduct:
     raw_price_text: Optional[str]
 
 
+def configure_sessions(*, pool_size: int) -> None:
+    """Set the connection pool size used for every retailer host.
+
+    Existing sessions are closed so the next request picks up the new size.
+    """
+
+    global SESSION_POOL_SIZE
+
+    if pool_size < 1:
+        raise ValueError("pool_size must be at least 1")
+    SESSION_POOL_SIZE = pool_size
+    close_sessions()
+
+
+def configure_host_pacing(
+    rate: Optional[float],
+    *,
+    burst: Optional[float] = None,
+    rates: Optional[Mapping[str, float]] = None,
+) -> None:
+    """Pace requests to each host to ``rate`` per second, allowing bursts of ``burst``.
+
+    ``rates`` overrides the rate of individual hosts, e.g.
+    ``{"www.gratis.com": 2}``. A falsy ``rate`` turns pacing off.
+    """
+
+    global _pacing
+
+    _pacing = RateLimits(rate, rates=rates, capacity=burst) if rate else None
+
+
+def get_session(url: str) -> requests.Session:
+    """Return the shared keep-alive session for the host of ``url``.
+
+    One session (and therefore one urllib3 connection pool) is kept per
+    retailer host so DNS, TCP and TLS setup are paid once and reused across
+    Flask requests and worker threads.
+    """
+
+    host = urlsplit(url).netloc.lower()
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            # Keep lookups independent: cookies still follow redirects within a
+            # single request but are never persisted between requests.
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=SESSION_POOL_SIZE,
+                pool_block=False,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+    return session
+
+
+def close_sessions() -> None:
+    """Close every pooled session, releasing their open connections."""
+
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+atexit.register(close_sessions)
+
+
+class ParsedPage:
+    """A fetched HTML document shared by every extraction strategy.
+
+    The BeautifulSoup tree is built at most once, on first access, with the
+    fastest installed parser. Strategies that only need raw markup, such as
+    the JSON-LD and embedded payload scans, never trigger it.
+    """
+
+    __slots__ = ("html", "_soup")
+
+    def __init__(self, html: str) -> None:
+        self.html = html
+        self._soup: Optional[BeautifulSoup] = None
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None:
+            with span("html_parse"):
+                self._soup = BeautifulSoup(self.html, HTML_PARSER)
+        return self._soup
+
+    def json_ld_blocks(self) -> List[str]:
+        """Return the bodies of ``<script type="application/ld+json">`` tags."""
+
+        return [match.group(1) for match in JSON_LD_SCRIPT_REGEX.finditer(self.html)]
+
+
 def fetch_html(
     url: str,
     *,
@@ -52,8 +209,24 @@ def fetch_html(
     allow_insecure_ssl: bool = False,
     headers: Optional[Dict[str, str]] = None,
     include_default_headers: bool = True,
+    timeout: Optional[Tuple[float, float]] = None,
+    stream_until: Optional[EmbeddedArray] = None,
 ) -> Tuple[str, str]:
-    """Retrieve HTML from a URL returning the response text and final URL."""
+    """Retrieve HTML from a URL returning the response text and final URL.
+
+    ``timeout`` is a ``(connect, read)`` pair defaulting to
+    ``(CONNECT_TIMEOUT, REQUEST_TIMEOUT)``; both are capped by the deadline
+    of the current comparison, if one is active. With an HTTP cache
+    configured the request is conditional, and a ``304 Not Modified``
+    returns the stored body without downloading it again.
+
+    With ``stream_until`` the body is decoded as it arrives and the
+    download stops as soon as that embedded array is complete; the text
+    returned then ends there. Pages without the array are read in full, and
+    so is a page again when the array it was cut after extracts to nothing,
+    since the other extraction strategies need the whole page. A cut-short
+    body is never stored in the HTTP cache.
+    """
 
     request_headers: Dict[str, str] = {}
     if include_default_headers:
@@ -61,27 +234,66 @@ def fetch_html(
     if headers:
         request_headers.update(headers)
 
+    cache = get_http_cache()
+    cache_key = cache.make_key(url, params) if cache is not None else ""
+    validators = cache.validators(cache_key) if cache is not None else None
+
     request_kwargs = {
-        "headers": request_headers,
+        "headers": {**request_headers, **(validators.request_headers() if validators else {})},
         "params": params,
-        "timeout": REQUEST_TIMEOUT,
         "verify": True,
     }
 
-    try:
-        response = requests.get(url, **request_kwargs)
-        response.raise_for_status()
-
-        # Try to handle encoding issues
-        if response.encoding == "ISO-8859-1":
+    session = get_session(url)
+    watch = stream_until.watch() if stream_until is not None else None
+    response, text = _send(session, url, request_kwargs, timeout, allow_insecure_ssl, watch)
+    if response.status_code == 304 and validators is not None:
+        with span("revalidate"):
+            body = cache.load(cache_key)
+        if body is not None:
+            return body, validators.final_url
+        # The stored copy is gone; ask again without validators.
+        request_kwargs["headers"] = request_headers
+        watch = stream_until.watch() if stream_until is not None else None
+        response, text = _send(session, url, request_kwargs, timeout, allow_insecure_ssl, watch)
+
+    cut_short = watch is not None and watch.done
+    if cut_short and not stream_until.extract(text):
+        STREAMED_DOWNLOADS.inc(urlsplit(response.url).netloc.lower(), "refetched")
+        request_kwargs["headers"] = request_headers
+        response, text = _send(session, url, request_kwargs, timeout, allow_insecure_ssl)
+        cut_short = False
+
+    if text is None:
+        with span("decode"):
+            # Retailer pages are Turkish UTF-8 whatever the headers claim.
             response.encoding = "utf-8"
+            text = response.text
+
+    if not text:
+        raise FetchError("Empty response body")
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if cache is not None and response.status_code == 200 and (etag or last_modified) and not cut_short:
+        cache.store(cache_key, text, Validators(etag, last_modified, response.url))
+
+    return text, response.url
 
-        # Force UTF-8 encoding for Turkish content
-        try:
-            response.encoding = "utf-8"
-        except:
-            pass
 
+def _send(
+    session: requests.Session,
+    url: str,
+    request_kwargs: Dict[str, Any],
+    timeout: Optional[Tuple[float, float]],
+    allow_insecure_ssl: bool,
+    watch: Optional[ArrayWatch] = None,
+) -> Tuple[requests.Response, Optional[str]]:
+    """Send the request, retrying without certificate checks when allowed."""
+
+    try:
+        _pace(url)
+        return _get(session, url, {**request_kwargs, "timeout": _request_timeout(timeout)}, watch)
     except SSLError as ssl_exc:
         if not allow_insecure_ssl:
             raise FetchError(str(ssl_exc)) from ssl_exc
@@ -91,25 +303,132 @@ def fetch_html(
         try:
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore", InsecureRequestWarning)
-                response = requests.get(url, **request_kwargs)
-            response.raise_for_status()
-
-            if response.encoding == "ISO-8859-1":
-                response.encoding = "utf-8"
-            try:
-                response.encoding = "utf-8"
-            except:
-                pass
+                _pace(url)
+                return _get(session, url, {**request_kwargs, "timeout": _request_timeout(timeout)}, watch)
         except requests.RequestException as exc:  # pragma: no cover - network issues are runtime concerns
             raise FetchError(str(exc)) from exc
 
     except requests.RequestException as exc:  # pragma: no cover - network issues are runtime concerns
         raise FetchError(str(exc)) from exc
 
-    if not response.text:
-        raise FetchError("Empty response body")
 
-    return response.text, response.url
+def _get(
+    session: requests.Session,
+    url: str,
+    request_kwargs: Dict[str, Any],
+    watch: Optional[ArrayWatch] = None,
+) -> Tuple[requests.Response, Optional[str]]:
+    """Send the request and download the body, timing each as its own stage.
+
+    ``connect`` covers everything up to the response headers (DNS, TCP, TLS
+    and time to first byte); ``download`` covers reading the body. A
+    successful body read with a ``watch`` is decoded on the way and
+    returned as text; otherwise the text is ``None`` and left to the caller.
+    """
+
+    with span("connect"):
+        response = session.get(url, stream=True, **request_kwargs)
+    if watch is None or response.status_code != 200:
+        with span("download"):
+            # Reading the body also hands the connection back to the pool.
+            response.content
+        response.raise_for_status()
+        return response, None
+    with span("download"):
+        return response, _read_until(response, watch)
+
+
+def _read_until(response: requests.Response, watch: ArrayWatch) -> str:
+    """Decode the body as UTF-8 while it arrives, hanging up once ``watch`` is satisfied."""
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    host = urlsplit(response.url).netloc.lower()
+    parts: List[str] = []
+    for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+        parts.append(decoder.decode(chunk))
+        if parts[-1] and watch.feed(parts):
+            # Closing mid-body drops the connection instead of pooling it;
+            # a new one costs less than the rest of a large page.
+            response.close()
+            STREAMED_DOWNLOADS.inc(host, "stopped_early")
+            return "".join(parts)
+    parts.append(decoder.decode(b"", final=True))
+    STREAMED_DOWNLOADS.inc(host, "read_fully")
+    return "".join(parts)
+
+
+def _pace(url: str) -> None:
+    """Wait for the host's next request slot; give up early if it is beyond the deadline."""
+
+    pacing = _pacing
+    if pacing is None:
+        return
+
+    host = urlsplit(url).netloc.lower()
+    deadline = current_deadline()
+    wait = pacing.get(host).reserve(max_wait=deadline.remaining() if deadline is not None else None)
+    if wait is None:
+        PACED_REQUESTS.inc(host, "refused")
+        raise HostBusy(f"{host} için istek sırası süre sınırını aşıyor")
+    if wait > 0:
+        PACED_REQUESTS.inc(host, "delayed")
+        with span("pacing"):
+            time.sleep(wait)
+
+
+def _request_timeout(timeout: Optional[Tuple[float, float]]) -> Tuple[float, float]:
+    """Return the (connect, read) timeout left for a request under the current deadline."""
+
+    connect, read = timeout or (CONNECT_TIMEOUT, REQUEST_TIMEOUT)
+    deadline = current_deadline()
+    if deadline is None:
+        return connect, read
+
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise FetchError("Süre sınırı aşıldı")
+    return min(connect, remaining), min(read, remaining)
+
+
+def memoize_extraction(build: Callable[..., PriceResult]) -> Callable[..., PriceResult]:
+    """Memoize a ``build(html, final_url, limit=1)`` extractor by a hash of the page.
+
+    A page that is unchanged since an earlier fetch, whether served from a
+    ``304`` or downloaded again identically, reuses the earlier result and
+    never reaches BeautifulSoup. Callers get their own copy, marked with
+    ``debug["memoized"] = True``. ``cache_clear()`` empties the memo.
+    """
+
+    memo: "OrderedDict[Tuple[bytes, Optional[str], int], PriceResult]" = OrderedDict()
+    lock = threading.Lock()
+
+    @functools.wraps(build)
+    def wrapper(html: str, final_url: Optional[str], limit: int = 1) -> PriceResult:
+        key = (hashlib.blake2b(html.encode("utf-8"), digest_size=16).digest(), final_url, limit)
+        with lock:
+            cached = memo.get(key)
+            if cached is not None:
+                memo.move_to_end(key)
+        if cached is not None:
+            EXTRACTION_MEMO.inc("hit")
+            result = copy.deepcopy(cached)
+            result.debug["memoized"] = True
+            return result
+
+        EXTRACTION_MEMO.inc("miss")
+        result = run_extraction(build, html, final_url, limit)
+        with lock:
+            memo[key] = copy.deepcopy(result)
+            while len(memo) > EXTRACTION_MEMO_SIZE:
+                memo.popitem(last=False)
+        return result
+
+    def cache_clear() -> None:
+        with lock:
+            memo.clear()
+
+    wrapper.cache_clear = cache_clear  # type: ignore[attr-defined]
+    return wrapper
 
 
 def parse_price(text: str) -> Optional[float]:
@@ -129,22 +448,24 @@ def parse_price(text: str) -> Optional[float]:
         return None
 
 
-def parse_json_ld_products(html: str) -> List[JsonLdProduct]:
+def parse_json_ld_products(page: Union[str, ParsedPage]) -> List[JsonLdProduct]:
     """Extract product information from JSON-LD blocks when available."""
 
-    soup = BeautifulSoup(html, "html.parser")
+    if isinstance(page, str):
+        page = ParsedPage(page)
     products: List[JsonLdProduct] = []
-    for script in soup.find_all("script", attrs={"type": "application/ld+json"}):
-        if not script.string:
-            continue
-        try:
-            data = json.loads(script.string)
-        except json.JSONDecodeError:
-            continue
-        for item in _iter_json_items(data):
-            product = _extract_product_from_json(item)
-            if product:
-                products.append(product)
+    with span("json_ld"):
+        for block in page.json_ld_blocks():
+            if not block.strip():
+                continue
+            try:
+                data = json.loads(block)
+            except json.JSONDecodeError:
+                continue
+            for item in _iter_json_items(data):
+                product = _extract_product_from_json(item)
+                if product:
+                    products.append(product)
     return products
 
 
@@ -217,33 +538,57 @@ def _extract_product_from_json(item: Any) -> Optional[JsonLdProduct]:
 def find_price_candidates(soup: BeautifulSoup, selectors: Iterable[str]) -> List[Tuple[str, str, str]]:
     """Return potential (name, price_text, url) tuples from HTML selectors."""
 
-    candidates: List[Tuple[str, str, str]] = []
-    for selector in selectors:
-        for element in soup.select(selector):
-            price_text = element.get_text(" ", strip=True)
-            if not price_text:
-                continue
-            price_value = parse_price(price_text)
-            if price_value is None:
-                continue
+    return list(iter_price_candidates(soup, selectors))
 
-            product_link = element.find_parent("a") or element.find_previous("a")
-            product_name = None
-            product_url = None
-            if product_link:
-                product_name = product_link.get_text(" ", strip=True)
-                product_url = product_link.get("href")
-
-            if not product_name:
-                title_el = element.find_previous(class_=re.compile("name|title", re.I))
-                if title_el:
-                    product_name = title_el.get_text(" ", strip=True)
-
-            candidates.append(
-                (
-                    product_name or "Ürün",  # default name placeholder
-                    price_text,
-                    product_url or "",
-                )
-            )
-    return candidates
+
+def iter_price_candidates(soup: BeautifulSoup, selectors: Iterable[str]) -> Iterator[Tuple[str, str, str]]:
+    """Lazily yield potential (name, price_text, url) tuples from HTML selectors."""
+
+    return timed_iter("selectors", (candidate[:3] for candidate in _iter_price_candidates(soup, selectors)))
+
+
+def iter_price_elements(
+    soup: BeautifulSoup, selectors: Iterable[str]
+) -> Iterator[Tuple[str, str, str, Tag]]:
+    """Like :func:`iter_price_candidates`, also yielding the matched price element."""
+
+    return timed_iter("selectors", _iter_price_candidates(soup, selectors))
+
+
+def _iter_price_candidates(soup: BeautifulSoup, selectors: Iterable[str]) -> Iterator[Tuple[str, str, str, Tag]]:
+    # One walk over the tree for every selector; see price_fetchers.selectors.
+    for element, product_link, title_el in compile_selectors(selectors).iter_matches(soup):
+        price_text = element.get_text(" ", strip=True)
+        if not price_text:
+            continue
+        price_value = parse_price(price_text)
+        if price_value is None:
+            continue
+
+        product_name = None
+        product_url = None
+        if product_link:
+            product_name = product_link.get_text(" ", strip=True)
+            product_url = product_link.get("href")
+
+        if not product_name and title_el:
+            product_name = title_el.get_text(" ", strip=True)
+
+        yield (
+            product_name or "Ürün",  # default name placeholder
+            price_text,
+            product_url or "",
+            element,
+        )
+
+
+def iter_unique_results(results: Iterable[PriceResult]) -> Iterator[PriceResult]:
+    """Drop results repeating an earlier product name, price and URL."""
+
+    seen = set()
+    for result in results:
+        key = (result.product_name, result.price, result.product_url)
+        if key in seen:
+            continue
+        seen.add(key)
+        yield result
@@ -0,0 +1,253 @@
+"""Keep the most popular queries cached by refreshing them before they expire."""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .base import PriceResult, normalise_query
+from .ratelimit import RateLimits
+
+logger = logging.getLogger(__name__)
+
+HALF_LIFE = 600.0
+MAX_TRACKED = 5000
+TOP_K = 300
+LEAD_TIME = 60.0
+INTERVAL = 5.0
+WARM_RATE = 2.0
+# Refresh error types meaning the refresh was turned away for load, not tried.
+DEFERRED_ERROR_TYPES = frozenset({"busy"})
+
+WarmKey = Tuple[str, str, int]
+
+
+class PopularityTracker:
+    """Exponentially decaying hit counts per (query, limit).
+
+    A hit is worth half as much after every ``half_life`` seconds. Scores
+    are kept in "forward decay" form, growing with time instead of every
+    old score shrinking, so a hit is O(1). When more than ``max_tracked``
+    queries are known the least popular tenth is forgotten.
+    """
+
+    def __init__(
+        self,
+        *,
+        half_life: float = HALF_LIFE,
+        max_tracked: int = MAX_TRACKED,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self._clock = clock
+        self._epoch = clock()
+        self._scores: Dict[Tuple[str, int], float] = {}
+        self._queries: Dict[Tuple[str, int], str] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, query: str, limit: int = 1) -> None:
+        key = (normalise_query(query), limit)
+        if not key[0]:
+            return
+        with self._lock:
+            exponent = (self._clock() - self._epoch) / self.half_life
+            if exponent > 512:
+                self._rebase(exponent)
+                exponent = 0.0
+            self._scores[key] = self._scores.get(key, 0.0) + 2.0 ** exponent
+            self._queries.setdefault(key, query.strip())
+            if len(self._scores) > self.max_tracked:
+                self._prune()
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        """Return the ``k`` most popular ``(query, limit)`` pairs, most popular first."""
+
+        with self._lock:
+            keys = heapq.nlargest(k, self._scores, key=self._scores.__getitem__)
+            return [(self._queries[key], key[1]) for key in keys]
+
+    def score(self, query: str, limit: int = 1) -> float:
+        """Return the current decayed hit count of a query."""
+
+        with self._lock:
+            raw = self._scores.get((normalise_query(query), limit), 0.0)
+            return raw / 2.0 ** ((self._clock() - self._epoch) / self.half_life)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _rebase(self, exponent: float) -> None:
+        scale = 2.0 ** -exponent
+        self._scores = {key: value * scale for key, value in self._scores.items()}
+        self._epoch = self._clock()
+
+    def _prune(self) -> None:
+        keep = heapq.nlargest(self.max_tracked * 9 // 10, self._scores, key=self._scores.__getitem__)
+        self._scores = {key: self._scores[key] for key in keep}
+        self._queries = {key: self._queries[key] for key in keep}
+
+
+class CacheWarmer:
+    """Refresh popular cache entries shortly before they expire.
+
+    Every ``interval`` seconds the ``top_k`` most popular queries are
+    checked for each retailer. Cached prices that expire within
+    ``lead_time`` seconds are scheduled at a random moment before the last
+    ``lead_time / 2`` seconds of their life, so refreshes of entries cached
+    together do not all fire at once. Due refreshes are handed to
+    ``dispatch`` while the retailer's token bucket allows (``rates``
+    refreshes per second, ``default_rate`` otherwise); the rest wait.
+
+    ``expires_in(query, retailer, limit)`` returns the seconds left before
+    a successful entry expires (``None`` when there is none, so failing
+    queries are left to user traffic) and
+    ``dispatch(query, retailer, limit)`` starts the refresh and returns a
+    future of its result. Refreshes shed or refused as busy count as
+    ``deferred``, other error results and errors as ``failed``.
+    """
+
+    def __init__(
+        self,
+        popularity: PopularityTracker,
+        *,
+        retailers: Callable[[], Iterable[str]],
+        expires_in: Callable[[str, str, int], Optional[float]],
+        dispatch: Callable[[str, str, int], "Future[Optional[PriceResult]]"],
+        top_k: int = TOP_K,
+        lead_time: float = LEAD_TIME,
+        interval: float = INTERVAL,
+        default_rate: float = WARM_RATE,
+        rates: Optional[Mapping[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.popularity = popularity
+        self.top_k = top_k
+        self.lead_time = lead_time
+        self.interval = interval
+        self._retailers = retailers
+        self._expires_in = expires_in
+        self._dispatch = dispatch
+        self._limits = RateLimits(default_rate, rates=rates, clock=clock)
+        self._clock = clock
+        self._schedule: List[Tuple[float, WarmKey]] = []
+        self._scheduled: Set[WarmKey] = set()
+        self._running: Set[WarmKey] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counters: Dict[str, int] = {"scheduled": 0, "dispatched": 0, "completed": 0, "failed": 0, "deferred": 0}
+        self._max_lag = 0.0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def tick(self) -> None:
+        """Schedule refreshes for popular entries and dispatch those that are due."""
+
+        self._plan()
+        self._dispatch_due()
+
+    def stats(self) -> Dict[str, float]:
+        """Return counters plus the backlog and how late the oldest due refresh is."""
+
+        now = self._clock()
+        with self._lock:
+            overdue = [now - due for due, _ in self._schedule if due <= now]
+            return {
+                **self._counters,
+                "tracked": len(self.popularity),
+                "backlog": len(self._schedule),
+                "due": len(overdue),
+                "running": len(self._running),
+                "lag_seconds": round(max(overdue, default=0.0), 3),
+                "max_lag_seconds": round(self._max_lag, 3),
+            }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception:  # pragma: no cover - keep warming after unexpected errors
+                logger.exception("Cache warmer tick failed")
+
+    def _plan(self) -> None:
+        now = self._clock()
+        retailers = list(self._retailers())
+        for query, limit in self.popularity.top(self.top_k):
+            for retailer in retailers:
+                key = (query, retailer, limit)
+                with self._lock:
+                    if key in self._scheduled or key in self._running:
+                        continue
+                remaining = self._expires_in(query, retailer, limit)
+                if remaining is None or remaining > self.lead_time:
+                    continue
+                due = now + random.uniform(0.0, max(0.0, remaining - self.lead_time / 2))
+                with self._lock:
+                    heapq.heappush(self._schedule, (due, key))
+                    self._scheduled.add(key)
+                    self._counters["scheduled"] += 1
+
+    def _dispatch_due(self) -> None:
+        now = self._clock()
+        ready: List[WarmKey] = []
+        deferred: List[Tuple[float, WarmKey]] = []
+        with self._lock:
+            while self._schedule and self._schedule[0][0] <= now:
+                due, key = heapq.heappop(self._schedule)
+                if not self._limits.try_acquire(key[1]):
+                    deferred.append((due, key))
+                    self._counters["deferred"] += 1
+                    continue
+                self._scheduled.discard(key)
+                self._running.add(key)
+                self._counters["dispatched"] += 1
+                self._max_lag = max(self._max_lag, now - due)
+                ready.append(key)
+            for item in deferred:
+                heapq.heappush(self._schedule, item)
+
+        for key in ready:
+            try:
+                future = self._dispatch(*key)
+            except Exception:  # pragma: no cover - dispatch normally returns a future
+                logger.exception("Dispatching cache refresh failed for %s", key)
+                self._finish(key, "failed")
+                continue
+            future.add_done_callback(lambda done, key=key: self._finish(key, _outcome(done)))
+
+    def _finish(self, key: WarmKey, outcome: str) -> None:
+        with self._lock:
+            self._running.discard(key)
+            self._counters[outcome] += 1
+
+
+def _outcome(done: "Future[Optional[PriceResult]]") -> str:
+    """Return the counter a finished refresh belongs to."""
+
+    if done.exception() is not None:
+        return "failed"
+    result = done.result()
+    if result is None:
+        return "failed"
+    if result.is_successful:
+        return "completed"
+    if result.debug.get("error_type") in DEFERRED_ERROR_TYPES:
+        return "deferred"
+    return "failed"
@@ -21,93 +21,204 @@ function formatPrice(value) {
   }).format(value);
 }
 
-function renderResults(data) {
-  resultsContainer.innerHTML = "";
-  if (!Array.isArray(data.results) || data.results.length === 0) {
-    resultsContainer.innerHTML = "<p>Sonuç bulunamadı.</p>";
-    return;
+function createResultCard(result, cheapestRetailer) {
+  const card = document.createElement("article");
+  card.className = "result-card";
+  if (result.retailer === cheapestRetailer && result.price != null) {
+    card.classList.add("best");
+  }
+  card.dataset.retailer = result.retailer;
+  if (typeof result.price === "number" && !result.error) {
+    card.dataset.price = String(result.price);
   }
 
-  const cheapestRetailer = data.cheapest ? data.cheapest.retailer : null;
-
-  data.results.forEach((result) => {
-    const card = document.createElement("article");
-    card.className = "result-card";
-    if (result.retailer === cheapestRetailer && result.price != null) {
-      card.classList.add("best");
-    }
+  const retailer = document.createElement("div");
+  retailer.className = "retailer";
+  retailer.textContent = result.retailer;
 
-    const retailer = document.createElement("div");
-    retailer.className = "retailer";
-    retailer.textContent = result.retailer;
+  const name = document.createElement("h3");
+  name.textContent = result.product_name || "Ürün bilgisi alınamadı";
 
-    const name = document.createElement("h3");
-    name.textContent = result.product_name || "Ürün bilgisi alınamadı";
+  const priceBlock = document.createElement("div");
+  priceBlock.className = "price-block";
 
-    const priceBlock = document.createElement("div");
-    priceBlock.className = "price-block";
+  const renderPricePair = (labelText, valueText, extraClass) => {
+    const wrapper = document.createElement("div");
+    wrapper.className = extraClass;
 
-    const renderPricePair = (labelText, valueText, extraClass) => {
-      const wrapper = document.createElement("div");
-      wrapper.className = extraClass;
+    const label = document.createElement("span");
+    label.className = "price-label";
+    label.textContent = labelText;
 
-      const label = document.createElement("span");
-      label.className = "price-label";
-      label.textContent = labelText;
+    const value = document.createElement("span");
+    value.className = "price-value";
+    value.textContent = valueText;
 
-      const value = document.createElement("span");
-      value.className = "price-value";
-      value.textContent = valueText;
+    wrapper.append(label, value);
+    return wrapper;
+  };
 
-      wrapper.append(label, value);
-      return wrapper;
-    };
+  const currentPriceText =
+    result.raw_price_text || formatPrice(result.price);
+  const originalText =
+    result.original_price_text || formatPrice(result.original_price);
+  const hasOriginal =
+    originalText &&
+    (typeof result.original_price === "number"
+      ? typeof result.price !== "number" ||
+        Math.abs(result.original_price - result.price) > 0.01
+      : true);
 
-    const currentPriceText =
-      result.raw_price_text || formatPrice(result.price);
-    const originalText =
-      result.original_price_text || formatPrice(result.original_price);
-    const hasOriginal =
-      originalText &&
-      (typeof result.original_price === "number"
-        ? typeof result.price !== "number" ||
-          Math.abs(result.original_price - result.price) > 0.01
-        : true);
+  const currentLabelText = hasOriginal ? "İndirimli fiyat" : "Fiyat";
 
-    const currentLabelText = hasOriginal ? "İndirimli fiyat" : "Fiyat";
+  priceBlock.appendChild(
+    renderPricePair(currentLabelText, currentPriceText, "price-current")
+  );
 
+  if (hasOriginal) {
     priceBlock.appendChild(
-      renderPricePair(currentLabelText, currentPriceText, "price-current")
+      renderPricePair("Normal fiyat", originalText, "price-original")
     );
+  }
 
-    if (hasOriginal) {
-      priceBlock.appendChild(
-        renderPricePair("Normal fiyat", originalText, "price-original")
-      );
-    }
+  card.append(retailer, name, priceBlock);
 
-    card.append(retailer, name, priceBlock);
+  if (result.product_url) {
+    const link = document.createElement("a");
+    link.href = result.product_url;
+    link.target = "_blank";
+    link.rel = "noopener";
+    link.textContent = "Ürüne git";
+    card.appendChild(link);
+  }
 
-    if (result.product_url) {
-      const link = document.createElement("a");
-      link.href = result.product_url;
-      link.target = "_blank";
-      link.rel = "noopener";
-      link.textContent = "Ürüne git";
-      card.appendChild(link);
-    }
+  if (result.error) {
+    const error = document.createElement("p");
+    error.textContent = result.error;
+    error.className = "form-helper";
+    card.appendChild(error);
+  }
+
+  return card;
+}
+
+function renderResults(data) {
+  resultsContainer.innerHTML = "";
+  if (!Array.isArray(data.results) || data.results.length === 0) {
+    resultsContainer.innerHTML = "<p>Sonuç bulunamadı.</p>";
+    return;
+  }
 
-    if (result.error) {
-      const error = document.createElement("p");
-      error.textContent = result.error;
-      error.className = "form-helper";
-      card.appendChild(error);
+  const cheapestRetailer = data.cheapest ? data.cheapest.retailer : null;
+
+  data.results.forEach((result) => {
+    resultsContainer.appendChild(createResultCard(result, cheapestRetailer));
+  });
+}
+
+function insertResultCard(result) {
+  // Keep priced cards sorted by price, with failed lookups after them.
+  const card = createResultCard(result, null);
+  const price = card.dataset.price != null ? Number(card.dataset.price) : null;
+  const next = Array.from(resultsContainer.children).find((existing) => {
+    if (price == null) {
+      return false;
     }
+    return existing.dataset.price == null || Number(existing.dataset.price) > price;
+  });
+  resultsContainer.insertBefore(card, next || null);
+}
 
-    resultsContainer.appendChild(card);
+function markCheapest(cheapest) {
+  resultsContainer.querySelectorAll(".result-card.best").forEach((card) => {
+    card.classList.remove("best");
   });
+  if (!cheapest) {
+    return;
+  }
+  const best = Array.from(resultsContainer.children).find(
+    (card) => card.dataset.retailer === cheapest.retailer
+  );
+  if (best) {
+    best.classList.add("best");
+  }
+}
+
+function updateStatus(query, results) {
+  if (results.some((item) => item.price != null)) {
+    setStatus(`${query} için sonuçlar hazır.`);
+  } else if (results.length > 0) {
+    setStatus("Ürünler bulundu ancak fiyat bilgisi alınamadı.", "error");
+  } else {
+    setStatus("Sonuç bulunamadı.", "error");
+  }
+}
+
+async function readErrorMessage(response) {
+  const payload = await response.json().catch(() => ({ error: response.statusText }));
+  return payload.error || "Sunucu hatası";
 }
 
+async function compareOnce(query, signal) {
+  const response = await fetch(`/api/compare?query=${encodeURIComponent(query)}`, { signal });
+  if (!response.ok) {
+    throw new Error(await readErrorMessage(response));
+  }
+  const data = await response.json();
+  if (signal.aborted) {
+    return;
+  }
+  updateStatus(data.query, data.results || []);
+  renderResults(data);
+}
+
+async function compareStreaming(query, signal) {
+  const response = await fetch(`/api/compare/stream?query=${encodeURIComponent(query)}`, {
+    signal,
+  });
+  if (!response.ok) {
+    throw new Error(await readErrorMessage(response));
+  }
+
+  const results = [];
+  const handleLine = (line) => {
+    // Rows still buffered from a replaced search must not reach the page.
+    if (signal.aborted || !line.trim()) {
+      return;
+    }
+    const event = JSON.parse(line);
+    if (event.type === "result") {
+      results.push(event.result);
+      insertResultCard(event.result);
+      setStatus("Fiyatlar geliyor...");
+    } else if (event.type === "summary") {
+      markCheapest(event.cheapest);
+      updateStatus(event.query, results);
+      if (results.length === 0) {
+        resultsContainer.innerHTML = "<p>Sonuç bulunamadı.</p>";
+      }
+    }
+  };
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) {
+      break;
+    }
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.forEach(handleLine);
+  }
+  handleLine(buffer + decoder.decode());
+}
+
+// The search whose results are on the page; a new search aborts it.
+let activeSearch = null;
+
 form.addEventListener("submit", (event) => {
   event.preventDefault();
   const formData = new FormData(form);
@@ -117,30 +228,25 @@ form.addEventListener("submit", (event) => {
     return;
   }
 
+  if (activeSearch) {
+    activeSearch.abort();
+  }
+  const search = new AbortController();
+  activeSearch = search;
+
   setStatus("Fiyatlar getiriliyor...");
   resultsContainer.innerHTML = "";
 
-  fetch(`/api/compare?query=${encodeURIComponent(query)}`)
-    .then(async (response) => {
-      if (!response.ok) {
-        const payload = await response.json().catch(() => ({ error: response.statusText }));
-        throw new Error(payload.error || "Sunucu hatası");
-      }
-      return response.json();
-    })
-    .then((data) => {
-      if (data.results && data.results.some((item) => item.price != null)) {
-        setStatus(`${data.query} için sonuçlar hazır.`);
-      } else if (data.results && data.results.length > 0) {
-        setStatus("Ürünler bulundu ancak fiyat bilgisi alınamadı.", "error");
-      } else {
-        setStatus("Sonuç bulunamadı.", "error");
-      }
-      renderResults(data);
-    })
-    .catch((error) => {
-      console.error(error);
-      setStatus(error.message || "Bir hata oluştu", "error");
-      resultsContainer.innerHTML = "";
-    });
+  const supportsStreaming =
+    typeof ReadableStream !== "undefined" && typeof TextDecoder !== "undefined";
+  const compare = supportsStreaming ? compareStreaming : compareOnce;
+
+  compare(query, search.signal).catch((error) => {
+    if (search.signal.aborted) {
+      return;
+    }
+    console.error(error);
+    setStatus(error.message || "Bir hata oluştu", "error");
+    resultsContainer.innerHTML = "";
+  });
 });
@@ -5,6 +5,7 @@ from __future__ import annotations
 from typing import Callable, Dict
 import pathlib
 import sys
+import threading
 
 import pytest
 
@@ -15,6 +16,9 @@ if str(PROJECT_ROOT) not in sys.path:
 
 from price_fetchers import aggregator
 from price_fetchers.base import PriceResult
+from price_fetchers.cache import ResultCache
+from price_fetchers.deadline import current_deadline
+from price_fetchers.singleflight import SingleFlight
 
 
 @pytest.fixture()
@@ -40,6 +44,7 @@ def fake_fetchers(monkeypatch: pytest.MonkeyPatch) -> Dict[str, Callable[[str],
         "MissingPrice": missing_price_fetch,
     }
     monkeypatch.setattr(aggregator, "FETCHERS", fakes)
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache())
     return fakes
 
 
@@ -61,3 +66,109 @@ def test_compare_prices_returns_successes_sorted_before_failures(fake_fetchers):
         "Expensive",
     ]
     assert all(not result.is_successful for result in results[len(successful) :])
+
+
+def test_retailers_missing_the_deadline_are_reported_as_timed_out(monkeypatch):
+    """Slow retailers become timed-out results while fast ones are returned."""
+
+    release = threading.Event()
+
+    def slow(_query: str) -> PriceResult:
+        release.wait(timeout=2)
+        return PriceResult(retailer="Slow", price=1.0)
+
+    monkeypatch.setattr(
+        aggregator,
+        "FETCHERS",
+        {"Slow": slow, "Fast": lambda _query: PriceResult(retailer="Fast", price=7.0)},
+    )
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache())
+
+    try:
+        results = aggregator.compare_prices("query", deadline=0.1)
+    finally:
+        release.set()
+
+    by_retailer = {result.retailer: result for result in results}
+    assert by_retailer["Fast"].price == 7.0
+    assert by_retailer["Slow"].debug["timed_out"] is True
+    assert not by_retailer["Slow"].is_successful
+
+
+def test_short_deadline_does_not_cut_the_shared_fetch_short(monkeypatch):
+    """A caller that gives up early leaves the fetch running for everyone else."""
+
+    release = threading.Event()
+
+    def deadline_aware(_query: str) -> PriceResult:
+        release.wait(timeout=5)
+        if current_deadline().expired:
+            return PriceResult(retailer="Slow", error="cut short", debug={"error_type": "fetch"})
+        return PriceResult(retailer="Slow", price=3.0)
+
+    flights = SingleFlight()
+    monkeypatch.setattr(aggregator, "FETCHERS", {"Slow": deadline_aware})
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache())
+    monkeypatch.setattr(aggregator, "IN_FLIGHT", flights)
+
+    try:
+        hurried = aggregator.compare_prices("query", deadline=0.05)
+        patient = []
+        waiter = threading.Thread(target=lambda: patient.extend(aggregator.compare_prices("query", deadline=5)))
+        waiter.start()
+        while flights.stats()["coalesced"] < 1 and waiter.is_alive():
+            release.wait(0.01)
+    finally:
+        release.set()
+    waiter.join(timeout=5)
+
+    assert hurried[0].debug["timed_out"] is True
+    assert patient[0].price == 3.0
+    assert aggregator.compare_prices("query")[0].debug["cache"] == "hit"
+
+
+def test_live_fetch_gets_no_more_time_than_its_callers_have(monkeypatch):
+    """A lone caller's deadline bounds the fetch it starts, not the retailer's own timeout."""
+
+    budgets = []
+
+    def record_budget(_query: str) -> PriceResult:
+        budgets.append(current_deadline().remaining())
+        return PriceResult(retailer="Quick", price=1.0)
+
+    monkeypatch.setattr(aggregator, "FETCHERS", {"Quick": record_budget})
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache())
+
+    aggregator.compare_prices("query", deadline=2)
+
+    assert 0 < budgets[0] <= 2
+
+
+def test_batch_deadline_bounds_the_whole_batch(monkeypatch):
+    """Queries still running or not yet started when the batch deadline expires time out."""
+
+    release = threading.Event()
+
+    def slow(_query: str) -> PriceResult:
+        release.wait(timeout=5)
+        return PriceResult(retailer="Slow", price=1.0)
+
+    monkeypatch.setattr(aggregator, "FETCHERS", {"Slow": slow})
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache())
+
+    try:
+        outcomes = dict(aggregator.iter_compare_batch(["krem", "şampuan"], max_concurrency=1, deadline=0.1))
+    finally:
+        release.set()
+
+    assert set(outcomes) == {"krem", "şampuan"}
+    assert all(results[0].debug["timed_out"] for results in outcomes.values())
+
+
+def test_batch_yields_each_query_once_it_completes(fake_fetchers):
+    """Every distinct query is compared with at most ``max_concurrency`` in flight."""
+
+    outcomes = list(aggregator.iter_compare_batch(["a", "b", "A ", "c"], max_concurrency=2))
+
+    assert sorted(query for query, _ in outcomes) == ["a", "b", "c"]
+    assert all(results[0].retailer == "Cheap" for _, results in outcomes)
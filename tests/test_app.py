@@ -0,0 +1,238 @@
+"""Tests for the Flask API routes."""
+
+from __future__ import annotations
+
+import json
+import pathlib
+import signal
+import sys
+import time
+
+import pytest
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import app as app_module
+from price_fetchers import aggregator
+from price_fetchers.base import PriceResult
+from price_fetchers.cache import ResultCache
+from price_fetchers.utils import configure_host_pacing
+
+
+@pytest.fixture()
+def client(monkeypatch: pytest.MonkeyPatch):
+    """Return a test client backed by deterministic fetchers."""
+
+    monkeypatch.setattr(
+        aggregator,
+        "FETCHERS",
+        {
+            "Cheap": lambda _query: PriceResult(retailer="Cheap", price=10.0),
+            "Expensive": lambda _query: PriceResult(retailer="Expensive", price=25.0),
+            "Failure": lambda _query: PriceResult(retailer="Failure", error="boom"),
+        },
+    )
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache())
+    # Process-wide resources (pacing, executor, sessions) stay untouched unless a test starts them.
+    application = app_module.create_app({"TESTING": True}, start_resources=False)
+    return application.test_client()
+
+
+def test_stream_emits_one_line_per_retailer_then_summary(client):
+    """The NDJSON stream ends with a summary naming the cheapest result."""
+
+    response = client.get("/api/compare/stream?query=krem")
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.mimetype == "application/x-ndjson"
+    assert [event["type"] for event in events] == ["result", "result", "result", "summary"]
+    assert {event["result"]["retailer"] for event in events[:-1]} == {"Cheap", "Expensive", "Failure"}
+    assert events[-1]["cheapest"]["retailer"] == "Cheap"
+    assert events[-1]["timed_out"] == []
+
+
+def test_compare_rejects_invalid_deadline(client):
+    """Deadlines that are not positive numbers within the cap are refused."""
+
+    assert client.get("/api/compare?query=krem&deadline=abc").status_code == 400
+    assert client.get("/api/compare?query=krem&deadline=0").status_code == 400
+
+
+def test_batch_deduplicates_queries_and_summarises(client):
+    """Each distinct query gets one line; duplicates and blanks are skipped."""
+
+    response = client.post("/api/compare/batch", json={"queries": ["Krem", " krem ", "Şampuan", ""]})
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    query_events = [event for event in events if event["type"] == "query"]
+    assert sorted(event["query"] for event in query_events) == ["Krem", "Şampuan"]
+    assert all(event["cheapest"]["retailer"] == "Cheap" for event in query_events)
+    assert events[-1] == {
+        "type": "summary",
+        "queries": 2,
+        "skipped": 2,
+        "completed": 2,
+        "failed": 0,
+    }
+
+
+def test_batch_rejects_malformed_body(client):
+    """The queries field must be a list of strings."""
+
+    assert client.post("/api/compare/batch", json={"queries": "krem"}).status_code == 400
+    assert client.post("/api/compare/batch", json={"queries": []}).status_code == 400
+
+
+def test_metrics_exposes_fetch_outcomes_and_component_stats(client):
+    """After a comparison, /metrics reports per-retailer outcomes and cache stats."""
+
+    client.get("/api/compare?query=metrik")
+    body = client.get("/metrics").get_data(as_text=True)
+
+    assert "# TYPE price_fetch_seconds histogram" in body
+    assert 'price_fetch_seconds_count{retailer="Cheap"}' in body
+    assert 'price_fetches_total{retailer="Failure",outcome="unknown"}' in body
+    assert 'price_lookups_total{retailer="Cheap",cache="miss"}' in body
+    assert 'price_cache{stat="misses"}' in body
+    assert 'price_breaker_state{retailer="Cheap",state="closed"} 1' in body
+
+
+def test_history_requires_a_configured_store(client, monkeypatch, tmp_path):
+    """/api/history answers 503 until a history database is configured."""
+
+    from price_fetchers import history
+
+    assert client.get("/api/history?query=krem").status_code == 503
+
+    store = history.configure_history(str(tmp_path / "history.sqlite3"))
+    try:
+        client.get("/api/compare?query=krem")
+        store.flush()
+        payload = client.get("/api/history?query=krem&bucket=60").get_json()
+        assert client.get("/api/history?query=krem&since=dün").status_code == 400
+    finally:
+        history.close_history()
+
+    assert {point["retailer"] for point in payload["points"]} == {"Cheap", "Expensive"}
+
+
+def test_compare_omits_debug_unless_requested(client):
+    """Results carry no debug dict by default; ``fields`` and ``debug`` select fields."""
+
+    default = client.get("/api/compare?query=alan").get_json()
+    selected = client.get("/api/compare?query=alan&fields=price&debug=1").get_json()
+
+    assert "debug" not in default["results"][0]
+    assert set(selected["cheapest"]) == {"retailer", "price", "debug"}
+    assert client.get("/api/compare?query=alan&fields=fiyat").status_code == 400
+
+
+def test_compare_revalidates_with_strong_etags(client):
+    """An unchanged comparison answers ``If-None-Match`` with an empty 304."""
+
+    first = client.get("/api/compare?query=etag")
+    etag = first.headers["ETag"]
+    second = client.get("/api/compare?query=etag", headers={"If-None-Match": etag})
+
+    assert not etag.startswith("W/")
+    assert second.status_code == 304
+    assert second.get_data() == b""
+
+
+def test_large_json_responses_are_gzipped(client):
+    """Compressed bodies decode to the plain body and get their own ETag."""
+
+    import gzip
+
+    client.application.config["COMPRESS_MIN_SIZE"] = 0
+    plain = client.get("/api/compare?query=gzip")
+    compressed = client.get("/api/compare?query=gzip", headers={"Accept-Encoding": "gzip"})
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+    assert compressed.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+
+
+def test_readiness_follows_the_worker_lifecycle(client):
+    """/readyz is 503 before resources start and once draining begins."""
+
+    assert client.get("/readyz", buffered=True).get_json()["status"] == "starting"
+
+    client.application.config.update(HTTP_CACHE_DIR=None, WARM_TOP_QUERIES=0)
+    app_module.init_resources(client.application)
+    try:
+        assert client.get("/readyz", buffered=True).status_code == 200
+    finally:
+        # Stops the executor and sessions; pacing is configuration and is reset separately.
+        drained = app_module.drain(client.application, timeout=1)
+        configure_host_pacing(None)
+
+    assert drained is True
+
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "draining"
+
+
+def test_gunicorn_worker_reports_draining_before_it_stops_serving(client, monkeypatch):
+    """On SIGTERM the worker keeps serving for the drain delay while /readyz says draining."""
+
+    gunicorn_worker = pytest.importorskip("gunicorn_worker", exc_type=ImportError)
+    monkeypatch.setattr(gunicorn_worker, "DRAIN_DELAY", 0.2)
+
+    worker = object.__new__(gunicorn_worker.DrainingWorker)
+    worker.wsgi = client.application
+    worker.alive = True
+    worker.handle_exit(signal.SIGTERM, None)
+
+    assert worker.alive is True
+    assert client.get("/readyz", buffered=True).get_json()["status"] == "draining"
+    give_up = time.monotonic() + 5
+    while worker.alive and time.monotonic() < give_up:
+        time.sleep(0.01)
+    assert worker.alive is False
+
+
+def test_drain_waits_for_streams_still_being_sent(client):
+    """A streamed comparison stays in flight until its body is closed."""
+
+    lifecycle = client.application.extensions["price_fetchers"]
+    response = client.get("/api/compare/stream?query=akış", buffered=False)
+
+    assert lifecycle.in_flight == 1
+    assert lifecycle.drain(timeout=0.05) is False
+
+    response.close()
+    assert lifecycle.in_flight == 0
+    assert lifecycle.drain(timeout=0) is True
+
+
+def test_clients_over_their_rate_limit_get_429(monkeypatch):
+    """Each client has its own bucket; an empty one answers 429 with Retry-After."""
+
+    monkeypatch.setattr(aggregator, "FETCHERS", {"Cheap": lambda _query: PriceResult(retailer="Cheap", price=10.0)})
+    application = app_module.create_app({"RATE_LIMIT_PER_CLIENT": 0.1, "RATE_LIMIT_BURST": 2}, start_resources=False)
+    client = application.test_client()
+
+    statuses = [client.get("/api/compare?query=krem").status_code for _ in range(3)]
+    limited = client.get("/api/compare?query=krem")
+    other = client.get("/api/compare?query=krem", environ_base={"REMOTE_ADDR": "10.0.0.2"})
+
+    assert statuses == [200, 200, 429]
+    assert limited.headers["Retry-After"] == "10"
+    assert other.status_code == 200
+    assert client.get("/").status_code == 200
+
+
+def test_client_rate_limits_are_off_by_default_unless_proxies_are_trusted():
+    """Without trusted proxy hops every user behind a proxy would share one bucket."""
+
+    direct = app_module.create_app(start_resources=False)
+    proxied = app_module.create_app({"TRUSTED_PROXY_HOPS": 1}, start_resources=False)
+
+    assert "client_rate_limits" not in direct.extensions
+    assert "client_rate_limits" in proxied.extensions
@@ -0,0 +1,160 @@
+"""Tests for the per-retailer circuit breaker."""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+
+import pytest
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from price_fetchers import aggregator
+from price_fetchers.base import PriceResult
+from price_fetchers.breaker import CLOSED, HALF_OPEN, OPEN, BreakerBoard, CircuitBreaker
+from price_fetchers.cache import ResultCache
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_breaker_opens_probes_and_backs_off():
+    """Repeated failures open the breaker; a failed probe doubles the wait."""
+
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, base_open=10, clock=clock)
+
+    breaker.record_failure(breaker.allow())
+    assert breaker.state == CLOSED
+    breaker.record_failure(breaker.allow())
+    assert breaker.state == OPEN
+    assert breaker.allow() is None
+
+    clock.now = 12
+    probe = breaker.allow()
+    assert probe is not None
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is None  # only one probe at a time
+
+    breaker.record_failure(probe)
+    clock.now = 12 + 15
+    assert breaker.allow() is None  # second open period is ~20s
+    clock.now = 12 + 23
+    breaker.record_success(breaker.allow())
+    assert breaker.state == CLOSED
+
+
+def test_late_outcomes_do_not_move_an_open_breaker():
+    """Calls that were in flight when the breaker opened neither extend nor close it."""
+
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, base_open=10, clock=clock)
+    late = [breaker.allow() for _ in range(9)]
+    breaker.record_failure(breaker.allow())
+    breaker.record_failure(breaker.allow())
+    retry_in = breaker.snapshot()["retry_in"]
+
+    for permit in late[:-1]:
+        breaker.record_failure(permit)
+    breaker.record_success(late[-1])
+
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["trips"] == 1
+    assert breaker.snapshot()["retry_in"] == retry_in
+
+
+@pytest.mark.parametrize("late_outcome", ["failure", "success"])
+def test_closed_era_outcomes_do_not_stand_in_for_the_probe(late_outcome):
+    """Only the half-open probe's own outcome closes or re-opens the breaker."""
+
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, base_open=10, clock=clock)
+    late = breaker.allow()
+    breaker.record_failure(breaker.allow())
+    clock.now = 12
+    probe = breaker.allow()
+
+    getattr(breaker, f"record_{late_outcome}")(late)
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.snapshot()["trips"] == 1
+    assert breaker.allow() is None  # the probe is still the one in flight
+    breaker.record_success(probe)
+    assert breaker.state == CLOSED
+
+
+@pytest.fixture()
+def failing_retailer(monkeypatch: pytest.MonkeyPatch):
+    """A retailer whose fetches always fail, with fresh cache and breakers."""
+
+    calls = []
+
+    def failing(_query: str) -> PriceResult:
+        calls.append(1)
+        return PriceResult(retailer="Down", error="502", debug={"error_type": "fetch"})
+
+    monkeypatch.setattr(aggregator, "FETCHERS", {"Down": failing})
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache(failure_ttl=0))
+    monkeypatch.setattr(aggregator, "BREAKERS", BreakerBoard(failure_threshold=2, base_open=60))
+    return calls
+
+
+def test_open_breaker_fails_fast_without_calling_the_retailer(failing_retailer):
+    """Once open, lookups return an unavailable result immediately."""
+
+    aggregator.compare_prices("a")
+    aggregator.compare_prices("b")
+    result = aggregator.compare_prices("c")[0]
+
+    assert len(failing_retailer) == 2
+    assert result.debug["error_type"] == "unavailable"
+    assert result.debug["breaker"] == OPEN
+    assert aggregator.BREAKERS.snapshot()["Down"]["rejected"] == 1
+
+
+def test_open_breaker_serves_last_known_price(failing_retailer, monkeypatch):
+    """An expired cached price is preferred over the unavailable result."""
+
+    clock = FakeClock()
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache(success_ttl=1, stale_ttl=0, failure_ttl=0, clock=clock))
+    aggregator.RESULT_CACHE.put("c", "Down", PriceResult(retailer="Down", price=5.0))
+    clock.now = 100
+
+    aggregator.compare_prices("a")
+    aggregator.compare_prices("b")
+    result = aggregator.compare_prices("c")[0]
+
+    assert result.price == 5.0
+    assert result.debug["cache"] == "expired"
+    assert result.debug["breaker"] == OPEN
+
+
+def test_outbound_throttling_is_neither_cached_nor_held_against_the_retailer(monkeypatch):
+    """A request our own pacer refuses leaves the cache and the breaker untouched."""
+
+    from price_fetchers import gratis, utils
+
+    monkeypatch.setattr(aggregator, "FETCHERS", {"Gratis": gratis.search_product})
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache())
+    monkeypatch.setattr(aggregator, "BREAKERS", BreakerBoard(failure_threshold=1))
+    utils.configure_host_pacing(0.01, burst=1)
+    try:
+        assert utils._pacing.get("www.gratis.com").try_acquire()
+        result = aggregator.compare_prices("krem", deadline=2.0)[0]
+    finally:
+        utils.configure_host_pacing(None)
+
+    assert result.debug["error_type"] == "busy"
+    assert aggregator.RESULT_CACHE.stats()["size"] == 0
+    assert aggregator.BREAKERS.snapshot()["Gratis"]["state"] == CLOSED
+    assert aggregator.BREAKERS.snapshot()["Gratis"]["consecutive_failures"] == 0
@@ -0,0 +1,98 @@
+"""Tests for the per-retailer result cache."""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+import threading
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from price_fetchers.base import PriceResult
+from price_fetchers.cache import ResultCache
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hits_share_entry_across_query_spelling():
+    """Queries differing only in case and spacing hit the same entry."""
+
+    cache = ResultCache(clock=FakeClock())
+    calls = []
+
+    def loader() -> PriceResult:
+        calls.append(1)
+        return PriceResult(retailer="Gratis", price=10.0)
+
+    first = cache.get_or_fetch("Diş  Macunu", "Gratis", loader)
+    second = cache.get_or_fetch("diş macunu", "Gratis", loader)
+
+    assert len(calls) == 1
+    assert first.debug["cache"] == "miss"
+    assert second.debug["cache"] == "hit"
+    assert cache.stats()["hits"] == 1
+
+
+def test_failures_expire_sooner_than_successes():
+    """Failed lookups use the shorter failure TTL."""
+
+    clock = FakeClock()
+    cache = ResultCache(success_ttl=100, failure_ttl=5, stale_ttl=0, clock=clock)
+    cache.put("q", "Ok", PriceResult(retailer="Ok", price=1.0))
+    cache.put("q", "Bad", PriceResult(retailer="Bad", error="timeout"))
+
+    clock.now = 10
+    assert cache.get("q", "Ok") is not None
+    assert cache.get("q", "Bad") is None
+
+
+def test_lru_eviction_respects_entry_cap():
+    """The least recently used entry is evicted first."""
+
+    cache = ResultCache(max_entries=2, clock=FakeClock())
+    for query in ("a", "b"):
+        cache.put(query, "R", PriceResult(retailer="R", price=1.0))
+    cache.get_or_fetch("a", "R", lambda: PriceResult(retailer="R", price=2.0))
+    cache.put("c", "R", PriceResult(retailer="R", price=3.0))
+
+    assert cache.get("a", "R") is not None
+    assert cache.get("b", "R") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_stale_entry_is_served_while_refreshing():
+    """Expired successes are returned immediately and refreshed in the background."""
+
+    clock = FakeClock()
+    cache = ResultCache(success_ttl=10, stale_ttl=60, clock=clock)
+    cache.put("q", "R", PriceResult(retailer="R", price=1.0))
+    clock.now = 20
+
+    refreshed = threading.Event()
+
+    def loader() -> PriceResult:
+        refreshed.set()
+        return PriceResult(retailer="R", price=2.0)
+
+    stale = cache.get_or_fetch("q", "R", loader)
+
+    assert stale.price == 1.0
+    assert stale.debug["cache"] == "stale"
+    assert refreshed.wait(timeout=2)
+    for _ in range(100):
+        current = cache.get("q", "R")
+        if current is not None and current.price == 2.0:
+            break
+        threading.Event().wait(0.01)
+    assert cache.get("q", "R").price == 2.0
@@ -0,0 +1,64 @@
+"""Tests for top-N candidate extraction."""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.pages import gratis_flight_page, json_ld_page, rossmann_embedded_page
+from price_fetchers import aggregator, gratis, rossmann
+from price_fetchers.base import PriceResult
+from price_fetchers.cache import ResultCache
+
+
+def test_limit_attaches_alternatives_from_the_same_page():
+    """The first product is the result and the next ones become alternatives."""
+
+    result = gratis._build_result(gratis_flight_page(count=5, filler_kb=4), "https://www.gratis.com/search", limit=3)
+
+    assert result.debug["strategy"] == "embedded-json"
+    assert [alternative.debug["product_id"] for alternative in result.alternatives] == ["10000001", "10000002"]
+    assert result.to_dict()["alternatives"][0]["retailer"] == "Gratis"
+
+
+def test_default_limit_matches_single_result_behaviour():
+    """Without a limit only the first match is returned, as before."""
+
+    result = rossmann._build_result(rossmann_embedded_page(count=5, filler_kb=4), "https://www.rossmann.com.tr")
+
+    assert result.product_name.endswith(" 0 ml")
+    assert result.alternatives == []
+
+
+def test_strategies_are_not_mixed():
+    """Candidates all come from the first strategy that found products."""
+
+    html = json_ld_page(count=2, filler_kb=4) + rossmann_embedded_page(count=5, filler_kb=4)
+
+    result = rossmann._build_result(html, "https://www.rossmann.com.tr", limit=5)
+
+    assert len(result.alternatives) == 1
+    assert {alternative.debug["strategy"] for alternative in result.alternatives} == {"json-ld"}
+
+
+def test_compare_prices_passes_limit_only_when_requested(monkeypatch):
+    """Plain fetchers keep working while capable ones receive the limit."""
+
+    def plain(query: str) -> PriceResult:
+        return PriceResult(retailer="Plain", price=2.0)
+
+    def capable(query: str, *, limit: int = 1) -> PriceResult:
+        return PriceResult(retailer="Capable", price=1.0, debug={"limit": limit})
+
+    monkeypatch.setattr(aggregator, "FETCHERS", {"Capable": capable})
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache())
+
+    assert aggregator.compare_prices("krem", limit=3)[0].debug["limit"] == 3
+
+    monkeypatch.setattr(aggregator, "FETCHERS", {"Plain": plain})
+    assert aggregator.compare_prices("krem")[0].retailer == "Plain"
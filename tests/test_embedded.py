@@ -0,0 +1,120 @@
+"""Tests for embedded JSON payload extraction."""
+
+from __future__ import annotations
+
+import json
+import pathlib
+import sys
+
+import pytest
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.pages import gratis_flight_page, gratis_products, rossmann_embedded_page, rossmann_products
+from price_fetchers import gratis, rossmann
+from price_fetchers.embedded import ArrayWatch, extract_json_array
+
+
+def test_plain_literal_array_is_decoded_in_place():
+    """Rossmann's initialProducts literal decodes to the original objects."""
+
+    html = rossmann_embedded_page(count=3, filler_kb=4)
+
+    assert rossmann._extract_initial_products(html) == rossmann_products(3)
+
+
+def test_escaped_flight_array_keeps_turkish_text_and_quotes():
+    """Gratis's escaped flight payload decodes without mojibake."""
+
+    html = gratis_flight_page(count=3, filler_kb=4)
+
+    products = gratis._extract_products_from_embedded_state(html)
+
+    assert products == gratis_products(3)
+    assert products[0]["attributes"]["displayName"].startswith('Nemlendirici Yüz Kremi "Hassas"')
+
+
+def test_missing_or_truncated_payload_returns_empty_list():
+    """Absent markers and unterminated arrays are treated as no products."""
+
+    assert extract_json_array("<html></html>", "initialProducts:") == []
+    assert extract_json_array('initialProducts:[{"a": 1}', "initialProducts:") == []
+    assert extract_json_array('x products\\":[{\\"a\\":1}', 'products\\":[', escaped=True) == []
+
+
+@pytest.mark.parametrize("chunk_size", [7, 4096])
+def test_watch_stops_right_after_the_array_arrives(chunk_size):
+    """Fed a page in pieces, the watch fires on the piece closing the array."""
+
+    html = gratis_flight_page(count=3, filler_kb=8)
+    watch = ArrayWatch(gratis.EMBEDDED_PRODUCTS_MARKER, escaped=True)
+    parts = []
+    for start in range(0, len(html), chunk_size):
+        parts.append(html[start : start + chunk_size])
+        if watch.feed(parts):
+            break
+    received = "".join(parts)
+
+    assert len(received) < len(html)
+    assert gratis._extract_products_from_embedded_state(received) == gratis_products(3)
+
+
+class _NewestPartOnly:
+    """Parts received so far that fail if anything but the newest is read."""
+
+    def __init__(self):
+        self.received = []
+
+    def append(self, part):
+        self.received.append(part)
+
+    def __getitem__(self, index):
+        assert index == -1, "feed re-read the parts received earlier"
+        return self.received[-1]
+
+
+@pytest.mark.parametrize("escaped", [False, True])
+def test_watch_scans_each_part_once_and_skips_brackets_in_strings(escaped):
+    """Brackets, quotes and backslashes inside names never end the array early."""
+
+    products = [{"name": 'a ] } " \\ [ {', "tags": ["x]", "\\"]}, {"name": 'Yüz \\\\"]'}]
+    payload = json.dumps(products, ensure_ascii=False)
+    if escaped:
+        marker = 'products\\":['
+        literal = json.dumps(f'{{"products":{payload},"total":2}}', ensure_ascii=False)
+        html = f"<script>push({literal})</script>" + "<p>more</p>" * 20
+        end = html.index(',\\"total')
+    else:
+        marker = "initialProducts:"
+        html = f"<script>x={{initialProducts:{payload},total:2}}</script>" + "<p>more</p>" * 20
+        end = html.index(",total")
+
+    for chunk_size in range(1, 12):
+        watch = ArrayWatch(marker, escaped=escaped)
+        parts = _NewestPartOnly()
+        for start in range(0, len(html), chunk_size):
+            parts.append(html[start : start + chunk_size])
+            if watch.feed(parts):
+                break
+        received = "".join(parts.received)
+
+        assert end <= len(received) < end + chunk_size
+        assert extract_json_array(received, marker, escaped=escaped) == products
+
+
+def test_watch_never_fires_on_an_empty_array():
+    """With no products to extract the rest of the page is still needed."""
+
+    html = "<script>x={initialProducts:[ ],total:0}</script>" + "<p>more</p>" * 20
+    watch = ArrayWatch("initialProducts:")
+    parts = []
+
+    fired = False
+    for start in range(0, len(html), 5):
+        parts.append(html[start : start + 5])
+        fired = fired or watch.feed(parts)
+
+    assert not fired
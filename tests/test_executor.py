@@ -0,0 +1,45 @@
+"""Tests for the shared fetch executor."""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+import threading
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from price_fetchers.base import PriceResult
+from price_fetchers.executor import FetchExecutor
+
+
+def test_retailer_limit_queues_and_sheds_excess_work():
+    """Work beyond a retailer's limit queues, and a full queue sheds with a busy result."""
+
+    executor = FetchExecutor(max_in_flight=4, retailer_concurrency=1, max_queue_depth=1)
+    release = threading.Event()
+
+    def blocking(price: float) -> PriceResult:
+        release.wait(timeout=2)
+        return PriceResult(retailer="Slow", price=price)
+
+    try:
+        running = executor.submit("Slow", blocking, 1.0)
+        queued = executor.submit("Slow", blocking, 2.0)
+        shed = executor.submit("Slow", blocking, 3.0)
+        other = executor.submit("Fast", lambda: PriceResult(retailer="Fast", price=9.0))
+
+        assert other.result(timeout=2).price == 9.0
+        assert shed.done()
+        assert shed.result().debug["error_type"] == "busy"
+        assert executor.queue_depth("Slow") == 1
+
+        release.set()
+        assert running.result(timeout=2).price == 1.0
+        assert queued.result(timeout=2).price == 2.0
+        assert executor.stats()["Slow"]["shed"] == 1
+    finally:
+        release.set()
+        executor.shutdown()
@@ -0,0 +1,151 @@
+"""Tests for the SQLite price history store."""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+
+import pytest
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from price_fetchers import aggregator, history
+from price_fetchers.base import PriceResult
+from price_fetchers.cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def store(tmp_path):
+    clock = FakeClock()
+    store = history.HistoryStore(str(tmp_path / "history.sqlite3"), clock=clock)
+    store.clock = clock
+    yield store
+    store.close()
+
+
+def _result(price: float, url: str = "/urun") -> PriceResult:
+    return PriceResult(retailer="Gratis", product_name="Krem", price=price, product_url=url, debug={"strategy": "json-ld"})
+
+
+def test_latest_returns_the_newest_fetch_with_its_alternatives(store):
+    """Rows of one fetch come back as the result plus ranked alternatives."""
+
+    store.record("Krem", _result(12.0))
+    store.clock.now += 60
+    newest = _result(10.0)
+    newest.alternatives = [_result(11.0, "/diger")]
+    store.record("  KREM ", newest, limit=2)
+    store.flush()
+
+    latest = store.latest("krem", "Gratis", limit=2)
+
+    assert latest.price == 10.0
+    assert [alternative.product_url for alternative in latest.alternatives] == ["/diger"]
+    assert latest.debug["cache"] == "history"
+    assert store.latest("krem", "Gratis", max_age=30, limit=3) is None
+    assert store.stats()["written"] == 3
+
+
+def test_results_from_history_are_cached_for_the_rest_of_their_ttl(store):
+    """A warm-started price is fresh only until its original TTL would have run out."""
+
+    store.record("krem", _result(12.0))
+    store.flush()
+    store.clock.now += 200
+
+    latest = store.latest("krem", "Gratis", max_age=300)
+    cache = ResultCache(success_ttl=300, clock=lambda: 0.0)
+    cache.put("krem", "Gratis", latest)
+
+    assert latest.debug["age"] == 200
+    assert cache.expires_in("krem", "Gratis") == 100
+
+
+def test_unseen_queries_are_answered_without_reading_the_database(store, monkeypatch):
+    """Lookups the in-memory index rules out never open a database cursor."""
+
+    store.record("krem", _result(12.0))
+    store.flush()
+    monkeypatch.setattr(store, "_reader", None)
+
+    assert store.latest("şampuan", "Gratis", max_age=300) is None
+    assert store.latest("krem", "Gratis", limit=2, max_age=300) is None
+
+
+def test_reopened_store_loads_recently_observed_queries(store):
+    """A restarted process still warm-starts from rows written before it began."""
+
+    store.record("krem", _result(12.0))
+    store.close()
+
+    reopened = history.HistoryStore(store.path, clock=store.clock)
+    try:
+        reopened.flush()
+        assert reopened.latest("krem", "Gratis", max_age=300).price == 12.0
+    finally:
+        reopened.close()
+
+
+def test_query_filters_by_range_and_downsamples(store):
+    """Bucketed queries aggregate prices per window and product."""
+
+    for offset, price in ((0, 10.0), (10, 14.0), (3600, 20.0)):
+        store.clock.now = 1_700_000_000.0 + offset
+        store.record("krem", _result(price))
+    store.flush()
+
+    points = store.query("krem", bucket=3600)
+    assert [(point["min_price"], point["max_price"], point["samples"]) for point in points] == [
+        (10.0, 14.0, 2),
+        (20.0, 20.0, 1),
+    ]
+    assert [point["price"] for point in store.query("krem", since=1_700_000_005.0)] == [14.0, 20.0]
+
+
+def test_range_queries_use_the_covering_index(store):
+    """Range scans are answered from the index, not by scanning the table."""
+
+    plan = store._reader().execute(
+        "EXPLAIN QUERY PLAN SELECT observed_at, retailer, price FROM price_history"
+        " WHERE query = ? AND observed_at >= ?",
+        ("krem", 0),
+    ).fetchall()
+
+    assert "COVERING INDEX idx_history_query_time" in " ".join(str(row[-1]) for row in plan)
+
+
+def test_lookups_record_history_and_warm_start_from_it(monkeypatch, tmp_path):
+    """Live fetches are recorded and a fresh process answers from them without fetching."""
+
+    calls = []
+
+    def fetcher(query: str) -> PriceResult:
+        calls.append(query)
+        return PriceResult(retailer="Gratis", price=9.5, product_url="/urun")
+
+    monkeypatch.setattr(aggregator, "FETCHERS", {"Gratis": fetcher})
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache())
+    store = history.configure_history(str(tmp_path / "history.sqlite3"))
+    try:
+        aggregator.compare_prices("krem")
+        store.flush()
+        monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache())
+
+        result = aggregator.compare_prices("krem")[0]
+    finally:
+        history.close_history()
+
+    assert calls == ["krem"]
+    assert result.price == 9.5
+    assert result.debug["cache"] == "history"
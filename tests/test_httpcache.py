@@ -0,0 +1,185 @@
+"""Tests for conditional and streamed requests and extraction memoization."""
+
+from __future__ import annotations
+
+import os
+import pathlib
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.pages import rossmann_embedded_page
+from price_fetchers import httpcache, metrics, rossmann, utils
+
+PAGE = "<html><body>Krem 12,90 TL</body></html>"
+# A JavaScript literal the JSON decoder cannot read, followed by a large rest of page.
+UNDECODABLE_PAGE = "<script>x={initialProducts:[{sku:1,name:'Krem'}]}</script>" + "<p>Krem 12,90 TL</p>" * 30000
+
+
+class _Handler(BaseHTTPRequestHandler):
+    requests: list = []
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        self.requests.append(self.headers.get("If-None-Match"))
+        if self.path.startswith("/large"):
+            self._send_large(rossmann_embedded_page(count=5, filler_kb=512))
+            return
+        if self.path.startswith("/undecodable"):
+            self._send_large(UNDECODABLE_PAGE)
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        payload = PAGE.encode("utf-8")
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_large(self, page: str) -> None:
+        payload = page.encode("utf-8")
+        self.send_response(200)
+        self.send_header("ETag", '"large"')
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):  # the client hung up early
+            pass
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - signature from base class
+        return
+
+
+@pytest.fixture()
+def server():
+    handler = type("Handler", (_Handler,), {"requests": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/search", handler.requests
+    server.shutdown()
+    server.server_close()
+    utils.close_sessions()
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    previous = httpcache.get_http_cache()
+    yield httpcache.configure_http_cache(str(tmp_path))
+    httpcache._cache = previous
+
+
+def test_not_modified_pages_are_served_from_disk(server, cache):
+    """The second fetch sends the stored ETag and reads the body from the cache."""
+
+    url, seen = server
+
+    first = utils.fetch_html(url, params={"q": "krem"})
+    second = utils.fetch_html(url, params={"q": "krem"})
+
+    assert first == second
+    assert first[0] == PAGE
+    assert seen == [None, '"v1"']
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_lost_bodies_are_fetched_again_without_validators(server, cache, tmp_path):
+    """A 304 for a body that is no longer on disk falls back to a full fetch."""
+
+    url, seen = server
+    utils.fetch_html(url)
+    for name in os.listdir(tmp_path):
+        if name.endswith(".gz"):
+            os.remove(tmp_path / name)
+
+    assert utils.fetch_html(url)[0] == PAGE
+    assert seen == [None, '"v1"', None]
+
+
+def test_validators_survive_a_restart(server, cache, tmp_path):
+    """A new cache over the same directory picks up stored validators."""
+
+    url, seen = server
+    utils.fetch_html(url)
+
+    reopened = httpcache.HttpCache(str(tmp_path))
+
+    assert reopened.validators(reopened.make_key(url)).etag == '"v1"'
+
+
+def test_identical_pages_skip_extraction(monkeypatch):
+    """Extraction is memoized by body hash and never rebuilds the tree."""
+
+    html = rossmann_embedded_page(count=3, filler_kb=4)
+    rossmann._build_result.cache_clear()
+    first = rossmann._build_result(html, "https://www.rossmann.com.tr")
+    first.debug["breaker"] = "closed"
+
+    monkeypatch.setattr(utils, "BeautifulSoup", None)
+    monkeypatch.setattr(rossmann, "_iter_results", None)
+    second = rossmann._build_result(html, "https://www.rossmann.com.tr")
+
+    assert second.price == first.price
+    assert second.debug["memoized"] is True
+    assert "breaker" not in second.debug
+
+
+def test_streamed_download_stops_once_products_are_complete(server):
+    """The body is only read up to the end of the embedded products."""
+
+    url, _ = server
+    page = rossmann_embedded_page(count=5, filler_kb=512)
+    metrics.reset()
+
+    text, _ = utils.fetch_html(url.replace("/search", "/large"), stream_until=rossmann.EMBEDDED_PRODUCTS)
+
+    assert len(text) < len(page) and page.startswith(text)
+    assert rossmann._extract_initial_products(text) == rossmann._extract_initial_products(page)
+    assert 'outcome="stopped_early"} 1' in metrics.render()
+
+
+def test_streamed_download_without_the_array_reads_the_whole_page(server):
+    """A page lacking the marker is downloaded and returned in full."""
+
+    url, _ = server
+    metrics.reset()
+
+    text, _ = utils.fetch_html(url, stream_until=rossmann.EMBEDDED_PRODUCTS)
+
+    assert text == PAGE
+    assert 'outcome="read_fully"} 1' in metrics.render()
+
+
+def test_cut_short_body_is_never_cached(server, cache):
+    """A page cut after its products is downloaded again rather than revalidated."""
+
+    url, requests = server
+    large = url.replace("/search", "/large")
+
+    utils.fetch_html(large, stream_until=rossmann.EMBEDDED_PRODUCTS)
+    utils.fetch_html(large, stream_until=rossmann.EMBEDDED_PRODUCTS)
+
+    assert requests == [None, None]
+
+
+def test_cut_short_page_without_usable_products_is_read_again_in_full(server):
+    """When the array before the cut extracts to nothing, the whole page is fetched."""
+
+    url, requests = server
+    metrics.reset()
+
+    text, _ = utils.fetch_html(url.replace("/search", "/undecodable"), stream_until=rossmann.EMBEDDED_PRODUCTS)
+
+    assert text == UNDECODABLE_PAGE
+    assert len(requests) == 2
+    assert 'outcome="refetched"} 1' in metrics.render()
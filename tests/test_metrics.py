@@ -0,0 +1,75 @@
+"""Tests for stage timing spans and the metrics registry."""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.pages import rossmann_embedded_page, selector_page
+from price_fetchers import aggregator, metrics, rossmann
+from price_fetchers.cache import ResultCache
+
+
+def test_extraction_stages_are_collected_per_lookup():
+    """Only the strategies that actually ran report a timing."""
+
+    rossmann._build_result.cache_clear()
+    with metrics.collect_timings("Rossmann") as timings:
+        rossmann._build_result(rossmann_embedded_page(count=3, filler_kb=4), "https://www.rossmann.com.tr")
+    assert set(timings) == {"json_ld", "embedded"}
+
+    with metrics.collect_timings("Rossmann") as timings:
+        rossmann._build_result(selector_page(count=3, filler_kb=4), "https://www.rossmann.com.tr")
+    assert {"json_ld", "embedded", "html_parse", "selectors"} <= set(timings)
+
+
+def test_timed_iter_excludes_time_spent_by_the_consumer():
+    """A lazily consumed strategy is charged only for producing its items."""
+
+    clock = iter([0.0, 1.0, 10.0, 10.5, 50.0, 50.25])
+    original = metrics.time.perf_counter
+    metrics.time.perf_counter = lambda: next(clock)
+    try:
+        with metrics.collect_timings() as timings:
+            assert list(metrics.timed_iter("stage", ["a", "b"])) == ["a", "b"]
+    finally:
+        metrics.time.perf_counter = original
+
+    assert timings == {"stage": 1.75}
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Bucket counts are cumulative and end with +Inf, sum and count."""
+
+    histogram = metrics.Histogram("test_seconds", "Test.", ("retailer",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "A")
+    histogram.observe(0.5, "A")
+    histogram.observe(5.0, "A")
+
+    samples = {(name, labels.get("le")): value for name, labels, value in histogram.samples()}
+    assert samples[("test_seconds_bucket", "0.1")] == 1
+    assert samples[("test_seconds_bucket", "1.0")] == 2
+    assert samples[("test_seconds_bucket", "+Inf")] == 3
+    assert samples[("test_seconds_count", None)] == 3
+
+
+def test_live_fetches_carry_timings_and_count_outcomes(monkeypatch):
+    """Each live result reports its total time and bumps the strategy counter."""
+
+    def fetcher(query: str):
+        return rossmann._build_result(rossmann_embedded_page(count=1, filler_kb=1), "https://www.rossmann.com.tr")
+
+    monkeypatch.setattr(aggregator, "FETCHERS", {"Rossmann": fetcher})
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache())
+    rossmann._build_result.cache_clear()
+    before = aggregator.FETCHES.value("Rossmann", "embedded-json")
+
+    result = aggregator.compare_prices("krem")[0]
+
+    assert {"total", "embedded"} <= set(result.debug["timings"])
+    assert aggregator.FETCHES.value("Rossmann", "embedded-json") == before + 1
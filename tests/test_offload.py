@@ -0,0 +1,62 @@
+"""Tests for extracting fetched pages in a process pool."""
+
+from __future__ import annotations
+
+import os
+import pathlib
+import sys
+import time
+
+import pytest
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.pages import gratis_flight_page, rossmann_embedded_page
+from price_fetchers import gratis, metrics, offload, rossmann
+from price_fetchers.base import PriceResult
+
+
+def _slow_build(html: str, final_url: str, limit: int = 1) -> PriceResult:
+    time.sleep(float(html))
+    return PriceResult(retailer="Yavaş", price=1.0, debug={"pid": os.getpid()})
+
+
+@pytest.fixture()
+def pool():
+    pool = offload.configure_extraction_pool(1, max_pending=1)
+    yield pool
+    offload.shutdown_extraction_pool()
+
+
+@pytest.mark.parametrize(
+    "module, html",
+    [(rossmann, rossmann_embedded_page(count=5, filler_kb=4)), (gratis, gratis_flight_page(count=5, filler_kb=4))],
+)
+def test_offloaded_extraction_matches_inline(pool, module, html):
+    """Workers return the same result the fetch thread would have built."""
+
+    module._build_result.cache_clear()
+    metrics.reset()
+    with metrics.collect_timings() as timings:
+        offloaded = module._build_result(html, "https://example.com", 3)
+
+    assert offloaded == module._build_result.__wrapped__(html, "https://example.com", 3)
+    assert "offload" in timings and "embedded" in timings
+    assert 'price_extraction_offload_total{outcome="offloaded"} 1' in metrics.render()
+
+
+def test_saturated_pool_extracts_inline(pool):
+    """With every pending slot taken, the caller extracts on its own thread."""
+
+    metrics.reset()
+    busy = pool.try_submit(_slow_build, "0.5", "", 1)
+
+    assert pool.saturated
+    inline = offload.run_extraction(_slow_build, "0", "", 1)
+
+    assert inline.debug["pid"] == os.getpid()
+    assert busy.result(timeout=30)[0].debug["pid"] != inline.debug["pid"]
+    assert 'price_extraction_offload_total{outcome="saturated"} 1' in metrics.render()
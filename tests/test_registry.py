@@ -0,0 +1,82 @@
+"""Tests for the lazy retailer registry."""
+
+from __future__ import annotations
+
+import pathlib
+import subprocess
+import sys
+import types
+
+import pytest
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from price_fetchers import registry
+from price_fetchers.base import PriceResult
+
+
+@pytest.fixture(autouse=True)
+def isolated_registry(monkeypatch: pytest.MonkeyPatch):
+    """Give each test its own copy of the registered specs."""
+
+    monkeypatch.setattr(registry, "_specs", dict(registry._specs))
+    monkeypatch.setattr(registry, "_loaded", {})
+
+
+@pytest.fixture()
+def fake_module(monkeypatch: pytest.MonkeyPatch) -> types.ModuleType:
+    """Install an importable retailer module."""
+
+    module = types.ModuleType("fake_retailer")
+    module.search_product = lambda query: PriceResult(retailer="Fake", price=1.0)
+    monkeypatch.setitem(sys.modules, "fake_retailer", module)
+    return module
+
+
+def test_builtin_retailers_are_registered_without_importing_them():
+    """The default retailers are declared but not loaded until used."""
+
+    names = [spec.name for spec in registry.retailer_specs()]
+
+    assert names[:2] == ["Rossmann", "Gratis"]
+
+
+def test_importing_the_package_loads_no_retailer_or_http_modules():
+    """A fresh interpreter importing the package leaves parsing and HTTP libraries unloaded."""
+
+    heavy = ["bs4", "requests", *(spec.module for spec in registry.retailer_specs())]
+    script = (
+        "import sys, price_fetchers; "
+        f"print(','.join(name for name in {heavy!r} if name in sys.modules))"
+    )
+
+    loaded = subprocess.run(
+        [sys.executable, "-c", script], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+    assert loaded == ""
+
+
+def test_new_retailer_is_loaded_by_module_path(fake_module):
+    """A registered retailer appears in the fetcher mapping and loads on access."""
+
+    registry.register_retailer("Fake", "fake_retailer", cache_ttl=60)
+    fetchers = registry.LazyFetchers()
+
+    assert "Fake" in list(fetchers)
+    assert fetchers["Fake"]("krem").price == 1.0
+    assert registry.SettingView("cache_ttl")["Fake"] == 60
+
+
+def test_disabled_retailers_are_skipped(fake_module):
+    """Disabling a retailer removes it from the fan-out."""
+
+    registry.register_retailer("Fake", "fake_retailer")
+    registry.configure_retailer("Fake", enabled=False)
+
+    assert "Fake" not in list(registry.LazyFetchers())
+    with pytest.raises(KeyError):
+        registry.LazyFetchers()["Fake"]
@@ -0,0 +1,124 @@
+"""Tests for Rossmann search endpoint selection."""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+import threading
+
+import pytest
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from price_fetchers import rossmann
+from price_fetchers.utils import FetchError
+
+GOOD_URL = f"{rossmann.BASE_URL}/search/"
+
+
+@pytest.fixture(autouse=True)
+def reset_endpoint_affinity(monkeypatch: pytest.MonkeyPatch):
+    """Forget remembered endpoints between tests."""
+
+    monkeypatch.setattr(rossmann, "_preferred_endpoint", None)
+    monkeypatch.setattr(rossmann, "_endpoint_failures", {})
+
+
+@pytest.fixture()
+def attempts(monkeypatch: pytest.MonkeyPatch):
+    """Serve a page only from the /search/ endpoint and record every attempt."""
+
+    calls = []
+
+    def fake_fetch(url: str, query: str):
+        calls.append(url)
+        if url != GOOD_URL:
+            raise FetchError("404")
+        return "<html></html>", url
+
+    monkeypatch.setattr(rossmann, "_fetch_search_page", fake_fetch)
+    return calls
+
+
+def test_working_endpoint_is_tried_first_next_time(attempts):
+    """After one success the remembered endpoint is the only one requested."""
+
+    assert rossmann._search_in_order("krem") == ("<html></html>", GOOD_URL)
+    assert attempts[-1] == GOOD_URL
+    attempts.clear()
+
+    rossmann._search_in_order("krem")
+
+    assert attempts == [GOOD_URL]
+
+
+def test_race_returns_first_successful_endpoint(monkeypatch):
+    """Racing returns the working endpoint while the others are still running."""
+
+    release = threading.Event()
+    finished = []
+
+    def fake_fetch(url: str, query: str):
+        if url != GOOD_URL:
+            release.wait(timeout=5)
+            finished.append(url)
+            raise FetchError("404")
+        return "<html></html>", url
+
+    monkeypatch.setattr(rossmann, "_fetch_search_page", fake_fetch)
+    try:
+        page = rossmann._race_search("krem")
+        assert finished == []
+    finally:
+        release.set()
+
+    assert page == ("<html></html>", GOOD_URL)
+    assert rossmann._search_urls()[0] == GOOD_URL
+
+
+def test_race_without_free_threads_searches_on_the_calling_thread(attempts, monkeypatch):
+    """A saturated race pool falls back to trying the endpoints in order."""
+
+    _, slots = rossmann._get_race_pool()
+    taken = 0
+    while slots.acquire(blocking=False):
+        taken += 1
+    caller = threading.current_thread()
+    threads = []
+    fetch = rossmann._fetch_search_page
+
+    def on_caller(url: str, query: str):
+        threads.append(threading.current_thread())
+        return fetch(url, query)
+
+    monkeypatch.setattr(rossmann, "_fetch_search_page", on_caller)
+    try:
+        assert rossmann._race_search("krem") == ("<html></html>", GOOD_URL)
+    finally:
+        for _ in range(taken):
+            slots.release()
+
+    assert threads and all(thread is caller for thread in threads)
+
+
+def test_race_timeout_is_not_reported_as_a_fetch_failure(monkeypatch):
+    """A race that runs out of time is a timeout, which the breaker ignores."""
+
+    release = threading.Event()
+
+    def stuck(url: str, query: str):
+        release.wait(timeout=5)
+        raise FetchError("late")
+
+    monkeypatch.setattr(rossmann, "_fetch_search_page", stuck)
+    monkeypatch.setattr(rossmann, "RACE_SEARCH_ENDPOINTS", True)
+    monkeypatch.setattr(rossmann, "_race_timeout", lambda: 0.05)
+    try:
+        result = rossmann.search_product("krem")
+    finally:
+        release.set()
+
+    assert result.debug["error_type"] == "timeout"
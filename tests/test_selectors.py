@@ -0,0 +1,107 @@
+"""Tests for the single-walk selector engine behind the HTML fallback."""
+
+from __future__ import annotations
+
+import pathlib
+import re
+import sys
+
+import pytest
+from bs4 import BeautifulSoup
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.pages import selector_page
+from price_fetchers import gratis, rossmann
+from price_fetchers.selectors import CompiledSelectors
+from price_fetchers.utils import find_price_candidates, parse_price
+
+MIXED_PAGE = """
+<html><body>
+  <div class="product-title">Başlıklı Ürün</div>
+  <span class="amount">49,90 TL</span>
+  <a href="/urun/a">Ürün A <span class="price">12,50 TL</span></a>
+  <div class="card">
+    <span class="price-value">99,00 TL</span>
+    <span class="price">fiyat yok</span>
+  </div>
+  <a href="/urun/b"></a>
+  <div class="product-name">İsimli Ürün</div>
+  <div data-price="1"><span class="cost">7 TL</span></div>
+</body></html>
+"""
+
+
+def _legacy_candidates(soup, selectors):
+    """The previous per-selector implementation, kept as the reference."""
+
+    for selector in selectors:
+        for element in soup.select(selector):
+            price_text = element.get_text(" ", strip=True)
+            if not price_text or parse_price(price_text) is None:
+                continue
+            product_link = element.find_parent("a") or element.find_previous("a")
+            product_name = product_url = None
+            if product_link:
+                product_name = product_link.get_text(" ", strip=True)
+                product_url = product_link.get("href")
+            if not product_name:
+                title_el = element.find_previous(class_=re.compile("name|title", re.I))
+                if title_el:
+                    product_name = title_el.get_text(" ", strip=True)
+            yield (product_name or "Ürün", price_text, product_url or "")
+
+
+def _unique(candidates):
+    return list(dict.fromkeys(candidates))
+
+
+@pytest.mark.parametrize("selectors", [rossmann.PRICE_SELECTORS, gratis.PRICE_SELECTORS])
+@pytest.mark.parametrize(
+    "html",
+    [MIXED_PAGE, selector_page(count=6, filler_kb=2), selector_page(count=6, filler_kb=2, price_class="amount")],
+)
+def test_single_walk_matches_the_per_selector_order(html, selectors):
+    """Distinct candidates come out exactly as the per-selector loop produced them."""
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    assert _unique(find_price_candidates(soup, selectors)) == _unique(_legacy_candidates(soup, selectors))
+
+
+def test_first_selector_matches_stream_before_the_walk_ends():
+    """A consumer satisfied by top-priority matches never walks the rest of the page."""
+
+    soup = BeautifulSoup(selector_page(count=6, filler_kb=8), "html.parser")
+    compiled = CompiledSelectors([".price", ".missing"])
+    checked = []
+    priority = compiled.priority
+
+    def counting_priority(element):
+        checked.append(element)
+        return priority(element)
+
+    compiled.priority = counting_priority
+    first = next(compiled.iter_matches(soup))
+
+    assert "price" in first.element["class"]
+    assert checked[-1] is first.element
+    assert len(checked) < len(soup.find_all(True))
+
+
+def test_gratis_generic_names_come_from_the_product_card():
+    """Generic link texts are replaced by the name inside the price's own card."""
+
+    html = """
+    <div class="product-name">Başka Ürün</div>
+    <div class="card"><a href="/urun/x">Ürün</a><div class="product-name">Doğru Krem</div>
+      <span class="price">15,00 TL</span></div>
+    """
+
+    result = gratis._build_result.__wrapped__(html, "https://www.gratis.com/search")
+
+    assert result.product_name == "Doğru Krem"
+    assert result.product_url == "https://www.gratis.com/urun/x"
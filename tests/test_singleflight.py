@@ -0,0 +1,112 @@
+"""Tests for single-flight request coalescing."""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from price_fetchers.singleflight import SingleFlight, SingleFlightTimeout
+
+
+def test_concurrent_callers_share_one_execution():
+    """Only the leader runs the function; waiters get its result."""
+
+    flights: SingleFlight[int] = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow() -> int:
+        calls.append(1)
+        release.wait(timeout=2)
+        return 42
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(flights.do, "key", slow) for _ in range(5)]
+        while flights.stats()["coalesced"] < 4:
+            threading.Event().wait(0.01)
+        release.set()
+        values = [future.result(timeout=2) for future in futures]
+
+    assert values == [42] * 5
+    assert len(calls) == 1
+    assert flights.in_flight() == 0
+
+
+def test_leader_error_propagates_to_waiters():
+    """Waiters receive the exception raised by the leader."""
+
+    flights: SingleFlight[int] = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing() -> int:
+        started.set()
+        release.wait(timeout=2)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "key", failing)
+        started.wait(timeout=2)
+        waiter = pool.submit(flights.do, "key", lambda: 0)
+        while flights.stats()["coalesced"] < 1:
+            threading.Event().wait(0.01)
+        release.set()
+        with pytest.raises(ValueError):
+            leader.result(timeout=2)
+        with pytest.raises(ValueError):
+            waiter.result(timeout=2)
+
+
+def test_waiter_times_out():
+    """A waiter with a timeout gives up without cancelling the leader."""
+
+    flights: SingleFlight[int] = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow() -> int:
+        started.set()
+        release.wait(timeout=2)
+        return 1
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(flights.do, "key", slow)
+        started.wait(timeout=2)
+        with pytest.raises(SingleFlightTimeout):
+            flights.do("key", lambda: 0, timeout=0.05)
+        release.set()
+        assert leader.result(timeout=2) == 1
+
+
+def test_joining_callers_see_the_leaders_shared_value():
+    """Each waiter gets ``join`` called with the value the leader attached."""
+
+    flights: SingleFlight[int] = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    joined = []
+
+    def slow() -> int:
+        started.set()
+        release.wait(timeout=2)
+        return 1
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "key", slow, shared="leader's", join=joined.append)
+        started.wait(timeout=2)
+        waiter = pool.submit(flights.do, "key", lambda: 0, shared="waiter's", join=joined.append)
+        while flights.stats()["coalesced"] < 1:
+            threading.Event().wait(0.01)
+        release.set()
+        assert leader.result(timeout=2) == waiter.result(timeout=2) == 1
+
+    assert joined == ["leader's"]
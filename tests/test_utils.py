@@ -0,0 +1,89 @@
+"""Tests for shared fetching helpers."""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+
+import pytest
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from price_fetchers import utils
+
+
+@pytest.fixture(autouse=True)
+def fresh_sessions():
+    """Start and finish every test without pooled sessions."""
+
+    utils.close_sessions()
+    yield
+    utils.close_sessions()
+
+
+def test_get_session_reuses_one_session_per_host():
+    """Requests to the same host share a session; other hosts get their own."""
+
+    first = utils.get_session("https://www.gratis.com/search?q=a")
+    second = utils.get_session("https://WWW.GRATIS.COM/other")
+    other = utils.get_session("https://www.rossmann.com.tr/search/")
+
+    assert first is second
+    assert first is not other
+
+
+def test_close_sessions_drops_pooled_sessions():
+    """Closing the pool forces a new session on the next lookup."""
+
+    before = utils.get_session("https://www.gratis.com/")
+    utils.close_sessions()
+
+    assert utils.get_session("https://www.gratis.com/") is not before
+
+
+def test_json_ld_extraction_skips_building_the_tree():
+    """JSON-LD products are found by scanning script blocks, not by parsing the page."""
+
+    page = utils.ParsedPage(
+        "<html><head>"
+        '<script type="application/ld+json">'
+        '{"@type": "Product", "name": "Krem", "offers": {"price": "129,90", "priceCurrency": "TRY"}}'
+        "</script>"
+        "<script type='application/ld+json'>not json</script>"
+        "</head><body><p>x</p></body></html>"
+    )
+
+    products = utils.parse_json_ld_products(page)
+
+    assert [(product.name, product.price) for product in products] == [("Krem", 129.9)]
+    assert page._soup is None
+    assert page.soup is page.soup
+
+
+def test_host_pacing_spaces_requests_and_refuses_past_the_deadline(monkeypatch):
+    """Past the burst, requests to a host wait their turn unless that outlasts the deadline."""
+
+    from price_fetchers import metrics
+    from price_fetchers.deadline import deadline_scope
+
+    slept = []
+    monkeypatch.setattr(utils.time, "sleep", slept.append)
+    metrics.reset()
+    utils.configure_host_pacing(2.0, burst=1)
+    try:
+        utils._pace("https://www.gratis.com/search")
+        utils._pace("https://www.gratis.com/search")
+        utils._pace("https://www.rossmann.com.tr/search")
+        with deadline_scope(0.6):
+            with pytest.raises(utils.HostBusy):
+                utils._pace("https://www.gratis.com/search")
+    finally:
+        utils.configure_host_pacing(None)
+
+    assert len(slept) == 1 and 0.4 < slept[0] <= 0.5
+    body = metrics.render()
+    assert 'price_outbound_paced_total{host="www.gratis.com",outcome="delayed"} 1' in body
+    assert 'price_outbound_paced_total{host="www.gratis.com",outcome="refused"} 1' in body
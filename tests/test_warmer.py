@@ -0,0 +1,147 @@
+"""Tests for query popularity tracking and the background cache warmer."""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+from concurrent.futures import Future
+
+# Ensure the project root is on sys.path for direct package imports.
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from price_fetchers import aggregator
+from price_fetchers.base import PriceResult
+from price_fetchers.cache import ResultCache
+from price_fetchers.warmer import CacheWarmer, PopularityTracker
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_popularity_decays_with_half_life():
+    """Recent hits outweigh older ones and scores halve every half-life."""
+
+    clock = FakeClock()
+    tracker = PopularityTracker(half_life=60, clock=clock)
+    for _ in range(4):
+        tracker.hit("Eski Sorgu")
+    clock.now += 120
+    for _ in range(2):
+        tracker.hit("yeni sorgu")
+    tracker.hit("YENİ  sorgu")
+
+    assert abs(tracker.score("eski sorgu") - 1.0) < 1e-9
+    assert tracker.top(1) == [("yeni sorgu", 1)]
+
+
+def test_popularity_forgets_the_least_popular_queries():
+    """Past ``max_tracked`` queries the least popular ones are dropped."""
+
+    tracker = PopularityTracker(max_tracked=10, clock=FakeClock())
+    tracker.hit("favori")
+    tracker.hit("favori")
+    for index in range(10):
+        tracker.hit(f"sorgu {index}")
+
+    assert len(tracker) <= 10
+    assert tracker.top(1) == [("favori", 1)]
+
+
+def _warmer(clock, expiries, dispatched, outcome=PriceResult(retailer="Gratis", price=5.0), **settings):
+    def dispatch(query, retailer, limit):
+        dispatched.append((query, retailer, limit))
+        expiries[query] = 300.0
+        future = Future()
+        future.set_result(outcome)
+        return future
+
+    tracker = PopularityTracker(clock=clock)
+    for query in expiries:
+        tracker.hit(query)
+    return CacheWarmer(
+        tracker,
+        retailers=lambda: ["Gratis"],
+        expires_in=lambda query, retailer, limit: expiries[query],
+        dispatch=dispatch,
+        clock=clock,
+        **settings,
+    )
+
+
+def test_warmer_refreshes_only_entries_about_to_expire():
+    """Fresh and uncached entries are left alone; soon-expiring ones are refreshed in time."""
+
+    clock = FakeClock()
+    dispatched = []
+    warmer = _warmer(clock, {"yakında": 40.0, "taze": 500.0, "yok": None}, dispatched, lead_time=60)
+
+    warmer.tick()
+    assert warmer.stats()["backlog"] == 1
+    clock.now += 10  # Due somewhere in the first 40 - 60 / 2 seconds.
+    warmer.tick()
+
+    assert dispatched == [("yakında", "Gratis", 1)]
+    assert warmer.stats()["completed"] == 1
+    assert warmer.stats()["backlog"] == 0
+
+
+def test_warmer_defers_refreshes_beyond_the_retailer_rate():
+    """Refreshes over the per-retailer rate wait, and the wait shows up as lag."""
+
+    clock = FakeClock()
+    dispatched = []
+    expiries = {f"sorgu {index}": 0.0 for index in range(3)}
+    warmer = _warmer(clock, expiries, dispatched, default_rate=1.0)
+
+    warmer.tick()
+    assert len(dispatched) == 1
+    clock.now += 0.5
+    warmer.tick()
+
+    stats = warmer.stats()
+    assert len(dispatched) == 1
+    assert stats["backlog"] == 2
+    assert stats["deferred"] >= 2
+    assert stats["lag_seconds"] == 0.5
+
+    clock.now += 0.5
+    warmer.tick()
+    assert len(dispatched) == 2
+
+
+def test_refresh_cached_replaces_the_entry_but_keeps_good_prices(monkeypatch):
+    """A refresh stores new prices but never replaces a good price with an error."""
+
+    outcomes = [PriceResult(retailer="Gratis", price=5.0), PriceResult(retailer="Gratis", error="boom")]
+    monkeypatch.setattr(aggregator, "FETCHERS", {"Gratis": lambda query: outcomes.pop(0)})
+    monkeypatch.setattr(aggregator, "RESULT_CACHE", ResultCache())
+
+    aggregator.refresh_cached("krem", "Gratis")
+    aggregator.refresh_cached("krem", "Gratis")
+
+    assert aggregator.RESULT_CACHE.get("krem", "Gratis").price == 5.0
+    assert aggregator.RESULT_CACHE.expires_in("krem", "Gratis") > 0
+
+
+def test_warmer_counts_shed_and_failed_refreshes_apart_from_completed_ones():
+    """A refresh turned away as busy is deferred and an error result is a failure."""
+
+    for outcome, counter in [
+        (PriceResult(retailer="Gratis", error="yoğun", debug={"error_type": "busy"}), "deferred"),
+        (PriceResult(retailer="Gratis", error="502", debug={"error_type": "fetch"}), "failed"),
+    ]:
+        clock = FakeClock()
+        warmer = _warmer(clock, {"krem": 0.0}, [], outcome)
+
+        warmer.tick()
+
+        stats = warmer.stats()
+        assert stats[counter] == 1
+        assert stats["completed"] == 0